@@ -20,7 +20,7 @@ from pyz3r.alttpr import ALTTPR
 from pyz3r.sm import sm, smClass
 from pyz3r.smvaria import SuperMetroidVaria
 from pyz3r.rom import Rom
-from pyz3r import mystery, customizer, rom, exceptions
+from pyz3r import mystery, customizer, rom, exceptions, client, ratelimit, retry, cache, sprites, patches, bpspatch, cosmetics, zspr, jsoncodec
 
 __all__ = [
     'ALTTPR',
@@ -32,4 +32,14 @@ __all__ = [
     'customizer',
     'rom',
     'exceptions',
+    'client',
+    'retry',
+    'ratelimit',
+    'cache',
+    'sprites',
+    'patches',
+    'bpspatch',
+    'cosmetics',
+    'zspr',
+    'jsoncodec',
 ]
@@ -1,18 +1,177 @@
 """ALTTPR (A Link to the Past Randomizer) API client."""
 
-from typing import Optional, Dict, Any, List, Union
-from pathlib import Path
+from typing import (
+    Optional, Dict, Any, List, Union, Iterable, Iterator, AsyncIterator, Awaitable, Callable, NamedTuple, Tuple, TypeVar
+)
 import aiohttp
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import functools
+import hashlib
 import logging
-import tempfile
 import os
+import time
 
 from .exceptions import Pyz3rException, AlttprFailedToRetrieve, AlttprFailedToGenerate
-from . import misc, spoiler
+from . import client, jsoncodec, spoiler
+from .cache import (
+    SeedCache, get_default_base_rom_cache, get_default_bps_cache, get_default_bps_index, get_default_seed_cache,
+    get_default_seed_rom_cache
+)
+from .ratelimit import TokenBucket
+from .retry import RetryPolicy
+from .cosmetics import CosmeticPreset
+from .patches import PackedPatches, PatchIndex, PatchPlan, Patches
 from .rom import Rom
+from .sprites import get_sprite_catalog
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# concurrent retrieves of the same hash share one request
+_retrieve_flights = client.SingleFlight()
+# concurrent downloads of the same base patch share one request
+_bps_flights = client.SingleFlight()
+
+_default_executor: Optional[Executor] = None
+_compact_patches: bool = False
+
+
+def set_default_executor(executor: Optional[Executor]) -> None:
+    """Set the executor CPU-bound patching runs in for clients that are not given one.
+
+    Args:
+        executor: A thread or process pool, or None to patch on the event loop.
+    """
+    global _default_executor
+    _default_executor = executor
+
+
+def set_compact_patches(enabled: bool) -> None:
+    """Keep the patches of generated and retrieved games as :class:`~pyz3r.patches.PackedPatches`.
+
+    When enabled, seed payloads are decoded with :func:`pyz3r.jsoncodec.loads_seed`,
+    and ``data['patch']`` of every game is packed, including games found in the
+    seed cache.  Games already loaded are not changed.
+
+    Args:
+        enabled: Whether to pack patches.
+    """
+    global _compact_patches
+    _compact_patches = enabled
+
+
+def _seed_loads() -> Optional[Callable[[str], Any]]:
+    """The decoder for seed payloads, or None for the default."""
+    return jsoncodec.loads_seed if _compact_patches else None
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str) -> Iterator[None]:
+    """Record the time spent in a stage of :meth:`ALTTPR.create_patched_game`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def _apply_base(rom: Rom, patch: bytes) -> Tuple[Rom, Dict[str, float]]:
+    """Apply the base BPS patch to a ROM.
+
+    This and the other stage functions are module-level so they can run in a
+    process pool, which works on a copy of ``rom``; always use the returned Rom.
+    """
+    timings: Dict[str, float] = {}
+
+    logger.debug("Applying base BPS patch")
+    with _stage(timings, 'bps'):
+        rom.apply_bps_patch(patch=patch)
+
+    return rom, timings
+
+
+def _patch_seed(rom: Rom, size: int, patches: PatchPlan) -> Tuple[Rom, Dict[str, float]]:
+    """Expand a base ROM and apply the seed patches to it. See :func:`_apply_base`."""
+    timings: Dict[str, float] = {}
+
+    with _stage(timings, 'patches'):
+        # expand the ROM to size requested in seed_data
+        if size > 2:
+            logger.debug(f"Expanding ROM to {size}MB")
+            rom.expand(newlenmb=size)
+
+        # apply the seed-specific changes
+        logger.debug("Applying seed-specific patches")
+        rom.apply_dict_patches(patches=patches)
+
+    # sum the ROM once here, so the cosmetics and checksum only account for what they change
+    with _stage(timings, 'byte_sum'):
+        rom.byte_sum
+
+    return rom, timings
+
+
+def _apply_cosmetics(
+    rom: Rom,
+    heartspeed: str,
+    heartcolor: str,
+    quickswap: bool,
+    menu_speed: str,
+    music: bool,
+    msu1_resume: bool,
+) -> Tuple[Rom, Dict[str, float]]:
+    """Apply the player's cosmetic choices to a ROM. See :func:`_apply_base`."""
+    timings: Dict[str, float] = {}
+
+    with _stage(timings, 'cosmetics'):
+        logger.debug(
+            f"Applying cosmetics: heartspeed={heartspeed}, heartcolor={heartcolor}, menu_speed={menu_speed}, "
+            f"quickswap={quickswap}, music={music}, msu1_resume={msu1_resume}")
+        rom.apply_cosmetics(CosmeticPreset.compile(
+            rom.rom_version, heartspeed=heartspeed, heartcolor=heartcolor, menu_speed=menu_speed,
+            quickswap=quickswap, music=music, msu1_resume=msu1_resume))
+
+    return rom, timings
+
+
+def _finish_rom(rom: Rom, zspr: Optional[bytearray]) -> Tuple[Rom, Dict[str, float]]:
+    """Apply a sprite, if any, and the checksum to a ROM. See :func:`_apply_base`."""
+    timings: Dict[str, float] = {}
+
+    if zspr is not None:
+        with _stage(timings, 'apply_sprite'):
+            rom.sprite(zspr=zspr)
+
+    # calculate the SNES checksum and apply it to the ROM
+    logger.debug("Calculating and applying ROM checksum")
+    with _stage(timings, 'checksum'):
+        rom.checksum()
+
+    return rom, timings
+
+
+class GenerationResult(NamedTuple):
+    """The outcome of one item in a :meth:`ALTTPR.generate_many` batch.
+
+    Attributes:
+        position: Index of the settings payload in the input iterable.
+        settings: The settings payload that was submitted.
+        seed: The generated game, or None if generation failed.
+        error: The exception raised while generating, or None on success.
+    """
+    position: int
+    settings: Dict[str, Any]
+    seed: Optional['ALTTPR']
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        """Whether this item was generated successfully."""
+        return self.error is None
+
 
 class ALTTPR:
     """Client for interacting with the ALTTPR (A Link to the Past Randomizer) API.
@@ -26,7 +185,13 @@ class ALTTPR:
         settings: The settings used to generate the game.
         baseurl: The base URL for the ALTTPR API.
         auth: Authentication credentials for the API (if provided).
+        session: Shared HTTP client session used for requests (if provided).
+        retry_policy: Retry policy for requests (if None, the process-wide default is used).
+        rate_limiter: Rate limiter for requests (if None, any limiter registered for the host is used).
+        seed_cache: Cache for retrieved seed data (if None, the process-wide default is used).
+        executor: Executor for CPU-bound patching (if None, the process-wide default is used).
         rom: The ROM object after patching (if created).
+        timings: Seconds spent in each stage of the last :meth:`create_patched_game` call.
     """
     
     def __init__(
@@ -34,6 +199,11 @@ class ALTTPR:
         baseurl: str = 'https://alttpr.com',
         username: Optional[str] = None,
         password: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        seed_cache: Optional[SeedCache] = None,
+        executor: Optional[Executor] = None,
     ) -> None:
         """Initialize an ALTTPR client.
         
@@ -41,6 +211,17 @@ class ALTTPR:
             baseurl: The base URL for the ALTTPR API. Defaults to 'https://alttpr.com'.
             username: Optional username for API authentication.
             password: Optional password for API authentication.
+            session: Optional shared ``aiohttp.ClientSession`` to reuse for all requests,
+                such as one created by :func:`pyz3r.client.create_session`.
+            retry_policy: Optional retry policy for requests. Defaults to
+                ``pyz3r.retry.DEFAULT_RETRY_POLICY``.
+            rate_limiter: Optional token bucket to wait on before each request. Defaults to
+                the limiter registered for ``baseurl`` with :func:`pyz3r.ratelimit.set_rate_limit`.
+            seed_cache: Optional cache for retrieved seed data. Defaults to
+                :func:`pyz3r.cache.get_default_seed_cache`.
+            executor: Optional thread or process pool to run CPU-bound patching in, so it
+                does not block the event loop. Defaults to the executor set with
+                :func:`set_default_executor`; if there is none, patching runs on the event loop.
         """
         self.data: Optional[Dict[str, Any]] = None
         self.hash_id: Optional[str] = None
@@ -51,7 +232,16 @@ class ALTTPR:
             aiohttp.BasicAuth(login=username, password=password) 
             if username and password else None
         )
+        self.session: Optional[aiohttp.ClientSession] = session
+        self.retry_policy: Optional[RetryPolicy] = retry_policy
+        self.rate_limiter: Optional[TokenBucket] = rate_limiter
+        self.seed_cache: Optional[SeedCache] = seed_cache
+        self.executor: Optional[Executor] = executor
         self.rom: Optional[Rom] = None
+        self.timings: Dict[str, float] = {}
+        self._patch_plan: Optional[Tuple[Patches, PatchPlan]] = None
+        self._patch_index: Optional[Tuple[PatchPlan, PatchIndex]] = None
+        self._packed_patches: Optional[Tuple[Patches, PackedPatches]] = None
         logger.debug(f"Initialized ALTTPR client with baseurl={baseurl}")
 
     @classmethod
@@ -84,6 +274,70 @@ class ALTTPR:
         logger.info(f"Successfully generated game with hash: {seed.hash}")
         return seed
 
+    @classmethod
+    async def generate_many(
+        cls,
+        settings: Iterable[Dict[str, Any]],
+        endpoint: str = '/api/randomizer',
+        concurrency: int = 5,
+        **kwargs: Any
+    ) -> AsyncIterator[GenerationResult]:
+        """Generate a batch of games, running up to ``concurrency`` generations at once.
+
+        Results are yielded in completion order, not input order; use
+        ``GenerationResult.position`` to match a result to its settings payload.
+        A failed generation is reported as a result with ``error`` set and does
+        not stop the rest of the batch.  Settings are consumed lazily, so
+        ``settings`` may be a generator.
+
+        Args:
+            settings: Iterable of game generation settings dictionaries.
+            endpoint: API endpoint for game generation. Defaults to '/api/randomizer'.
+            concurrency: Maximum number of generations in flight at once. Defaults to 5.
+            **kwargs: Additional arguments passed to the ALTTPR constructor,
+                such as a shared ``session``.
+
+        Yields:
+            A GenerationResult for each settings payload, as each one completes.
+
+        Raises:
+            ValueError: If concurrency is less than 1.
+        """
+        if concurrency < 1:
+            raise ValueError('concurrency must be at least 1')
+
+        payloads = enumerate(settings)
+        pending: Dict[asyncio.Future[ALTTPR], Tuple[int, Dict[str, Any]]] = {}
+
+        def start_next() -> bool:
+            for index, payload in payloads:
+                task = asyncio.ensure_future(cls.generate(payload, endpoint, **kwargs))
+                pending[task] = (index, payload)
+                return True
+            return False
+
+        logger.info(f"Generating batch of ALTTPR games with concurrency={concurrency}")
+        try:
+            while len(pending) < concurrency and start_next():
+                pass
+
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                results = []
+                for task in done:
+                    index, payload = pending.pop(task)
+                    try:
+                        results.append(GenerationResult(index, payload, task.result(), None))
+                    except Exception as e:
+                        logger.warning(f"Batch item {index} failed to generate: {e}")
+                        results.append(GenerationResult(index, payload, None, e))
+                    start_next()
+                for result in results:
+                    yield result
+        finally:
+            for task in pending:
+                task.cancel()
+
     @classmethod
     async def retrieve(cls, hash_id: str, **kwargs: Any) -> 'ALTTPR':
         """Retrieve an existing game by its hash ID.
@@ -118,28 +372,20 @@ class ALTTPR:
             Dictionary containing the generated game data.
             
         Raises:
-            AlttprFailedToGenerate: If generation fails after 5 retries.
+            AlttprFailedToGenerate: If generation fails, or the retry policy gives up.
         """
         self.settings = settings
-        for attempt in range(1, 6):
-            try:
-                logger.debug(f"Game generation attempt {attempt}/5 to {self.uri(endpoint)}")
-                async with aiohttp.request(
-                    method='post', 
-                    url=self.uri(endpoint), 
-                    json=settings, 
-                    auth=self.auth, 
-                    raise_for_status=True
-                ) as resp:
-                    req = await resp.json()
-                self.data = req
-                logger.info(f"Game generated successfully on attempt {attempt}")
-                return req
-            except (aiohttp.client_exceptions.ServerDisconnectedError, aiohttp.ClientResponseError) as e:
-                logger.warning(f"Game generation attempt {attempt}/5 failed: {e}")
-
-        logger.error("Failed to generate game after 5 attempts")
-        raise AlttprFailedToGenerate('failed to generate game')
+        try:
+            logger.debug(f"Generating game via {self.uri(endpoint)}")
+            req = await self._fetch_json(
+                'post', self.uri(endpoint), json=settings, auth=self.auth, loads=_seed_loads())
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to generate game: {e}")
+            raise AlttprFailedToGenerate('failed to generate game') from e
+
+        self.data = req
+        logger.info("Game generated successfully")
+        return req
 
     async def retrieve_game(self, hash_id: str) -> Dict[str, Any]:
         """Retrieve game data from the API by hash ID.
@@ -151,30 +397,45 @@ class ALTTPR:
             Dictionary containing the game data.
             
         Raises:
-            AlttprFailedToRetrieve: If retrieval fails after 5 retries.
+            AlttprFailedToRetrieve: If retrieval fails, or the retry policy gives up.
+
+        Note:
+            Concurrent retrievals of the same hash from the same site share a
+            single request, and receive the same parsed dictionary.  Retrieved
+            games are kept in the seed cache, so later retrievals of the same
+            hash do not contact the API at all.  Games retrieved with credentials
+            are cached apart from anonymous retrievals, as they may include more,
+            such as the spoiler.
         """
-        for attempt in range(1, 6):
+        seed_cache = self.seed_cache if self.seed_cache is not None else get_default_seed_cache()
+        cache_key = f'alttpr:{self.uri("/hash/" + hash_id)}'
+        if self.auth is not None:
+            cache_key += '#' + hashlib.sha256(self.auth.encode().encode('utf-8')).hexdigest()
+
+        async def download() -> Dict[str, Any]:
+            cached = await seed_cache.aget(cache_key)
+            if cached is not None:
+                logger.debug(f"Game data for hash {hash_id} found in seed cache")
+                if _compact_patches and isinstance(cached.get('patch'), list):
+                    # cached payloads are shared, so pack into a copy
+                    return dict(cached, patch=PackedPatches.pack(cached['patch']))
+                return cached
             try:
-                logger.debug(f"Game retrieval attempt {attempt}/5 for hash: {hash_id}")
-                async with aiohttp.request(
-                    method='get', 
-                    url=self.uri('/hash/' + hash_id), 
-                    auth=self.auth, 
-                    raise_for_status=True
-                ) as resp:
-                    req = await resp.json(content_type="text/html")
-                self.data = req
-                logger.info(f"Game retrieved successfully on attempt {attempt}")
-                return req
-            except aiohttp.ClientResponseError as e:
-                logger.warning(f"Game retrieval attempt {attempt}/5 failed with HTTP error: {e}")
-            except aiohttp.client_exceptions.ServerDisconnectedError as e:
-                logger.warning(f"Game retrieval attempt {attempt}/5 failed with disconnect: {e}")
-        
-        logger.error(f"Failed to retrieve game {hash_id} after 5 attempts")
-        raise AlttprFailedToRetrieve(
-            f'failed to retrieve game {hash_id}, the game is likely not found.')
-
+                logger.debug(f"Retrieving game data for hash: {hash_id}")
+                data = await self._fetch_json(
+                    'get', self.uri('/hash/' + hash_id), auth=self.auth, content_type="text/html",
+                    loads=_seed_loads())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Failed to retrieve game {hash_id}: {e}")
+                raise AlttprFailedToRetrieve(
+                    f'failed to retrieve game {hash_id}, the game is likely not found.') from e
+            await seed_cache.aset(cache_key, data)
+            return data
+
+        req = await _retrieve_flights.do((self.baseurl, hash_id, self.auth), download)
+        self.data = req
+        logger.info(f"Game retrieved successfully: {hash_id}")
+        return req
 
     async def randomizer_settings(self) -> Dict[str, Any]:
         """Get valid randomizer settings from the API.
@@ -183,13 +444,7 @@ class ALTTPR:
             Dictionary of valid settings that can be used for game generation.
         """
         logger.debug("Fetching randomizer settings from API")
-        async with aiohttp.request(
-            method='get', 
-            url=self.baseurl + '/randomizer/settings', 
-            auth=self.auth, 
-            raise_for_status=True
-        ) as resp:
-            settings = await resp.json()
+        settings = await self._fetch_json('get', self.baseurl + '/randomizer/settings', auth=self.auth)
         logger.debug("Successfully fetched randomizer settings")
         return settings
 
@@ -200,13 +455,7 @@ class ALTTPR:
             Dictionary of valid customizer settings that can be used.
         """
         logger.debug("Fetching customizer settings from API")
-        async with aiohttp.request(
-            method='get', 
-            url=self.baseurl + '/customizer/settings', 
-            auth=self.auth, 
-            raise_for_status=True
-        ) as resp:
-            settings = await resp.json()
+        settings = await self._fetch_json('get', self.baseurl + '/customizer/settings', auth=self.auth)
         logger.debug("Successfully fetched customizer settings")
         return settings
 
@@ -217,13 +466,7 @@ class ALTTPR:
             The hash string for today's daily seed.
         """
         logger.debug("Fetching daily challenge hash")
-        async with aiohttp.request(
-            method='get', 
-            url=f'{self.baseurl}/api/daily', 
-            auth=self.auth, 
-            raise_for_status=True
-        ) as resp:
-            daily = await resp.json()
+        daily = await self._fetch_json('get', f'{self.baseurl}/api/daily', auth=self.auth)
         logger.info(f"Daily hash retrieved: {daily['hash']}")
         return daily['hash']
 
@@ -261,7 +504,10 @@ class ALTTPR:
             29: 'Map', 30: 'Compass', 31: 'Big Key'
         }
 
-        codebytes = misc.seek_patch_data(self.data['patch'], 1573397, 5)
+        try:
+            codebytes = self.patch_index.read(1573397, 5)
+        except KeyError:
+            codebytes = b''
         if len(codebytes) != 5:
             logger.warning("Could not extract code bytes, using default")
             return ["Bow", "Boomerang", "Hookshot", "Bombs", "Mushroom"]
@@ -275,50 +521,56 @@ class ALTTPR:
         """Get the base BPS patch from the website.
         
         This is the first set of patches that must be applied to the ROM.
-        BPS files are cached in the system's temp directory (/tmp/pyz3r/bps on *nix systems).
+        BPS files are cached by :func:`pyz3r.cache.get_default_bps_cache`, in the
+        system's temp directory (/tmp/pyz3r/bps on *nix systems) by default, along
+        with an index of which patch each seed needs, so a seed whose patch is
+        already cached is patched again without contacting the API.  When
+        several processes share the cache, only one of them downloads a missing
+        patch while the others wait for it.
 
         Returns:
             Bytes object representing the BPS patch.
         """
-        logger.debug(f"Fetching patch base for hash: {self.hash}")
-        async with aiohttp.request(
-            method='get', 
-            url=self.uri("/api/h/" + self.hash), 
-            auth=self.auth, 
-            raise_for_status=True
-        ) as resp:
-            seed_settings = await resp.json()
-
-        cachedbpstmp = os.path.join(tempfile.gettempdir(), "pyz3r", "bps")
-        cachedbpsfile = os.path.join(cachedbpstmp, f"{seed_settings['md5']}.bps")
-        
-        try:
-            Path(cachedbpstmp).mkdir(parents=True, exist_ok=True)
-            with open(cachedbpsfile, "rb") as f:
-                req_patch = f.read()
-            logger.info(f"Loaded BPS patch from cache: {cachedbpsfile}")
-        except (FileNotFoundError, PermissionError) as e:
-            logger.debug(f"Cache miss or permission error: {e}, downloading BPS patch")
-            async with aiohttp.request(
-                method='get', 
-                url=self.baseurl + seed_settings['bpsLocation'], 
-                auth=self.auth, 
-                raise_for_status=True
-            ) as resp:
-                req_patch = await resp.read()
-
-            try:
-                with open(cachedbpsfile, "wb") as f:
-                    f.write(req_patch)
-                logger.info(f"Cached BPS patch to: {cachedbpsfile}")
-            except PermissionError:
-                logger.warning("Unable to cache BPS file due to permission error")
-
+        _, req_patch = await self._get_patch_base()
         return req_patch
 
+    async def _get_patch_base(self) -> Tuple[str, bytes]:
+        """Get the base BPS patch and its md5. See :meth:`get_patch_base`."""
+        logger.debug(f"Fetching patch base for hash: {self.hash}")
+        bps_cache = get_default_bps_cache()
+        bps_index = get_default_bps_index()
+        # only the /api/h answer for this seed says which base patch it needs;
+        # the site's current_rom_hash may be a newer build than the seed's
+        key = f'{self.baseurl}/hash/{self.hash}'
+        seed_settings = bps_index.get(key)
+        if seed_settings is None:
+            seed_settings = await self._fetch_json('get', self.uri("/api/h/" + self.hash), auth=self.auth)
+            bps_index.set([key], seed_settings)
+
+        md5 = seed_settings['md5']
+        req_patch = bps_cache.get(md5)
+        if req_patch is not None:
+            logger.info(f"Loaded BPS patch from cache: {md5}")
+            return md5, req_patch
+
+        bps_location = seed_settings['bpsLocation']
+
+        async def download() -> bytes:
+            async with bps_cache.locked(md5):
+                # another process may have downloaded it while we waited for the lock
+                req_patch = bps_cache.get(md5)
+                if req_patch is None:
+                    logger.debug("Cache miss, downloading BPS patch")
+                    req_patch = await self._fetch_bytes('get', self.baseurl + bps_location, auth=self.auth)
+                    bps_cache.set(md5, req_patch)
+                    logger.info(f"Cached BPS patch: {md5}")
+            return req_patch
+
+        return md5, await _bps_flights.do((self.baseurl, md5), download)
+
     async def create_patched_game(
         self,
-        input_filename: str,
+        input_filename: Union[str, 'os.PathLike[str]', Rom, bytes, bytearray, memoryview],
         output_filename: Optional[str] = None,
         heartspeed: str = 'half',
         heartcolor: str = 'red',
@@ -326,12 +578,14 @@ class ALTTPR:
         menu_speed: str = 'normal',
         spritename: str = 'Link',
         music: bool = True,
-        msu1_resume: bool = True
+        msu1_resume: bool = True,
+        mmap_output: bool = False
     ) -> Rom:
         """Create a patched ROM file with customizations.
         
         Args:
-            input_filename: Path to the base Japan 1.0 ROM file.
+            input_filename: Path to the base Japan 1.0 ROM file, or the ROM already
+                loaded as a Rom or buffer.  A preloaded ROM is not modified.
             output_filename: Optional path to write the patched ROM to.
             heartspeed: Low health beep speed ('off', 'quarter', 'half', 'normal', 'double').
             heartcolor: Heart color on HUD ('red', 'blue', 'green', 'yellow').
@@ -340,69 +594,219 @@ class ALTTPR:
             spritename: Name of sprite to use (from alttpr.com/sprites).
             music: Enable in-game music (disable for MSU-1).
             msu1_resume: Enable MSU-1 resume feature.
+            mmap_output: Patch straight into a memory map of ``output_filename``,
+                preallocated at the final ROM size, instead of building the ROM in
+                memory and writing it out afterwards.  The returned Rom stays mapped
+                until its :meth:`~pyz3r.rom.Rom.close` is called.
             
         Returns:
             The patched Rom object.
             
         Raises:
-            Pyz3rException: If no game has been generated or retrieved yet.
+            Pyz3rException: If no game has been generated or retrieved yet, or
+                ``mmap_output`` is set without an ``output_filename`` or with a
+                process pool executor, which cannot share the mapping.
+
+        Note:
+            The base patch download, the sprite download and the ROM read run
+            concurrently, and patching starts as soon as the ROM and base patch
+            are ready.  The input ROM with the base patch applied is cached (see
+            :class:`pyz3r.cache.BaseRomCache`), so later games of the same randomizer
+            version start from a copy of it instead of reading the input file and
+            applying the base patch again.  The seed's ROM before cosmetics is
+            cached as well (see :class:`pyz3r.cache.SeedRomCache`), so each later
+            game of the same hash only copies it and applies the cosmetics.
+            Patching runs in :attr:`executor` if one is configured.
+            The time spent in each stage is recorded in :attr:`timings`.
         """
         if not self.data:
             logger.error("Attempted to create patched game before generating/retrieving")
             raise Pyz3rException('Please specify a seed or hash first to generate or retrieve a game.')
-
-        logger.info(f"Creating patched game from {input_filename}")
-        self.rom = Rom(input_filename)
-
-        logger.debug("Applying base BPS patch")
-        self.rom.apply_bps_patch(patch=await self.get_patch_base())
-
-        # expand the ROM to size requested in seed_data
-        if self.data['size'] > 2:
-            logger.debug(f"Expanding ROM to {self.data['size']}MB")
-            self.rom.expand(newlenmb=self.data['size'])
-
-        # apply the seed-specific changes
-        logger.debug("Applying seed-specific patches")
-        self.rom.apply_dict_patches(patches=self.data['patch'])
-
-        # apply the heart speed change
-        logger.debug(f"Setting heart speed to {heartspeed}")
-        self.rom.heart_speed(heartspeed)
-
-        # apply the heart color change
-        logger.debug(f"Setting heart color to {heartcolor}")
-        self.rom.heart_color(heartcolor)
-
-        # apply menu speed
-        logger.debug(f"Setting menu speed to {menu_speed}")
-        self.rom.menu_speed(menu_speed)
-
-        # apply quickswap
-        logger.debug(f"Setting quickswap to {quickswap}")
-        self.rom.quickswap(quickswap)
-
+        mmap_filename: Optional[str] = None
+        if mmap_output:
+            if output_filename is None:
+                raise Pyz3rException('mmap_output needs an output_filename to map.')
+            if isinstance(self.executor if self.executor is not None else _default_executor, ProcessPoolExecutor):
+                raise Pyz3rException('mmap_output cannot be used with a process pool executor.')
+            mmap_filename = output_filename
+
+        self.timings = {}
+        start = time.perf_counter()
+
+        base_roms = get_default_base_rom_cache()
+        # either the path of the input ROM or its preloaded contents
+        source: Union[str, bytes, bytearray, memoryview]
+        if isinstance(input_filename, Rom):
+            source = input_filename.rom
+        elif isinstance(input_filename, (bytes, bytearray, memoryview)):
+            source = input_filename
+        else:
+            source = os.fspath(input_filename)
+        source_md5: Optional[str]
+        if isinstance(source, str):
+            logger.info(f"Creating patched game from {source}")
+            source_md5 = base_roms.source_hash(source)
+        else:
+            logger.info("Creating patched game from a preloaded ROM")
+            source_md5 = hashlib.md5(source).hexdigest()
+
+        seed_roms = get_default_seed_rom_cache()
+        seed_key = self.uri('/hash/' + self.hash) if self.hash else None
+        seed_rom = seed_roms.get(source_md5, seed_key) if source_md5 and seed_key else None
+
+        # start everything that waits on the network or disk at once
+        patch_base = None
+        base_rom = None
+        if seed_rom is None:
+            patch_base = asyncio.ensure_future(self._timed_stage('patch_base', self._get_patch_base()))
+            if isinstance(source, str) and source_md5 is None:
+                base_rom = asyncio.ensure_future(self._timed_stage('read', Rom.aread(source)))
+        sprite = None
         if not spritename == "Link":
-            # apply the sprite
-            logger.info(f"Applying sprite: {spritename}")
-            self.rom.sprite(zspr=await self.get_sprite(spritename))
-
-        # apply music options
-        logger.debug(f"Setting music={music}, msu1_resume={msu1_resume}")
-        self.rom.music(music=music)
-        self.rom.msu1_resume(enable=msu1_resume)
-
-        # calculate the SNES checksum and apply it to the ROM
-        logger.debug("Calculating and applying ROM checksum")
-        self.rom.checksum()
+            sprite = asyncio.ensure_future(self._timed_stage('sprite', self.get_sprite(spritename)))
+        mapped: Optional[Rom] = None
 
-        if output_filename is not None:
+        try:
+            if seed_rom is not None:
+                logger.debug("Starting from cached seed ROM")
+                image, byte_sum = seed_rom
+                with _stage(self.timings, 'seed_rom'):
+                    if mmap_filename is not None:
+                        rom = mapped = Rom.mmap_file(mmap_filename, image, byte_sum=byte_sum)
+                    else:
+                        rom = Rom.from_bytes(image, byte_sum=byte_sum)
+            else:
+                rom, source_md5 = await self._build_seed_rom(
+                    source, source_md5, self.data['size'], patch_base, base_rom, mmap_filename)
+                if mmap_filename is not None:
+                    mapped = rom
+                if seed_key is not None:
+                    seed_roms.set(source_md5, seed_key, rom.rom, rom.byte_sum)
+
+            rom = await self._run_stage(
+                _apply_cosmetics, rom, heartspeed=heartspeed, heartcolor=heartcolor,
+                quickswap=quickswap, menu_speed=menu_speed, music=music, msu1_resume=msu1_resume)
+
+            zspr = None
+            if sprite is not None:
+                zspr = await sprite
+                logger.info(f"Applying sprite: {spritename}")
+            self.rom = await self._run_stage(_finish_rom, rom, zspr)
+        except Exception:
+            if mapped is not None and mmap_filename is not None:
+                # don't leave a half-patched ROM at the output path
+                mapped.close()
+                os.remove(mmap_filename)
+            raise
+        finally:
+            for task in (patch_base, sprite, base_rom):
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # mark a failure we are not going to await as retrieved
+                    task.exception()
+
+        if mmap_filename is not None:
+            logger.info(f"Flushing patched ROM to {mmap_filename}")
+            await self._timed_stage('write', asyncio.get_running_loop().run_in_executor(None, self.rom.flush))
+        elif output_filename is not None:
             logger.info(f"Writing patched ROM to {output_filename}")
-            self.rom.write_to_file(output_filename)
+            await self._timed_stage('write', self.rom.awrite(output_filename))
 
+        self.timings['total'] = time.perf_counter() - start
+        logger.debug("Patch stage timings: " + ', '.join(f"{k}={v * 1000:.1f}ms" for k, v in self.timings.items()))
         logger.info("Successfully created patched game")
         return self.rom
 
+    async def _build_seed_rom(
+        self,
+        source: Union[str, bytes, bytearray, memoryview],
+        source_md5: Optional[str],
+        size: int,
+        patch_base: 'Optional[asyncio.Future[Tuple[str, bytes]]]',
+        base_rom: 'Optional[asyncio.Future[Rom]]',
+        mmap_filename: Optional[str],
+    ) -> Tuple[Rom, str]:
+        """Build a seed's ROM, before cosmetics, for :meth:`create_patched_game`.
+
+        Args:
+            source: The path of the input ROM, or its preloaded contents.
+            source_md5: md5 of the input ROM, if known.
+            size: Size of the seed's ROM in MiB, from the seed data.
+            patch_base: The running base patch download, if it has been started.
+            base_rom: The running input ROM read, if it has been started.
+            mmap_filename: Path to patch into a memory map of, if any.
+
+        Returns:
+            The ROM with the base patch and the seed patches applied, and the
+            md5 of the input ROM.
+        """
+        base_roms = get_default_base_rom_cache()
+        if patch_base is None:
+            patch_base = asyncio.ensure_future(self._timed_stage('patch_base', self._get_patch_base()))
+        bps_md5, patch = await patch_base
+
+        rom: Optional[Rom] = None
+        if isinstance(source, str):
+            if source_md5 is None:
+                # the input file has not been hashed yet, so read it to find out
+                rom = await (base_rom if base_rom is not None else self._timed_stage('read', Rom.aread(source)))
+                source_md5 = base_roms.remember_source(source, rom.rom)
+        elif source_md5 is None:
+            source_md5 = hashlib.md5(source).hexdigest()
+
+        image = base_roms.get(source_md5, bps_md5)
+        if image is not None:
+            logger.debug("Starting from cached patched base ROM")
+            rom = None
+        else:
+            if rom is None:
+                if isinstance(source, str):
+                    rom = await self._timed_stage('read', Rom.aread(source))
+                else:
+                    rom = Rom.from_bytes(source)
+            rom = await self._run_stage(_apply_base, rom, patch)
+            image = bytes(rom.rom)
+            base_roms.set(source_md5, bps_md5, image)
+
+        if mmap_filename is None:
+            if rom is None:
+                rom = Rom.from_bytes(image)
+            rom = await self._run_stage(_patch_seed, rom, size, self.patch_plan)
+            return rom, source_md5
+
+        with _stage(self.timings, 'map'):
+            # preallocate the file at the size _patch_seed will expand the ROM to
+            length = len(image)
+            if size > 2:
+                length = max(length, Rom.expanded_length(size))
+            rom = Rom.mmap_file(mmap_filename, image, length)
+        try:
+            rom = await self._run_stage(_patch_seed, rom, size, self.patch_plan)
+        except Exception:
+            rom.close()
+            os.remove(mmap_filename)
+            raise
+        return rom, source_md5
+
+    async def _timed_stage(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Await a concurrent stage of :meth:`create_patched_game`, recording its time."""
+        with _stage(self.timings, name):
+            return await awaitable
+
+    async def _run_stage(self, fn: Callable[..., Tuple[Rom, Dict[str, float]]], *args: Any, **kwargs: Any) -> Rom:
+        """Run a CPU-bound patching stage in this client's executor, if any."""
+        executor = self.executor if self.executor is not None else _default_executor
+        if executor is None:
+            rom, timings = fn(*args, **kwargs)
+        else:
+            rom, timings = await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(fn, *args, **kwargs))
+        self.timings.update(timings)
+        return rom
+
     async def get_sprite(self, name: str) -> bytearray:
         """Retrieve the ZSPR file for a named sprite.
 
@@ -414,40 +818,93 @@ class ALTTPR:
             
         Raises:
             Pyz3rException: If the sprite doesn't exist or can't be downloaded.
-        """
-        logger.debug(f"Fetching sprite list to find sprite: {name}")
-        async with aiohttp.request(
-            method='get', 
-            url=self.baseurl + '/sprites', 
-            auth=self.auth, 
-            raise_for_status=True
-        ) as resp:
-            sprites = await resp.json()
-        
-        try:
-            spriteinfo = next(
-                (sprite for sprite in sprites if sprite["name"] == name))
-        except StopIteration:
-            logger.error(f"Sprite '{name}' not found on {self.baseurl}")
-            raise Pyz3rException(
-                f"Sprite {name} does not exist on {self.baseurl}.")
-        
-        try:
-            logger.debug(f"Downloading sprite from {spriteinfo['file']}")
-            async with aiohttp.request(
-                method='get', 
-                url=spriteinfo["file"], 
-                raise_for_status=True
-            ) as resp:
-                spritedata = await resp.read()
-            logger.info(f"Successfully downloaded sprite: {name}")
-        except Exception as e:
-            logger.error(f"Failed to download sprite '{name}': {e}")
-            raise Pyz3rException(
-                f'Sprite "{name}" could not be downloaded.') from e
 
+        Note:
+            The sprite list and sprite files are cached, see :mod:`pyz3r.sprites`.
+        """
+        logger.debug(f"Fetching sprite: {name}")
+        catalog = get_sprite_catalog(self.baseurl)
+        spritedata = await catalog.download(
+            name, session=self.session, retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter, auth=self.auth)
         return bytearray(spritedata)
 
+    async def _fetch_json(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Fetch and decode a JSON document using this client's session and retry policy."""
+        return await client.fetch_json(
+            method, url, session=self.session, retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter, **kwargs)
+
+    async def _fetch_bytes(self, method: str, url: str, **kwargs: Any) -> bytes:
+        """Fetch a raw response body using this client's session and retry policy."""
+        return await client.fetch_bytes(
+            method, url, session=self.session, retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter, **kwargs)
+
+    @property
+    def patch_plan(self) -> PatchPlan:
+        """The seed's patch list, compiled once for fast application.
+
+        Raises:
+            Pyz3rException: If there is no game data, or its patches are invalid.
+        """
+        if not self.data:
+            raise Pyz3rException('Please specify a seed or hash first to generate or retrieve a game.')
+        patches = self.data['patch']
+        if self._patch_plan is None or self._patch_plan[0] is not patches:
+            self._patch_plan = (patches, PatchPlan.compile(patches))
+        return self._patch_plan[1]
+
+    @property
+    def packed_patches(self) -> PackedPatches:
+        """The seed's patches packed into flat buffers, packed once per patch list.
+
+        Raises:
+            Pyz3rException: If there is no game data, or its patches are invalid.
+        """
+        if not self.data:
+            raise Pyz3rException('Please specify a seed or hash first to generate or retrieve a game.')
+        patches = self.data['patch']
+        if self._packed_patches is None or self._packed_patches[0] is not patches:
+            self._packed_patches = (patches, PackedPatches.pack(patches))
+        return self._packed_patches[1]
+
+    def pack_patches(self) -> PackedPatches:
+        """Replace :attr:`data` with a copy holding :attr:`packed_patches`.
+
+        A packed patch list takes a fraction of the memory of the decoded JSON,
+        which adds up when many seeds are kept around. Everything in pyz3r that
+        reads ``data['patch']`` accepts either form. The original dictionary,
+        which may be shared through the seed cache, is left unchanged; to keep
+        cached games packed too, see :func:`set_compact_patches`.
+
+        Returns:
+            The packed patches.
+
+        Raises:
+            Pyz3rException: If there is no game data, or its patches are invalid.
+        """
+        data = self.data
+        if not data:
+            raise Pyz3rException('Please specify a seed or hash first to generate or retrieve a game.')
+        packed = self.packed_patches
+        if self._patch_plan is not None and self._patch_plan[0] is data['patch']:
+            self._patch_plan = (packed, self._patch_plan[1])
+        self.data = dict(data, patch=packed)
+        return packed
+
+    @property
+    def patch_index(self) -> PatchIndex:
+        """Offset lookups into the seed's patches, built once from :attr:`patch_plan`.
+
+        Raises:
+            Pyz3rException: If there is no game data, or its patches are invalid.
+        """
+        plan = self.patch_plan
+        if self._patch_index is None or self._patch_index[0] is not plan:
+            self._patch_index = (plan, PatchIndex(plan))
+        return self._patch_index[1]
+
     def uri(self, url: str) -> str:
         """Construct a full URI from a relative URL path.
         
@@ -0,0 +1,138 @@
+"""A BPS patch applier that works directly on memory buffers.
+
+``bps.apply.apply_to_files`` needs file-like objects, which means copying the
+ROM into a ``BytesIO``, decoding into another one and copying the result back
+out.  :func:`apply` reads the source and patch through ``memoryview``\\ s and
+writes straight into one preallocated ``bytearray``, while still checking the
+CRC32 of the patch, the source and the target like ``apply_to_files`` does.
+
+See https://www.romhacking.net/documents/746/ for the BPS format.
+"""
+
+import zlib
+from typing import Tuple, Union
+
+from .exceptions import Pyz3rException
+
+MAGIC = b'BPS1'
+
+SOURCE_READ = 0
+TARGET_READ = 1
+SOURCE_COPY = 2
+TARGET_COPY = 3
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def _varint(patch: memoryview, pos: int) -> Tuple[int, int]:
+    """Decode a BPS variable-length integer starting at ``pos``.
+
+    Returns:
+        The value and the position after it.
+    """
+    value = 0
+    shift = 1
+    while True:
+        byte = patch[pos]
+        pos += 1
+        value += (byte & 0x7f) * shift
+        if byte & 0x80:
+            return value, pos
+        shift <<= 7
+        value += shift
+
+
+def _signed(value: int) -> int:
+    return -(value >> 1) if value & 1 else value >> 1
+
+
+def _crc(data: Buffer) -> int:
+    return zlib.crc32(data) & 0xffffffff
+
+
+def apply(patch: Buffer, source: Buffer) -> bytearray:
+    """Apply a BPS patch to a source buffer.
+
+    Args:
+        patch: The BPS patch.
+        source: The data to patch. It is read through a memoryview and never copied.
+
+    Returns:
+        The patched data, in a new bytearray.
+
+    Raises:
+        Pyz3rException: If the patch is malformed, or the CRC32 of the patch,
+            the source or the result does not match the patch.
+    """
+    patch = memoryview(patch).cast('B')
+    source = memoryview(source).cast('B')
+
+    if len(patch) < len(MAGIC) + 12 or patch[:len(MAGIC)] != MAGIC:
+        raise Pyz3rException('Not a BPS patch')
+    footer = len(patch) - 12
+    source_crc = int.from_bytes(patch[footer:footer + 4], 'little')
+    target_crc = int.from_bytes(patch[footer + 4:footer + 8], 'little')
+    patch_crc = int.from_bytes(patch[footer + 8:], 'little')
+    if _crc(patch[:footer + 8]) != patch_crc:
+        raise Pyz3rException('BPS patch is corrupt (patch CRC32 mismatch)')
+
+    try:
+        source_size, pos = _varint(patch, len(MAGIC))
+        target_size, pos = _varint(patch, pos)
+        metadata_size, pos = _varint(patch, pos)
+    except IndexError:
+        raise Pyz3rException('BPS patch header is truncated') from None
+    pos += metadata_size
+
+    if len(source) != source_size:
+        raise Pyz3rException(f'BPS patch expects a {source_size} byte source, got {len(source)} bytes')
+    if _crc(source) != source_crc:
+        raise Pyz3rException('BPS patch does not apply to this source (source CRC32 mismatch)')
+
+    target = bytearray(target_size)
+    out = 0
+    source_offset = 0
+    target_offset = 0
+    try:
+        while pos < footer:
+            data, pos = _varint(patch, pos)
+            action = data & 3
+            length = (data >> 2) + 1
+            end = out + length
+            if end > target_size:
+                raise Pyz3rException('BPS patch writes past the end of the target')
+
+            if action == SOURCE_READ:
+                target[out:end] = source[out:end]
+            elif action == TARGET_READ:
+                target[out:end] = patch[pos:pos + length]
+                pos += length
+            elif action == SOURCE_COPY:
+                offset, pos = _varint(patch, pos)
+                source_offset += _signed(offset)
+                if source_offset < 0 or source_offset + length > source_size:
+                    raise Pyz3rException('BPS patch reads outside the source')
+                target[out:end] = source[source_offset:source_offset + length]
+                source_offset += length
+            else:
+                offset, pos = _varint(patch, pos)
+                target_offset += _signed(offset)
+                if target_offset < 0 or target_offset >= out:
+                    raise Pyz3rException('BPS patch copies from outside the written target')
+                distance = out - target_offset
+                if distance >= length:
+                    target[out:end] = target[target_offset:target_offset + length]
+                else:
+                    # the copy overlaps its own output, so it repeats the last `distance` bytes
+                    pattern = bytes(target[target_offset:out])
+                    target[out:end] = (pattern * (length // distance + 1))[:length]
+                target_offset += length
+            out = end
+    except IndexError:
+        raise Pyz3rException('BPS patch is truncated') from None
+
+    if out != target_size:
+        raise Pyz3rException(f'BPS patch produced {out} of {target_size} bytes')
+    if _crc(target) != target_crc:
+        raise Pyz3rException('BPS patch produced a corrupt result (target CRC32 mismatch)')
+    return target
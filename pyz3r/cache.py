@@ -0,0 +1,1123 @@
+"""Caches for retrieved seed data and BPS patch metadata.
+
+A seed never changes once it has been generated, so the data returned by
+:meth:`pyz3r.alttpr.ALTTPR.retrieve` and :meth:`pyz3r.sm.smClass.retrieve_game`
+can be kept and reused.  By default the clients use a two-tier cache: an
+in-process LRU bounded by size, backed by a compressed on-disk store in the
+system's temp directory (``/tmp/pyz3r/seeds`` on *nix systems).
+
+Any object implementing :class:`SeedCache` can be plugged in, either per
+client with the ``seed_cache`` argument or process-wide with
+:func:`set_default_seed_cache`.
+
+Cached dictionaries are shared between every caller that receives them and
+should be treated as read-only.
+
+:class:`BpsCache` keeps the base BPS patches themselves, bounded in size on
+disk with a small in-memory layer for the hot ones, and :class:`BpsIndex`
+remembers which patch each seed needs, so a patch that is already cached can be
+applied without asking the API for its md5.  :class:`BaseRomCache` keeps the
+input ROM with the base patch already applied, since that image is the same
+for every seed of a randomizer version, and :class:`SeedRomCache` keeps each
+seed's fully patched ROM before cosmetics are applied.  The BPS cache directory may be
+shared by several processes: files are written atomically, verified when read,
+and :meth:`BpsCache.locked` lets one process download a patch while the others
+wait for it.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Generic, Iterable, Optional, Tuple, TypeVar, Union
+
+from . import jsoncodec
+from .patches import PackedPatches
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_MEMORY_BYTES: int = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES: int = 512 * 1024 * 1024
+DEFAULT_BPS_BYTES: int = 256 * 1024 * 1024
+DEFAULT_BPS_MEMORY_BYTES: int = 8 * 1024 * 1024
+DEFAULT_BPS_INDEX_ENTRIES: int = 10000
+DEFAULT_BASE_ROM_BYTES: int = 32 * 1024 * 1024
+# size of a base ROM image, used to bound the input files a BaseRomCache remembers
+BASE_ROM_IMAGE_BYTES: int = 2 * 1024 * 1024
+DEFAULT_SEED_ROM_BYTES: int = 64 * 1024 * 1024
+# threads waiting on BPS download locks, kept apart from the default executor
+LOCK_WAITERS: int = 8
+
+
+def bps_directory() -> Path:
+    """The default directory BPS patches are cached in (``/tmp/pyz3r/bps`` on *nix systems)."""
+    return Path(tempfile.gettempdir(), 'pyz3r', 'bps')
+
+
+def encode(value: Dict[str, Any]) -> bytes:
+    """Serialize seed data to the bytes stored by the caches.
+
+    Args:
+        value: The seed data.
+
+    Packed patches are stored as the patch list they were packed from.
+
+    Returns:
+        UTF-8 encoded JSON.
+    """
+    return jsoncodec.dumps(value, default=_encode_default)
+
+
+def _encode_default(value: Any) -> Any:
+    """Serialize values the json module does not handle itself."""
+    if isinstance(value, PackedPatches):
+        return value.to_list()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    """Deserialize bytes produced by :func:`encode`.
+
+    Args:
+        data: UTF-8 encoded JSON.
+
+    Returns:
+        The seed data.
+    """
+    value: Dict[str, Any] = jsoncodec.loads(data)
+    return value
+
+
+def verify_bps(data: bytes) -> bool:
+    """Check that a BPS patch is complete and uncorrupted.
+
+    Args:
+        data: The patch.
+
+    Returns:
+        True if the patch has a BPS header and its trailing CRC32 matches.
+    """
+    if len(data) < 16 or data[:4] != b'BPS1':
+        return False
+    return zlib.crc32(data[:-4]) == int.from_bytes(data[-4:], 'little')
+
+
+def _lock_file(path: Path) -> int:
+    """Open ``path`` and block until an exclusive lock on it is held."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about 10 seconds
+                    continue
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+_lock_executor: Optional[ThreadPoolExecutor] = None
+_lock_executor_lock = threading.Lock()
+
+
+def _get_lock_executor() -> ThreadPoolExecutor:
+    """The executor that waits for file locks, created on first use."""
+    global _lock_executor
+    with _lock_executor_lock:
+        if _lock_executor is None:
+            _lock_executor = ThreadPoolExecutor(LOCK_WAITERS, thread_name_prefix='pyz3r-lock')
+        return _lock_executor
+
+
+def _unlock_file(fd: int) -> None:
+    """Release a lock taken by :func:`_lock_file` and close the file."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+class MemoryStore(Generic[T]):
+    """In-process LRU of values, bounded by the total size of its entries.
+
+    Attributes:
+        max_bytes: Maximum total size of stored entries, in bytes.
+        hits: Number of lookups that found an entry.
+        misses: Number of lookups that did not.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """Initialize an empty store.
+
+        Args:
+            max_bytes: Maximum total size of stored entries.
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, Tuple[T, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total size of the stored entries, in bytes."""
+        return self._size
+
+    def get(self, key: str) -> Optional[T]:
+        """Look up an entry, marking it as the most recently used.
+
+        Args:
+            key: The key.
+
+        Returns:
+            The value, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: T, size: int) -> None:
+        """Store an entry, evicting the least recently used entries if needed.
+
+        Args:
+            key: The key.
+            value: The value.
+            size: Size of the entry in bytes.
+        """
+        if size > self.max_bytes:
+            logger.debug(f"Not caching {key} in memory, {size} bytes exceeds the cache size")
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class FileStore:
+    """Directory of files with LRU eviction by capacity.
+
+    Each entry is stored as ``<key><suffix>`` in ``directory``, so keys must
+    be valid file names.  Files are written atomically, modification times are
+    bumped on every hit, and the least recently used files are removed once
+    the directory holds more than ``max_bytes``.
+
+    Attributes:
+        directory: Directory the files are stored in.
+        max_bytes: Maximum total size of the files, in bytes.
+        suffix: Extension of the files.
+        compresslevel: gzip level files are compressed with, or None to store them as is.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: int,
+        suffix: str = '',
+        compresslevel: Optional[int] = None,
+    ) -> None:
+        """Initialize a file store.
+
+        Args:
+            directory: Directory to store files in.
+            max_bytes: Maximum total size of the files.
+            suffix: Extension of the files.
+            compresslevel: gzip level to compress files with. Defaults to no compression.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.compresslevel = compresslevel
+        self._sizes: Optional[Dict[Path, int]] = None
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        """The path an entry is stored at.
+
+        Args:
+            key: The key.
+
+        Returns:
+            The path of the file.
+        """
+        return self.directory / (key + self.suffix)
+
+    def _scan(self) -> Dict[Path, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            try:
+                for path in self.directory.glob('*' + self.suffix):
+                    self._sizes[path] = path.stat().st_size
+            except OSError:
+                pass
+        return self._sizes
+
+    def load(self, key: str) -> Optional[bytes]:
+        """Read an entry.
+
+        Unreadable files are removed and treated as a miss.
+
+        Args:
+            key: The key.
+
+        Returns:
+            The data as passed to :meth:`store`, or None on a miss.
+        """
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if self.compresslevel is not None:
+                data = gzip.decompress(data)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError) as e:
+            logger.warning(f"Discarding unreadable cache file {path}: {e}")
+            self.remove(key)
+            return None
+        return data
+
+    def store(self, key: str, data: bytes) -> None:
+        """Write an entry, evicting the least recently used files if needed.
+
+        Args:
+            key: The key.
+            data: The data.
+        """
+        path = self.path(key)
+        if self.compresslevel is not None:
+            data = gzip.compress(data, compresslevel=self.compresslevel)
+        if len(data) > self.max_bytes:
+            return
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Unable to write cache file {path}: {e}")
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        with self._lock:
+            sizes = self._scan()
+            sizes[path] = len(data)
+            self._evict(sizes)
+
+    def _evict(self, sizes: Dict[Path, int]) -> None:
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        def mtime(path: Path) -> float:
+            try:
+                return path.stat().st_mtime
+            except OSError:
+                return 0.0
+
+        for path in sorted(sizes, key=mtime):
+            if total <= self.max_bytes:
+                break
+            total -= sizes.pop(path)
+            try:
+                path.unlink()
+                logger.debug(f"Evicted cache file {path}")
+            except OSError:
+                pass
+
+    def remove(self, key: str) -> None:
+        """Delete an entry if it exists.
+
+        Args:
+            key: The key.
+        """
+        path = self.path(key)
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        with self._lock:
+            if self._sizes is not None:
+                self._sizes.pop(path, None)
+
+    def clear(self) -> None:
+        """Delete every entry."""
+        with self._lock:
+            for path in self._scan():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._sizes = {}
+
+
+class SeedCache:
+    """Interface for seed data caches.
+
+    The base class stores nothing, so an instance of it can be used to
+    disable caching for a client.
+    """
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up cached seed data.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached data, or None on a miss.
+        """
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store seed data.
+
+        Args:
+            key: The cache key.
+            value: The seed data.
+        """
+
+    def clear(self) -> None:
+        """Remove everything from the cache."""
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up cached seed data from a coroutine.
+
+        The base implementation calls :meth:`get`.  Caches that read from
+        disk override it to do so in an executor, off the event loop.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached data, or None on a miss.
+        """
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """Store seed data from a coroutine.
+
+        The base implementation calls :meth:`set`.  Caches that write to
+        disk override it to do so in an executor, off the event loop.
+
+        Args:
+            key: The cache key.
+            value: The seed data.
+        """
+        self.set(key, value)
+
+
+class MemoryCache(MemoryStore[Dict[str, Any]], SeedCache):
+    """In-process LRU cache of seed data bounded by the total encoded size of its entries.
+
+    Attributes:
+        max_bytes: Maximum total size of cached entries, in bytes.
+        hits: Number of lookups that found an entry.
+        misses: Number of lookups that did not.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BYTES) -> None:
+        """Initialize an empty memory cache.
+
+        Args:
+            max_bytes: Maximum total size of cached entries. Defaults to 64 MiB.
+        """
+        super().__init__(max_bytes)
+
+    def set(self, key: str, value: Dict[str, Any], size: Optional[int] = None) -> None:
+        """Store seed data, evicting the least recently used entries if needed.
+
+        Args:
+            key: The cache key.
+            value: The seed data.
+            size: Size of the entry in bytes. Defaults to the length of its JSON encoding.
+        """
+        super().set(key, value, len(encode(value)) if size is None else size)
+
+
+class DiskCache(SeedCache):
+    """On-disk cache of gzip-compressed JSON files with LRU eviction by capacity.
+
+    Each entry is stored as ``<sha1 of key>.json.gz`` in ``directory``.  File
+    modification times are bumped on every hit, and the least recently used
+    files are removed once the directory holds more than ``max_bytes``.
+
+    Attributes:
+        files: The store holding the compressed files.
+    """
+
+    SUFFIX = '.json.gz'
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_DISK_BYTES) -> None:
+        """Initialize a disk cache.
+
+        Args:
+            directory: Directory to store files in. Defaults to ``<tempdir>/pyz3r/seeds``.
+            max_bytes: Maximum total size of the cache files. Defaults to 512 MiB.
+        """
+        self.files = FileStore(
+            directory or Path(tempfile.gettempdir(), 'pyz3r', 'seeds'), max_bytes, self.SUFFIX, compresslevel=1)
+
+    @property
+    def directory(self) -> Path:
+        """Directory the cache files are stored in."""
+        return self.files.directory
+
+    @property
+    def max_bytes(self) -> int:
+        """Maximum total size of the compressed files, in bytes."""
+        return self.files.max_bytes
+
+    @staticmethod
+    def _key(key: str) -> str:
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.files.path(self._key(key))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.load(key)
+        if data is None:
+            return None
+        try:
+            return decode(data)
+        except ValueError as e:
+            logger.warning(f"Discarding corrupt seed cache entry for {key}: {e}")
+            self.files.remove(self._key(key))
+            return None
+
+    def load(self, key: str) -> Optional[bytes]:
+        """Read the encoded seed data for a key, without decoding it.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The data as passed to :meth:`store`, or None on a miss.
+        """
+        return self.files.load(self._key(key))
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.store(key, encode(value))
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, value)
+
+    def store(self, key: str, data: bytes) -> None:
+        """Store already-encoded seed data.
+
+        Args:
+            key: The cache key.
+            data: Seed data encoded with :func:`encode`.
+        """
+        self.files.store(self._key(key), data)
+
+    def clear(self) -> None:
+        self.files.clear()
+
+
+class TieredCache(SeedCache):
+    """A memory cache in front of a disk cache.
+
+    Hits on disk are promoted into memory.  New entries are written to both.
+    :meth:`aget` and :meth:`aset` read and write the disk tier in an executor,
+    so a coroutine using them does not block the event loop on file I/O or
+    compression.
+
+    Attributes:
+        memory: The in-process tier.
+        disk: The on-disk tier.
+    """
+
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[DiskCache] = None) -> None:
+        """Initialize a two-tier cache.
+
+        Args:
+            memory: The in-process tier. Defaults to a new MemoryCache.
+            disk: The on-disk tier. Defaults to a new DiskCache.
+        """
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk if disk is not None else DiskCache()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        return self._load(key)
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.disk.load(key)
+        if data is None:
+            return None
+        try:
+            value = decode(data)
+        except ValueError:
+            return self.disk.get(key)
+        self.memory.set(key, value, size=len(data))
+        return value
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.memory.set(key, value, size=self._store(key, value))
+
+    def _store(self, key: str, value: Dict[str, Any]) -> int:
+        data = encode(value)
+        self.disk.store(key, data)
+        return len(data)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        return await asyncio.get_running_loop().run_in_executor(None, self._load, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        size = await asyncio.get_running_loop().run_in_executor(None, self._store, key, value)
+        self.memory.set(key, value, size=size)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.disk.clear()
+
+
+class BpsCache:
+    """Size-bounded cache of base BPS patches, keyed by patch md5.
+
+    Patches are stored uncompressed as ``<md5>.bps`` in ``directory`` and the
+    least recently used ones are removed once the directory holds more than
+    ``max_bytes``, so patches for old randomizer versions age out.  Recently
+    used patches are also kept in memory, so a hot patch is read from disk at
+    most once.
+
+    Patches are checked against the CRC32 in their BPS footer before they are
+    stored and when they are read from disk, and corrupt files are discarded.
+
+    Attributes:
+        files: The store holding the patch files.
+        memory: The in-memory layer.
+        hits: Number of lookups that found a patch, in memory or on disk.
+        misses: Number of lookups that did not.
+    """
+
+    SUFFIX = '.bps'
+    LOCK_DIRECTORY = 'locks'
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_BPS_BYTES,
+        memory_bytes: int = DEFAULT_BPS_MEMORY_BYTES,
+    ) -> None:
+        """Initialize a BPS cache.
+
+        Args:
+            directory: Directory to store patches in. Defaults to :func:`bps_directory`.
+            max_bytes: Maximum total size of the patch files. Defaults to 256 MiB.
+            memory_bytes: Maximum total size of patches kept in memory. Defaults to 8 MiB.
+        """
+        self.files = FileStore(directory or bps_directory(), max_bytes, self.SUFFIX)
+        self.memory: MemoryStore[bytes] = MemoryStore(memory_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        """Directory the patches are stored in."""
+        return self.files.directory
+
+    @property
+    def max_bytes(self) -> int:
+        """Maximum total size of the patch files, in bytes."""
+        return self.files.max_bytes
+
+    def load(self, md5: str) -> Optional[bytes]:
+        """Read a patch from disk, bypassing the in-memory layer.
+
+        Args:
+            md5: The patch md5.
+
+        Returns:
+            The patch, or None if it is not on disk or fails verification.
+        """
+        data = self.files.load(md5)
+        if data is not None and not verify_bps(data):
+            logger.warning(f"Discarding corrupt BPS patch {self.files.path(md5)}")
+            self.files.remove(md5)
+            return None
+        return data
+
+    @asynccontextmanager
+    async def locked(self, md5: str) -> AsyncIterator[None]:
+        """Hold the exclusive, cross-process download lock of a patch.
+
+        Use this around checking the cache and downloading a patch, so that
+        only one process downloads it and the others find it cached once they
+        get the lock.  Each patch has its own lock file, ``<md5>.lock`` in the
+        :attr:`LOCK_DIRECTORY` subdirectory, so different patches download in
+        parallel.  The lock is waited for in a small dedicated executor, so
+        waiting neither blocks the event loop nor ties up the threads of the
+        default executor.
+
+        Args:
+            md5: The patch md5.
+        """
+        path = self.directory / self.LOCK_DIRECTORY / f'{md5}.lock'
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_lock_executor(), _lock_file, path)
+        try:
+            fd = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # the executor may still get the lock after we stop waiting for it
+            future.add_done_callback(
+                lambda f: _unlock_file(f.result()) if not f.cancelled() and f.exception() is None else None)
+            raise
+        try:
+            yield
+        finally:
+            _unlock_file(fd)
+
+    def get(self, md5: str) -> Optional[bytes]:
+        """Look up a cached patch.
+
+        Args:
+            md5: The patch md5, as reported by the ``/api/h`` endpoint.
+
+        Returns:
+            The patch, or None on a miss.
+        """
+        data = self.memory.get(md5)
+        if data is None:
+            data = self.load(md5)
+            if data is not None:
+                self.memory.set(md5, data, len(data))
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def set(self, md5: str, data: bytes) -> None:
+        """Store a patch in memory and on disk.
+
+        Args:
+            md5: The patch md5, as reported by the ``/api/h`` endpoint.
+            data: The patch.
+        """
+        if not verify_bps(data):
+            logger.warning(f"Not caching BPS patch {md5}, it failed verification")
+            return
+        self.memory.set(md5, data, len(data))
+        self.files.store(md5, data)
+
+    def clear(self) -> None:
+        """Remove every patch from memory and disk."""
+        self.memory.clear()
+        self.files.clear()
+
+
+class BpsIndex:
+    """Persistent index from seeds to the metadata of their base BPS patch.
+
+    Entries are the ``{'md5': ..., 'bpsLocation': ...}`` documents returned by
+    the ``/api/h/<hash>`` endpoint, stored in ``index.json`` next to the cached
+    patches and keyed by seed.  The oldest keys are dropped once there are more
+    than ``max_entries``.
+
+    Attributes:
+        path: Path of the index file.
+        max_entries: Maximum number of keys kept.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = DEFAULT_BPS_INDEX_ENTRIES) -> None:
+        """Initialize an index, loading it from disk on first use.
+
+        Args:
+            path: Path of the index file. Defaults to ``index.json`` in the directory
+                of the default BPS cache.
+            max_entries: Maximum number of keys kept. Defaults to 10000.
+        """
+        self.path = Path(path) if path else get_default_bps_cache().directory / 'index.json'
+        self.max_entries = max_entries
+        self._entries: Optional[Dict[str, Dict[str, str]]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        if self._entries is None:
+            try:
+                with open(self.path, 'rb') as f:
+                    entries = jsoncodec.loads(f.read())
+                self._entries = entries if isinstance(entries, dict) else {}
+            except FileNotFoundError:
+                self._entries = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable BPS index {self.path}: {e}")
+                self._entries = {}
+        return self._entries
+
+    def get(self, *keys: str) -> Optional[Dict[str, str]]:
+        """Look up patch metadata by the first key that is present.
+
+        Args:
+            *keys: Keys to try, in order of preference.
+
+        Returns:
+            The patch metadata, or None if no key is indexed.
+        """
+        with self._lock:
+            entries = self._load()
+            for key in keys:
+                meta = entries.get(key)
+                if meta is not None:
+                    return meta
+        return None
+
+    def set(self, keys: Iterable[str], meta: Dict[str, str]) -> None:
+        """Record patch metadata under each of ``keys`` and save the index.
+
+        Args:
+            keys: Keys to index the metadata under.
+            meta: Document containing at least ``md5`` and ``bpsLocation``.
+        """
+        meta = {'md5': meta['md5'], 'bpsLocation': meta['bpsLocation']}
+        with self._lock:
+            entries = self._load()
+            for key in keys:
+                entries.pop(key, None)
+                entries[key] = meta
+            while len(entries) > self.max_entries:
+                del entries[next(iter(entries))]
+            data = jsoncodec.dumps(entries)
+            tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning(f"Unable to write BPS index {self.path}: {e}")
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+
+
+class BaseRomCache:
+    """In-memory cache of base ROM images with the base BPS patch already applied.
+
+    Images are keyed by the md5 of the input ROM and the md5 of the BPS patch,
+    and are stored as immutable bytes, so callers must copy them before
+    patching further.  The md5 of each input file is remembered by path, size
+    and modification time, so an unchanged input file is not read again.
+
+    Attributes:
+        images: LRU of the patched images.
+        max_sources: Maximum number of input files whose md5 is remembered.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_BASE_ROM_BYTES, max_sources: Optional[int] = None) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            max_bytes: Maximum total size of the cached images. Defaults to 32 MiB.
+            max_sources: Maximum number of input files whose md5 is remembered, least
+                recently used first out. Defaults to the number of 2 MiB images that
+                fit in ``max_bytes``.
+        """
+        self.images: MemoryStore[bytes] = MemoryStore(max_bytes)
+        self.max_sources: int = max_sources if max_sources is not None else max(1, max_bytes // BASE_ROM_IMAGE_BYTES)
+        self._sources: OrderedDict[Tuple[str, int, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[str, int, int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return os.path.realpath(path), st.st_size, st.st_mtime_ns
+
+    def source_hash(self, path: str) -> Optional[str]:
+        """Get the remembered md5 of an input ROM file.
+
+        Args:
+            path: Path of the input ROM.
+
+        Returns:
+            The md5 hex digest, or None if the file is unknown or has changed.
+        """
+        key = self._stat(path)
+        if key is None:
+            return None
+        with self._lock:
+            digest = self._sources.get(key)
+            if digest is not None:
+                self._sources.move_to_end(key)
+            return digest
+
+    def remember_source(self, path: str, data: Union[bytes, bytearray]) -> str:
+        """Hash the contents of an input ROM file and remember the result.
+
+        Args:
+            path: Path the ROM was read from.
+            data: The contents of the file.
+
+        Returns:
+            The md5 hex digest of ``data``.
+        """
+        digest = hashlib.md5(data).hexdigest()
+        key = self._stat(path)
+        if key is not None:
+            with self._lock:
+                self._sources[key] = digest
+                self._sources.move_to_end(key)
+                while len(self._sources) > self.max_sources:
+                    self._sources.popitem(last=False)
+        return digest
+
+    def get(self, source_md5: str, bps_md5: str) -> Optional[bytes]:
+        """Look up a patched base image.
+
+        Args:
+            source_md5: md5 of the input ROM.
+            bps_md5: md5 of the base BPS patch.
+
+        Returns:
+            The image, or None on a miss.
+        """
+        return self.images.get(f'{source_md5}:{bps_md5}')
+
+    def set(self, source_md5: str, bps_md5: str, image: bytes) -> None:
+        """Store a patched base image.
+
+        Args:
+            source_md5: md5 of the input ROM.
+            bps_md5: md5 of the base BPS patch.
+            image: The input ROM with the base patch applied.
+        """
+        self.images.set(f'{source_md5}:{bps_md5}', bytes(image), len(image))
+
+    def clear(self) -> None:
+        """Remove all images and remembered input files."""
+        self.images.clear()
+        with self._lock:
+            self._sources.clear()
+
+
+class SeedRomCache:
+    """In-memory cache of patched seed ROMs without cosmetics applied.
+
+    Every player of a seed gets the same ROM until heart speed, heart color,
+    menu speed, quickswap, music and sprite are applied, so that ROM is kept
+    here, with the sum of its bytes, and each player's game starts from a
+    copy of it.  Images are keyed by the md5 of the input ROM and the seed's
+    URL, and are stored as immutable bytes.
+
+    Attributes:
+        images: LRU of ``(image, byte_sum)`` pairs.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_SEED_ROM_BYTES) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            max_bytes: Maximum total size of the cached images. Defaults to 64 MiB.
+        """
+        self.images: MemoryStore[Tuple[bytes, int]] = MemoryStore(max_bytes)
+
+    def get(self, source_md5: str, seed: str) -> Optional[Tuple[bytes, int]]:
+        """Look up a seed's ROM.
+
+        Args:
+            source_md5: md5 of the input ROM.
+            seed: URL of the seed.
+
+        Returns:
+            The image and the sum of its bytes, or None on a miss.
+        """
+        return self.images.get(f'{source_md5}:{seed}')
+
+    def set(self, source_md5: str, seed: str, image: Union[bytes, bytearray], byte_sum: int) -> None:
+        """Store a seed's ROM.
+
+        Args:
+            source_md5: md5 of the input ROM.
+            seed: URL of the seed.
+            image: The ROM with the base patch and the seed's patches applied.
+            byte_sum: The sum of the bytes of ``image``.
+        """
+        self.images.set(f'{source_md5}:{seed}', (bytes(image), byte_sum), len(image))
+
+    def clear(self) -> None:
+        """Remove all images."""
+        self.images.clear()
+
+
+_default_seed_cache: Optional[SeedCache] = None
+_default_base_rom_cache: Optional[BaseRomCache] = None
+_default_seed_rom_cache: Optional[SeedRomCache] = None
+_default_bps_cache: Optional[BpsCache] = None
+_default_bps_index: Optional[BpsIndex] = None
+
+
+def get_default_seed_cache() -> SeedCache:
+    """Get the process-wide seed cache used by clients that are not given one.
+
+    Returns:
+        The default cache, creating a :class:`TieredCache` on first use.
+    """
+    global _default_seed_cache
+    if _default_seed_cache is None:
+        _default_seed_cache = TieredCache()
+    return _default_seed_cache
+
+
+def set_default_seed_cache(seed_cache: Optional[SeedCache]) -> None:
+    """Replace the process-wide seed cache.
+
+    Args:
+        seed_cache: The new default cache. Pass ``SeedCache()`` to disable
+            caching, or None to go back to a new TieredCache on next use.
+    """
+    global _default_seed_cache
+    _default_seed_cache = seed_cache
+
+
+def get_default_bps_cache() -> BpsCache:
+    """Get the process-wide BPS patch cache.
+
+    Returns:
+        The default cache, creating one in :func:`bps_directory` on first use.
+    """
+    global _default_bps_cache
+    if _default_bps_cache is None:
+        _default_bps_cache = BpsCache()
+    return _default_bps_cache
+
+
+def set_default_bps_cache(bps_cache: Optional[BpsCache]) -> None:
+    """Replace the process-wide BPS patch cache.
+
+    Args:
+        bps_cache: The new default cache, or None to go back to the default on next use.
+    """
+    global _default_bps_cache
+    _default_bps_cache = bps_cache
+
+
+def get_default_bps_index() -> BpsIndex:
+    """Get the process-wide BPS patch index.
+
+    Returns:
+        The default index, creating one next to the default BPS cache on first use.
+    """
+    global _default_bps_index
+    if _default_bps_index is None:
+        _default_bps_index = BpsIndex()
+    return _default_bps_index
+
+
+def set_default_bps_index(bps_index: Optional[BpsIndex]) -> None:
+    """Replace the process-wide BPS patch index.
+
+    Args:
+        bps_index: The new default index, or None to go back to the default on next use.
+    """
+    global _default_bps_index
+    _default_bps_index = bps_index
+
+
+def get_default_base_rom_cache() -> BaseRomCache:
+    """Get the process-wide cache of patched base ROM images.
+
+    Returns:
+        The default cache, creating one on first use.
+    """
+    global _default_base_rom_cache
+    if _default_base_rom_cache is None:
+        _default_base_rom_cache = BaseRomCache()
+    return _default_base_rom_cache
+
+
+def set_default_base_rom_cache(base_rom_cache: Optional[BaseRomCache]) -> None:
+    """Replace the process-wide cache of patched base ROM images.
+
+    Args:
+        base_rom_cache: The new default cache. Pass ``BaseRomCache(max_bytes=0)`` to
+            disable caching, or None to go back to the default on next use.
+    """
+    global _default_base_rom_cache
+    _default_base_rom_cache = base_rom_cache
+
+
+def get_default_seed_rom_cache() -> SeedRomCache:
+    """Get the process-wide cache of patched seed ROMs without cosmetics.
+
+    Returns:
+        The default cache, creating one on first use.
+    """
+    global _default_seed_rom_cache
+    if _default_seed_rom_cache is None:
+        _default_seed_rom_cache = SeedRomCache()
+    return _default_seed_rom_cache
+
+
+def set_default_seed_rom_cache(seed_rom_cache: Optional[SeedRomCache]) -> None:
+    """Replace the process-wide cache of patched seed ROMs without cosmetics.
+
+    Args:
+        seed_rom_cache: The new default cache. Pass ``SeedRomCache(max_bytes=0)`` to
+            disable caching, or None to go back to the default on next use.
+    """
+    global _default_seed_rom_cache
+    _default_seed_rom_cache = seed_rom_cache
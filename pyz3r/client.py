@@ -0,0 +1,226 @@
+"""Shared HTTP client session support for the randomizer API clients.
+
+Every client in this library (:class:`~pyz3r.alttpr.ALTTPR`,
+:class:`~pyz3r.sm.smClass` and :class:`~pyz3r.smvaria.SuperMetroidVaria`)
+accepts an optional ``session`` argument.  When one is supplied, all requests
+made by that client go through it, so keep-alive connections, DNS lookups and
+TLS sessions are reused across calls.  Without a session, each request uses a
+one-shot connection, which was the historical behaviour of this library.
+
+Requests also wait on the rate limiter registered for their host, if any
+(see :mod:`pyz3r.ratelimit`).
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+import aiohttp
+
+from . import jsoncodec, ratelimit, retry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_LIMIT: int = 100
+DEFAULT_LIMIT_PER_HOST: int = 8
+DEFAULT_DNS_TTL: int = 300
+DEFAULT_KEEPALIVE_TIMEOUT: float = 30.0
+
+
+def create_session(
+    limit: int = DEFAULT_LIMIT,
+    limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+    ttl_dns_cache: Optional[int] = DEFAULT_DNS_TTL,
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    timeout: Optional[aiohttp.ClientTimeout] = None,
+    **kwargs: Any,
+) -> aiohttp.ClientSession:
+    """Create a pooled ``aiohttp.ClientSession`` suitable for sharing between clients.
+
+    The returned session is an async context manager, so the usual pattern is::
+
+        async with pyz3r.client.create_session() as session:
+            seed = await pyz3r.ALTTPR.generate(settings, session=session)
+            other = await pyz3r.sm(settings=sm_settings, session=session)
+
+    This must be called while an event loop is running.
+
+    Args:
+        limit: Total number of simultaneous connections in the pool.
+        limit_per_host: Maximum simultaneous connections to a single host.
+        ttl_dns_cache: Seconds to cache DNS lookups for. None caches forever.
+        keepalive_timeout: Seconds an idle keep-alive connection is kept open.
+        timeout: Optional default timeout for requests made with the session.
+        **kwargs: Additional arguments passed to ``aiohttp.ClientSession``.
+
+    Returns:
+        A new ``aiohttp.ClientSession``. The caller is responsible for closing it.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=ttl_dns_cache,
+        keepalive_timeout=keepalive_timeout,
+    )
+    if timeout is not None:
+        kwargs['timeout'] = timeout
+    logger.debug(f"Creating pooled client session (limit={limit}, limit_per_host={limit_per_host})")
+    return aiohttp.ClientSession(connector=connector, **kwargs)
+
+
+@asynccontextmanager
+async def request(
+    method: str,
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    rate_limiter: Optional[ratelimit.TokenBucket] = None,
+    **kwargs: Any,
+) -> AsyncIterator[aiohttp.ClientResponse]:
+    """Make an HTTP request, reusing ``session`` if one is provided.
+
+    Args:
+        method: HTTP method, such as 'get' or 'post'.
+        url: The full URL to request.
+        session: Optional shared session. If None, a one-shot request is made.
+        rate_limiter: Rate limiter to wait on. If None, the limiter registered
+            for the URL's host is used, if there is one.
+        **kwargs: Additional arguments passed to ``aiohttp``.
+
+    Yields:
+        The ``aiohttp.ClientResponse``.
+    """
+    limiter = rate_limiter if rate_limiter is not None else ratelimit.get_rate_limiter(url)
+    if limiter is not None:
+        await limiter.acquire()
+
+    context: AsyncContextManager[aiohttp.ClientResponse]
+    if session is None:
+        context = aiohttp.request(method=method, url=url, **kwargs)
+    else:
+        context = session.request(method=method, url=url, **kwargs)
+    async with context as resp:
+        yield resp
+
+
+async def fetch_json(
+    method: str,
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    retry_policy: Optional[retry.RetryPolicy] = None,
+    rate_limiter: Optional[ratelimit.TokenBucket] = None,
+    content_type: Optional[str] = 'application/json',
+    loads: Optional[Callable[[str], Any]] = None,
+    **kwargs: Any,
+) -> Any:
+    """Make an HTTP request under a retry policy and decode the JSON response.
+
+    Args:
+        method: HTTP method, such as 'get' or 'post'.
+        url: The full URL to request.
+        session: Optional shared session. If None, one-shot requests are made.
+        retry_policy: Retry policy to use. Defaults to ``retry.DEFAULT_RETRY_POLICY``.
+        rate_limiter: Rate limiter to wait on before each attempt. Defaults to
+            the limiter registered for the URL's host, if any.
+        content_type: Expected response content type, or None to skip the check.
+        loads: Function that decodes the response text. Defaults to
+            :func:`pyz3r.jsoncodec.loads`.
+        **kwargs: Additional arguments passed to ``aiohttp``.
+
+    Returns:
+        The decoded JSON document.
+
+    Raises:
+        aiohttp.ClientError: From the last attempt, if the request did not succeed.
+    """
+    kwargs.setdefault('raise_for_status', True)
+
+    async def attempt() -> Any:
+        async with request(method, url, session=session, rate_limiter=rate_limiter, **kwargs) as resp:
+            return await resp.json(content_type=content_type, loads=loads if loads is not None else jsoncodec.loads)
+
+    policy = retry_policy if retry_policy is not None else retry.DEFAULT_RETRY_POLICY
+    return await policy.call(attempt)
+
+
+async def fetch_bytes(
+    method: str,
+    url: str,
+    session: Optional[aiohttp.ClientSession] = None,
+    retry_policy: Optional[retry.RetryPolicy] = None,
+    rate_limiter: Optional[ratelimit.TokenBucket] = None,
+    **kwargs: Any,
+) -> bytes:
+    """Make an HTTP request under a retry policy and return the raw response body.
+
+    Args:
+        method: HTTP method, such as 'get' or 'post'.
+        url: The full URL to request.
+        session: Optional shared session. If None, one-shot requests are made.
+        retry_policy: Retry policy to use. Defaults to ``retry.DEFAULT_RETRY_POLICY``.
+        rate_limiter: Rate limiter to wait on before each attempt. Defaults to
+            the limiter registered for the URL's host, if any.
+        **kwargs: Additional arguments passed to ``aiohttp``.
+
+    Returns:
+        The response body.
+
+    Raises:
+        aiohttp.ClientError: From the last attempt, if the request did not succeed.
+    """
+    kwargs.setdefault('raise_for_status', True)
+
+    async def attempt() -> bytes:
+        async with request(method, url, session=session, rate_limiter=rate_limiter, **kwargs) as resp:
+            return await resp.read()
+
+    policy = retry_policy if retry_policy is not None else retry.DEFAULT_RETRY_POLICY
+    return await policy.call(attempt)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single in-flight call.
+
+    While a call for a key is running, later callers for that key wait for it
+    and receive the same result (or exception) instead of starting their own.
+    Once the call finishes the key is forgotten, so the next caller starts a
+    fresh one.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty set of in-flight calls."""
+        self._calls: Dict[Hashable, asyncio.Future[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn``, or join the call already in flight for ``key``.
+
+        Cancelling one waiter does not cancel the shared call for the others.
+
+        Args:
+            key: Identifies calls that may share a result.
+            fn: Zero-argument coroutine function to run if no call is in flight.
+
+        Returns:
+            The result of the shared call.
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            logger.debug(f"Joining in-flight request for {key!r}")
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: 'asyncio.Future[Any]') -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # mark the exception as retrieved in case every waiter was cancelled
+            future.exception()
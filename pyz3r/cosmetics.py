@@ -0,0 +1,209 @@
+"""Cosmetic ROM settings and precompiled presets of them.
+
+The functions here describe each cosmetic setting as the ``(offset, value)``
+writes it makes, and are what the cosmetic methods of :class:`pyz3r.rom.Rom`
+apply.  A :class:`CosmeticPreset` compiles a full set of choices for one ROM
+version into a single write list, so a web patcher that sees the same few
+combinations over and over builds each of them once.
+"""
+
+import functools
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .exceptions import Pyz3rException
+
+Writes = List[Tuple[int, int]]
+
+HEART_SPEEDS: Dict[str, int] = {
+    'off': 0,
+    'double': 16,
+    'normal': 32,
+    'half': 64,
+    'quarter': 128,
+}
+
+HEART_COLORS: Dict[str, int] = {
+    'blue': 0x01,
+    'green': 0x02,
+    'yellow': 0x03,
+    'red': 0x00,
+}
+
+# (HUD byte, file select byte) for ROMs before version 4
+LEGACY_HEART_COLORS: Dict[str, Tuple[int, int]] = {
+    'blue': (44, 13),
+    'green': (60, 25),
+    'yellow': (40, 9),
+    'red': (36, 5),
+}
+LEGACY_HEART_OFFSETS = range(0x6fa1e, 0x6fa31, 2)
+
+MENU_SPEEDS: Dict[str, int] = {
+    'instant': 0xE8,
+    'fast': 0x10,
+    'normal': 0x08,
+    'slow': 0x04,
+}
+
+
+def heart_speed_writes(speed: str) -> Writes:
+    """Writes that set the low-health beep interval. See :meth:`pyz3r.rom.Rom.heart_speed`."""
+    return [(0x180033, HEART_SPEEDS[speed])]
+
+
+def heart_color_writes(color: str, rom_version: int) -> Writes:
+    """Writes that set the heart color. See :meth:`pyz3r.rom.Rom.heart_color`.
+
+    Raises:
+        Pyz3rException: If an unknown heart color is specified for a version 4 or later ROM.
+    """
+    if rom_version >= 4:
+        try:
+            return [(0x187020, HEART_COLORS[color])]
+        except KeyError:
+            raise Pyz3rException(f'Unknown heart color: {color}')
+    byte, file_byte = LEGACY_HEART_COLORS[color]
+    return [(offset, byte) for offset in LEGACY_HEART_OFFSETS] + [(0x65561, file_byte)]
+
+
+def music_writes(music: bool) -> Writes:
+    """Writes that enable or disable the music. See :meth:`pyz3r.rom.Rom.music`."""
+    return [(0x18021a, 0x00 if music else 0x01)]
+
+
+def msu1_resume_writes(enable: bool) -> Writes:
+    """Writes that enable or disable MSU-1 resume. See :meth:`pyz3r.rom.Rom.msu1_resume`."""
+    return [] if enable else [(0x18021D, 0x00), (0x18021E, 0x00)]
+
+
+def quickswap_writes(quickswap: bool) -> Writes:
+    """Writes that enable or disable quickswap. See :meth:`pyz3r.rom.Rom.quickswap`."""
+    return [(0x18004b, 0x01 if quickswap else 0x00)]
+
+
+def reduce_flashing_writes(enable: bool) -> Writes:
+    """Writes that enable or disable reduced flashing. See :meth:`pyz3r.rom.Rom.reduce_flashing`."""
+    return [(0x18017f, 0x01 if enable else 0x00)]
+
+
+def menu_speed_writes(speed: str) -> Writes:
+    """Writes that set the menu speed. See :meth:`pyz3r.rom.Rom.menu_speed`."""
+    instant = speed == 'instant'
+    return [
+        (0x180048, MENU_SPEEDS[speed]),
+        (0x6dd9a, 0x20 if instant else 0x11),
+        (0x6df2a, 0x20 if instant else 0x12),
+        (0x6e0e9, 0x20 if instant else 0x12),
+    ]
+
+
+class CosmeticPreset:
+    """A set of cosmetic choices compiled into one list of byte writes.
+
+    Presets are immutable, and :meth:`compile` caches them, so the same
+    preset object is shared by every ROM it is applied to.
+
+    Attributes:
+        offsets: Offsets written, in the order the settings are applied.
+        values: The byte written at each offset.
+        value_sum: Sum of ``values``, used to update a ROM's checksum.
+        end: One past the highest offset written, or 0 for an empty preset.
+    """
+
+    __slots__ = ('offsets', 'values', 'value_sum', 'end')
+
+    def __init__(self, writes: Iterable[Tuple[int, int]]) -> None:
+        """Initialize a preset from ``(offset, value)`` writes.
+
+        Where an offset is written more than once, the last write wins.
+
+        Args:
+            writes: The writes, in order.
+        """
+        merged = dict(writes)
+        self.offsets: Tuple[int, ...] = tuple(merged)
+        self.values: bytes = bytes(merged.values())
+        self.value_sum: int = sum(self.values)
+        self.end: int = max(self.offsets) + 1 if self.offsets else 0
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getstate__(self) -> Tuple[List[Tuple[int, int]]]:
+        return (list(zip(self.offsets, self.values)),)
+
+    def __setstate__(self, state: Tuple[List[Tuple[int, int]]]) -> None:
+        CosmeticPreset.__init__(self, state[0])
+
+    @classmethod
+    @functools.lru_cache(maxsize=256)
+    def compile(
+        cls,
+        rom_version: int,
+        heartspeed: str = 'half',
+        heartcolor: str = 'red',
+        menu_speed: str = 'normal',
+        quickswap: bool = False,
+        music: bool = True,
+        msu1_resume: bool = True,
+        reduce_flashing: Optional[bool] = None,
+    ) -> 'CosmeticPreset':
+        """Compile cosmetic choices for a ROM version, reusing an earlier preset if possible.
+
+        The defaults match :meth:`pyz3r.alttpr.ALTTPR.create_patched_game`.
+
+        Args:
+            rom_version: The ROM's :attr:`~pyz3r.rom.Rom.rom_version`.
+            heartspeed: Low health beep speed.
+            heartcolor: Heart color on the HUD.
+            menu_speed: Menu speed.
+            quickswap: Enable quickswap.
+            music: Enable in-game music.
+            msu1_resume: Enable the MSU-1 resume feature.
+            reduce_flashing: Enable or disable reduced flashing, or None to leave it as is.
+
+        Returns:
+            The preset.
+
+        Raises:
+            Pyz3rException: If an unknown heart color is specified for a version 4 or later ROM.
+            KeyError: If another setting has an unknown value.
+        """
+        writes = (
+            heart_speed_writes(heartspeed)
+            + heart_color_writes(heartcolor, rom_version)
+            + menu_speed_writes(menu_speed)
+            + quickswap_writes(quickswap)
+            + music_writes(music)
+            + msu1_resume_writes(msu1_resume)
+        )
+        if reduce_flashing is not None:
+            writes += reduce_flashing_writes(reduce_flashing)
+        return cls(writes)
+
+    def check_bounds(self, length: int) -> None:
+        """Check that the preset fits in a ROM of ``length`` bytes.
+
+        Args:
+            length: Size of the ROM in bytes.
+
+        Raises:
+            Pyz3rException: If the preset writes past the end of the ROM.
+        """
+        if self.end > length:
+            raise Pyz3rException(
+                f'Cosmetics write up to offset {self.end - 1:#x}, beyond the end of the {length:#x} byte ROM')
+
+    def apply(self, rom: bytearray) -> None:
+        """Apply the preset to a ROM image in place.
+
+        Args:
+            rom: The ROM image.
+
+        Raises:
+            Pyz3rException: If the preset writes past the end of the ROM. Nothing
+                is written in that case.
+        """
+        self.check_bounds(len(rom))
+        for offset, value in zip(self.offsets, self.values):
+            rom[offset] = value
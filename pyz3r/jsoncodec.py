@@ -0,0 +1,122 @@
+"""JSON encoding and decoding with the fastest available library.
+
+Seed payloads are large and made up almost entirely of numbers, and decoding
+them is most of the CPU time spent retrieving games.  This module decodes
+with `orjson <https://pypi.org/project/orjson/>`_ or
+`ujson <https://pypi.org/project/ujson/>`_ when one is installed, and the
+standard library's :mod:`json` otherwise.  Neither is a dependency of pyz3r;
+install one to use it.  :func:`set_backend` picks a specific library.
+
+Whichever library is used, decoding errors are raised as
+:class:`json.JSONDecodeError`.
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional, Union
+
+from .exceptions import Pyz3rException
+from .patches import PackedPatches
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import ujson
+except ImportError:
+    ujson = None  # type: ignore[assignment, unused-ignore]
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+_backend: str = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+
+
+def get_backend() -> str:
+    """The name of the library in use: ``'orjson'``, ``'ujson'`` or ``'json'``."""
+    return _backend
+
+
+def set_backend(name: Optional[str] = None) -> None:
+    """Choose the JSON library to use.
+
+    Args:
+        name: One of :data:`BACKENDS`, or None for the fastest one installed.
+
+    Raises:
+        Pyz3rException: If the library is unknown or not installed.
+    """
+    global _backend
+    if name is None:
+        _backend = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+        return
+    if name not in BACKENDS:
+        raise Pyz3rException(f'Unknown JSON backend: {name}')
+    if (name == 'orjson' and orjson is None) or (name == 'ujson' and ujson is None):
+        raise Pyz3rException(f'JSON backend {name} is not installed')
+    _backend = name
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Decode a JSON document.
+
+    Args:
+        data: The document, as text or UTF-8 encoded bytes.
+
+    Returns:
+        The decoded value.
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON.
+    """
+    if _backend == 'orjson':
+        return orjson.loads(data)
+    if _backend == 'ujson':
+        try:
+            return ujson.loads(data)
+        except ValueError as e:
+            doc = data if isinstance(data, str) else bytes(data).decode('utf-8', 'replace')
+            raise json.JSONDecodeError(str(e), doc, 0) from e
+    return json.loads(data)
+
+
+def loads_seed(data: Union[str, bytes, bytearray]) -> Dict[str, Any]:
+    """Decode a seed payload, with its ``patch`` list packed.
+
+    The patch list is packed as soon as it is decoded, so only the
+    :class:`~pyz3r.patches.PackedPatches` outlives the call.
+
+    Args:
+        data: The document, as text or UTF-8 encoded bytes.
+
+    Returns:
+        The seed data, with ``data['patch']`` a :class:`~pyz3r.patches.PackedPatches`
+        if the document has a patch list.
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON.
+        Pyz3rException: If the patch list is invalid.
+    """
+    value: Dict[str, Any] = loads(data)
+    if isinstance(value, dict) and isinstance(value.get('patch'), list):
+        value['patch'] = PackedPatches.pack(value['patch'])
+    return value
+
+
+def dumps(value: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Encode a value as compact JSON.
+
+    Args:
+        value: The value to encode.
+        default: Called with objects the library cannot encode itself, and
+            returns an encodable replacement or raises TypeError.
+
+    Returns:
+        UTF-8 encoded JSON, without whitespace between elements.
+    """
+    if _backend == 'orjson':
+        return orjson.dumps(value, default=default)
+    if _backend == 'ujson':
+        text: str = ujson.dumps(value, default=default, ensure_ascii=False)
+        return text.encode('utf-8')
+    return json.dumps(value, separators=(',', ':'), default=default).encode('utf-8')
@@ -1,7 +1,8 @@
 """Miscellaneous utility functions for pyz3r."""
 
 from typing import Iterator, TypeVar, Tuple, List, Dict, Any, Generator
-import bisect
+
+from .patches import PatchIndex, Patches
 
 T = TypeVar('T')
 
@@ -24,39 +25,30 @@ def chunk(iterator: Iterator[T], count: int) -> Generator[Tuple[T, ...], None, N
             return
 
 
-def seek_patch_data(patches: List[Dict[str, List[int]]], offset: int, num_bytes: int) -> List[int]:
+def seek_patch_data(patches: Patches, offset: int, num_bytes: int) -> List[int]:
     """Seek and extract bytes from patch data at a specific offset.
     
+    This indexes the whole patch list on every call; for repeated lookups
+    into one seed, build a :class:`pyz3r.patches.PatchIndex` once instead
+    (:attr:`pyz3r.alttpr.ALTTPR.patch_index`).
+
     Args:
-        patches: List of patch dictionaries containing offset-to-bytes mappings.
+        patches: List of patch dictionaries containing offset-to-bytes mappings,
+            or :class:`pyz3r.patches.PackedPatches`.
         offset: The byte offset to seek to.
         num_bytes: Number of bytes to extract.
         
     Returns:
-        A list of bytes at the specified offset.
+        A list of bytes at the specified offset. It is shorter than ``num_bytes``
+        if the patched bytes end first.
         
     Raises:
         ValueError: If the offset is not found in the patches.
     """
-    offsetlist = []
-    for patch in patches:
-        for key, value in patch.items():
-            offsetlist.append(int(key))
-    offsetlist_sorted = sorted(offsetlist)
-    i = bisect.bisect_left(offsetlist_sorted, offset)
-    if i:
-        if offsetlist_sorted[i] == offset:
-            seek = str(offset)
-            for patch in patches:
-                if seek in patch:
-                    return patch[seek][:num_bytes]
-        else:
-            left_slice = offset - offsetlist_sorted[i - 1]
-            for patch in patches:
-                seek = str(offsetlist_sorted[i - 1])
-                if seek in patch:
-                    return patch[seek][left_slice:left_slice + num_bytes]
-    raise ValueError
+    try:
+        return list(PatchIndex.compile(patches).read(offset, num_bytes))
+    except KeyError:
+        raise ValueError(f'Offset {offset} is not patched') from None
 
 
 def convert_randomizer_settings(web_dict: Dict[str, Any]) -> Dict[str, Any]:
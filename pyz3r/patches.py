@@ -0,0 +1,368 @@
+"""Compiled forms of the seed patch lists returned by the randomizer APIs.
+
+Seed data carries its ROM changes as a list of single-entry dictionaries,
+``[{"<offset>": [byte, ...]}, ...]``.  Applying that list directly costs a
+string-to-int conversion and a Python-level write per byte.  A
+:class:`PatchPlan` converts it once into sorted, coalesced ``(offset, bytes)``
+ranges that are applied with slice assignment, or with a single NumPy scatter
+when NumPy is installed.  A :class:`PatchIndex` answers "which bytes does the
+seed write at this offset" over the same ranges with a binary search.
+:class:`PackedPatches` holds a patch list in a few flat buffers instead of
+one Python int per patched byte, for keeping many seeds in memory.
+"""
+
+import bisect
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .exceptions import Pyz3rException
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment, unused-ignore]
+
+# plans with at least this many ranges are applied with NumPy when it is available
+NUMPY_MIN_RANGES: int = 512
+
+# array typecode for patch offsets and lengths, at least 32 bits wide
+_UINT32 = 'I' if array('I').itemsize >= 4 else 'L'
+
+
+class PackedPatches:
+    """A seed patch list packed into flat arrays.
+
+    Holds the same patches, in the same order, as the list of
+    ``{"<offset>": [byte, ...]}`` dictionaries it was built from, in two
+    32-bit arrays and one bytes object.
+
+    Attributes:
+        offsets: Offset of each patch.
+        lengths: Number of bytes in each patch.
+        blob: The bytes of every patch, concatenated in order.
+    """
+
+    __slots__ = ('offsets', 'lengths', 'blob')
+
+    def __init__(self, offsets: 'array[int]', lengths: 'array[int]', blob: bytes) -> None:
+        """Initialize from already packed data. Use :meth:`pack` to pack a patch list.
+
+        Args:
+            offsets: Offset of each patch.
+            lengths: Number of bytes in each patch.
+            blob: The bytes of every patch, concatenated in order.
+
+        Raises:
+            Pyz3rException: If the arrays differ in length or do not match the blob.
+        """
+        if len(offsets) != len(lengths) or sum(lengths) != len(blob):
+            raise Pyz3rException('Packed patch offsets, lengths and data do not match')
+        self.offsets = offsets
+        self.lengths = lengths
+        self.blob = blob
+
+    @classmethod
+    def pack(cls, patches: 'Patches') -> 'PackedPatches':
+        """Pack seed patch data.
+
+        Args:
+            patches: A list of dictionaries mapping byte offsets to lists of byte
+                values, or an already packed list, which is returned as is.
+
+        Returns:
+            The packed patches.
+
+        Raises:
+            Pyz3rException: If an offset is negative or not an integer, or a value is not a byte.
+        """
+        if isinstance(patches, PackedPatches):
+            return patches
+        offsets = array(_UINT32)
+        lengths = array(_UINT32)
+        chunks = []
+        try:
+            for patch in patches:
+                for key, values in patch.items():
+                    offset = int(key)
+                    if offset < 0:
+                        raise Pyz3rException(f'Patch offset {offset} is negative')
+                    data = bytes(values)
+                    offsets.append(offset)
+                    lengths.append(len(data))
+                    chunks.append(data)
+        except (ValueError, TypeError, OverflowError) as e:
+            raise Pyz3rException(f'Invalid patch data: {e}') from e
+        return cls(offsets, lengths, b''.join(chunks))
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        """Iterate over ``(offset, data)`` pairs, in patch list order."""
+        blob = self.blob
+        pos = 0
+        for offset, length in zip(self.offsets, self.lengths):
+            yield offset, blob[pos:pos + length]
+            pos += length
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, PackedPatches):
+            return NotImplemented
+        return (self.offsets, self.lengths, self.blob) == (other.offsets, other.lengths, other.blob)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the packed buffers, in bytes."""
+        return len(self.offsets) * self.offsets.itemsize + len(self.lengths) * self.lengths.itemsize + len(self.blob)
+
+    def to_list(self) -> List[Dict[str, List[int]]]:
+        """Unpack into the patch list format used by the randomizer APIs.
+
+        Returns:
+            A list of single-entry dictionaries mapping byte offsets to lists of byte values.
+        """
+        return [{str(offset): list(data)} for offset, data in self]
+
+
+Patches = Union[List[Dict[str, List[int]]], PackedPatches]
+
+
+def iter_patches(patches: Patches) -> Iterator[Tuple[int, Sequence[int]]]:
+    """Iterate over a patch list or packed patches as ``(offset, values)`` pairs.
+
+    Args:
+        patches: A list of dictionaries mapping byte offsets to lists of byte values,
+            or packed patches.
+
+    Yields:
+        The integer offset and byte values of each patch, in list order.
+    """
+    if isinstance(patches, PackedPatches):
+        yield from patches
+        return
+    for patch in patches:
+        for key, values in patch.items():
+            yield int(key), values
+
+
+class PatchPlan:
+    """A patch list compiled into sorted, non-overlapping byte ranges.
+
+    Where patches in the source list overlap, later patches win, as they
+    would if the list were applied in order.
+
+    Attributes:
+        ranges: ``(offset, data)`` pairs, sorted by offset, with adjacent ranges merged.
+        start: Lowest offset written, or 0 for an empty plan.
+        end: One past the highest offset written, or 0 for an empty plan.
+    """
+
+    __slots__ = ('ranges', 'start', 'end', '_scatter')
+
+    def __init__(self, ranges: Sequence[Tuple[int, bytes]]) -> None:
+        """Initialize a plan from ranges that are already sorted and non-overlapping.
+
+        Use :meth:`compile` to build a plan from seed patch data.
+
+        Args:
+            ranges: ``(offset, data)`` pairs.
+        """
+        self.ranges: List[Tuple[int, bytes]] = list(ranges)
+        self.start: int = self.ranges[0][0] if self.ranges else 0
+        self.end: int = self.ranges[-1][0] + len(self.ranges[-1][1]) if self.ranges else 0
+        self._scatter: Optional[Tuple[Any, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def __getstate__(self) -> Tuple[List[Tuple[int, bytes]]]:
+        return (self.ranges,)
+
+    def __setstate__(self, state: Tuple[List[Tuple[int, bytes]]]) -> None:
+        PatchPlan.__init__(self, state[0])
+
+    @property
+    def size(self) -> int:
+        """Total number of bytes the plan writes."""
+        return sum(len(data) for _, data in self.ranges)
+
+    @classmethod
+    def compile(cls, patches: Patches) -> 'PatchPlan':
+        """Compile seed patch data into a plan.
+
+        Args:
+            patches: A list of dictionaries mapping byte offsets to lists of byte values,
+                or packed patches.
+
+        Returns:
+            The compiled plan.
+
+        Raises:
+            Pyz3rException: If an offset is negative or not an integer, or a value is not a byte.
+        """
+        ranges: List[Tuple[int, bytes]]
+        if isinstance(patches, PackedPatches):
+            ranges = [(offset, data) for offset, data in patches if data]
+            return cls._from_unsorted(ranges)
+
+        ranges = []
+        try:
+            for patch in patches:
+                for key, values in patch.items():
+                    offset = int(key)
+                    if offset < 0:
+                        raise Pyz3rException(f'Patch offset {offset} is negative')
+                    if values:
+                        ranges.append((offset, bytes(values)))
+        except (ValueError, TypeError) as e:
+            raise Pyz3rException(f'Invalid patch data: {e}') from e
+        return cls._from_unsorted(ranges)
+
+    @classmethod
+    def _from_unsorted(cls, ranges: List[Tuple[int, bytes]]) -> 'PatchPlan':
+        """Build a plan from ranges in patch list order."""
+        # group ranges that touch or overlap into contiguous runs
+        ordered = sorted(range(len(ranges)), key=lambda n: ranges[n][0])
+        runs: List[List[int]] = []
+        run_end = -1
+        for n in ordered:
+            offset, data = ranges[n]
+            if runs and offset <= run_end:
+                runs[-1].append(n)
+                run_end = max(run_end, offset + len(data))
+            else:
+                runs.append([n])
+                run_end = offset + len(data)
+
+        return cls([cls._merge(ranges, run) for run in runs])
+
+    @staticmethod
+    def _merge(ranges: List[Tuple[int, bytes]], run: List[int]) -> Tuple[int, bytes]:
+        """Merge a contiguous run of ranges, given as indexes in offset order, into one range."""
+        start = ranges[run[0]][0]
+        end = -1
+        for n in run:
+            offset, data = ranges[n]
+            if offset < end:
+                break
+            end = offset + len(data)
+        else:
+            return start, b''.join(ranges[n][1] for n in run)
+
+        # overlapping ranges are painted in list order, so later patches win
+        end = max(ranges[n][0] + len(ranges[n][1]) for n in run)
+        canvas = bytearray(end - start)
+        for n in sorted(run):
+            offset, data = ranges[n]
+            canvas[offset - start:offset - start + len(data)] = data
+        return start, bytes(canvas)
+
+    def check_bounds(self, length: int) -> None:
+        """Check that the plan fits in a ROM of ``length`` bytes.
+
+        Args:
+            length: Size of the ROM in bytes.
+
+        Raises:
+            Pyz3rException: If the plan writes past the end of the ROM.
+        """
+        if self.end > length:
+            raise Pyz3rException(
+                f'Patch writes up to offset {self.end - 1:#x}, beyond the end of the {length:#x} byte ROM')
+
+    def apply(self, rom: bytearray, use_numpy: Optional[bool] = None) -> None:
+        """Apply the plan to a ROM image in place.
+
+        The whole plan is checked against the size of the ROM before anything
+        is written.
+
+        Args:
+            rom: The ROM image.
+            use_numpy: Apply with a single NumPy scatter. Defaults to True if
+                NumPy is installed and the plan has many ranges.
+
+        Raises:
+            Pyz3rException: If the plan writes past the end of the ROM, or
+                NumPy was requested but is not installed.
+        """
+        self.check_bounds(len(rom))
+        if use_numpy is None:
+            use_numpy = np is not None and len(self.ranges) >= NUMPY_MIN_RANGES
+        if use_numpy:
+            if np is None:
+                raise Pyz3rException('NumPy is required to apply patches with use_numpy=True')
+            indexes, values = self._scatter_arrays()
+            view = np.frombuffer(rom, dtype=np.uint8)
+            view[indexes] = values
+            del view
+        else:
+            for offset, data in self.ranges:
+                rom[offset:offset + len(data)] = data
+
+    def _scatter_arrays(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        if self._scatter is None:
+            indexes = np.concatenate([
+                np.arange(offset, offset + len(data), dtype=np.intp) for offset, data in self.ranges
+            ]) if self.ranges else np.zeros(0, dtype=np.intp)
+            values = np.frombuffer(b''.join(data for _, data in self.ranges), dtype=np.uint8)
+            self._scatter = (indexes, values)
+        return self._scatter
+
+
+class PatchIndex:
+    """Offset lookups into a seed's patches.
+
+    Built once per seed from a :class:`PatchPlan`, whose ranges are sorted and
+    merged where they touch, so a read that crosses from one patch into an
+    adjacent one is answered from a single range.  Lookups are O(log n) in the
+    number of ranges.
+
+    Attributes:
+        plan: The plan being indexed.
+    """
+
+    __slots__ = ('plan', '_starts')
+
+    def __init__(self, plan: PatchPlan) -> None:
+        """Index a compiled plan.
+
+        Args:
+            plan: The plan, e.g. from :meth:`PatchPlan.compile`.
+        """
+        self.plan = plan
+        self._starts = [offset for offset, _ in plan.ranges]
+
+    @classmethod
+    def compile(cls, patches: Patches) -> 'PatchIndex':
+        """Index seed patch data. See :meth:`PatchPlan.compile`."""
+        return cls(PatchPlan.compile(patches))
+
+    def _find(self, offset: int) -> Optional[Tuple[int, bytes]]:
+        i = bisect.bisect_right(self._starts, offset) - 1
+        if i < 0:
+            return None
+        start, data = self.plan.ranges[i]
+        return (start, data) if offset < start + len(data) else None
+
+    def __contains__(self, offset: int) -> bool:
+        return self._find(offset) is not None
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Read the bytes the seed writes starting at an offset.
+
+        Args:
+            offset: The ROM offset.
+            length: Number of bytes to read.
+
+        Returns:
+            Up to ``length`` bytes. Fewer are returned if the patched bytes end
+            before ``offset + length``.
+
+        Raises:
+            KeyError: If the seed does not write ``offset``.
+        """
+        found = self._find(offset)
+        if found is None:
+            raise KeyError(offset)
+        start, data = found
+        return data[offset - start:offset - start + length]
@@ -0,0 +1,136 @@
+"""Client-side rate limiting for the randomizer API clients.
+
+Rate limits are registered per base URL and shared by every client in the
+process that talks to that host::
+
+    pyz3r.ratelimit.set_rate_limit('https://alttpr.com', rate=2, burst=5)
+
+Once registered, every request the clients make to that host waits for
+capacity instead of being sent immediately.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """An asyncio token bucket.
+
+    Tokens are added continuously at ``rate`` per second, up to ``burst``.
+    Each request consumes one token, waiting until one is available.  Waiters
+    are served in the order they arrived.
+
+    Attributes:
+        rate: Tokens added per second.
+        burst: Maximum number of tokens the bucket holds.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Initialize a token bucket, initially full.
+
+        Args:
+            rate: Sustained requests per second. Must be positive.
+            burst: Maximum number of requests that may be sent back to back. Defaults to 1.
+
+        Raises:
+            ValueError: If rate is not positive or burst is less than 1.
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.rate = rate
+        self.burst = burst
+        self._tokens: float = float(burst)
+        self._updated: float = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        """The number of tokens currently available."""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        if self._lock is None:
+            # created lazily so the lock binds to the loop that uses it
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                wait = (1 - self._tokens) / self.rate
+                logger.debug(f"Rate limited, waiting {wait:.3f}s for capacity")
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= 1
+
+
+_limiters: Dict[str, TokenBucket] = {}
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _key(url: str) -> str:
+    """The origin of a URL: its scheme, host and any non-default port."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ''
+    if ':' in host:
+        host = f'[{host}]'
+    if parts.port is not None and parts.port != _DEFAULT_PORTS.get(scheme):
+        host += f':{parts.port}'
+    return f'{scheme}://{host}'
+
+
+def set_rate_limit(baseurl: str, rate: float, burst: int = 1) -> TokenBucket:
+    """Register a process-wide rate limit for a base URL.
+
+    Args:
+        baseurl: Base URL of the API, such as 'https://alttpr.com'.
+        rate: Sustained requests per second.
+        burst: Maximum number of requests that may be sent back to back. Defaults to 1.
+
+    Returns:
+        The TokenBucket now shared by all requests to that host.
+    """
+    limiter = TokenBucket(rate=rate, burst=burst)
+    _limiters[_key(baseurl)] = limiter
+    logger.debug(f"Rate limit for {baseurl} set to {rate}/s with burst {burst}")
+    return limiter
+
+
+def get_rate_limiter(url: str) -> Optional[TokenBucket]:
+    """Get the rate limiter registered for the host of ``url``.
+
+    Args:
+        url: A base URL or any full URL on that host.
+
+    Returns:
+        The registered TokenBucket, or None if the host is not rate limited.
+    """
+    if not _limiters:
+        return None
+    return _limiters.get(_key(url))
+
+
+def clear_rate_limit(baseurl: Optional[str] = None) -> None:
+    """Remove the rate limit for a base URL, or all rate limits.
+
+    Args:
+        baseurl: Base URL to remove the limit for. If None, all limits are removed.
+    """
+    if baseurl is None:
+        _limiters.clear()
+    else:
+        _limiters.pop(_key(baseurl), None)
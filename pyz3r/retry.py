@@ -0,0 +1,209 @@
+"""Retry policy shared by the randomizer API clients.
+
+All network calls made by :class:`~pyz3r.alttpr.ALTTPR`,
+:class:`~pyz3r.sm.smClass` and :class:`~pyz3r.smvaria.SuperMetroidVaria` go
+through a :class:`RetryPolicy`.  Failed requests are retried with exponential
+backoff and full jitter, ``Retry-After`` is honoured on 429 and 503 responses,
+and the whole operation is bounded by a total time budget.
+"""
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, FrozenSet, Optional, TypeVar
+
+import aiohttp
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+#: HTTP status codes that indicate a transient failure worth retrying.
+RETRYABLE_STATUSES: FrozenSet[int] = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+#: HTTP status codes for which a ``Retry-After`` header is honoured.
+RETRY_AFTER_STATUSES: FrozenSet[int] = frozenset({429, 503})
+
+
+class RetryPolicy:
+    """Configurable retry behaviour for API requests.
+
+    The delay before retry ``n`` is drawn uniformly from
+    ``[0, min(max_delay, base_delay * multiplier ** (n - 1))]``.  If the server
+    sent a ``Retry-After`` header with a 429 or 503 response, the delay is at
+    least that long.  No retry is started that would run past ``budget``.
+
+    Attributes:
+        attempts: Maximum number of attempts, including the first.
+        base_delay: Backoff ceiling, in seconds, before the first retry.
+        max_delay: Upper bound, in seconds, on the backoff ceiling.
+        multiplier: Factor the backoff ceiling grows by after each attempt.
+        jitter: If True, use full jitter. If False, always wait the full ceiling.
+        budget: Total seconds the operation may take, or None for no limit.
+        retry_statuses: HTTP status codes that are retried.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        multiplier: float = 2.0,
+        jitter: bool = True,
+        budget: Optional[float] = 120.0,
+        retry_statuses: FrozenSet[int] = RETRYABLE_STATUSES,
+    ) -> None:
+        """Initialize a retry policy.
+
+        Args:
+            attempts: Maximum number of attempts, including the first. Defaults to 5.
+            base_delay: Backoff ceiling in seconds before the first retry. Defaults to 0.5.
+            max_delay: Upper bound in seconds on the backoff ceiling. Defaults to 30.
+            multiplier: Growth factor of the backoff ceiling. Defaults to 2.
+            jitter: Whether to randomize delays (full jitter). Defaults to True.
+            budget: Total time budget in seconds, or None for no limit. Defaults to 120.
+            retry_statuses: HTTP status codes that should be retried.
+
+        Raises:
+            ValueError: If attempts is less than 1.
+        """
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.budget = budget
+        self.retry_statuses = retry_statuses
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        """Classify an exception as transient (retry) or permanent (give up).
+
+        Args:
+            exc: The exception raised by an attempt.
+
+        Returns:
+            True if the request should be retried.
+        """
+        if isinstance(exc, aiohttp.ClientResponseError):
+            return exc.status in self.retry_statuses
+        return isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+    def backoff(self, attempt_number: int) -> float:
+        """Get the backoff delay after a given failed attempt, ignoring ``Retry-After``.
+
+        Args:
+            attempt_number: The 1-based number of the attempt that just failed.
+
+        Returns:
+            Delay in seconds.
+        """
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** (attempt_number - 1))
+        return random.uniform(0, ceiling) if self.jitter else ceiling
+
+    def delay(self, attempt_number: int, exc: Optional[BaseException] = None) -> float:
+        """Get the delay before the next attempt.
+
+        Args:
+            attempt_number: The 1-based number of the attempt that just failed.
+            exc: The exception raised by that attempt.
+
+        Returns:
+            Delay in seconds.
+        """
+        delay = self.backoff(attempt_number)
+        if isinstance(exc, aiohttp.ClientResponseError) and exc.status in RETRY_AFTER_STATUSES:
+            retry_after = parse_retry_after(exc.headers.get('Retry-After') if exc.headers else None)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return delay
+
+    def retrying(self) -> AsyncRetrying:
+        """Build a tenacity ``AsyncRetrying`` controller for one operation.
+
+        Returns:
+            An ``AsyncRetrying`` instance that re-raises the last exception when it gives up.
+        """
+        delays: Dict[int, float] = {}
+
+        def next_delay(retry_state: RetryCallState) -> float:
+            # tenacity may evaluate stop and wait in either order, so the
+            # (randomized) delay is computed once per attempt and shared.
+            attempt_number = retry_state.attempt_number
+            if attempt_number not in delays:
+                exc = retry_state.outcome.exception() if retry_state.outcome else None
+                delays[attempt_number] = self.delay(attempt_number, exc)
+            return delays[attempt_number]
+
+        def should_stop(retry_state: RetryCallState) -> bool:
+            if retry_state.attempt_number >= self.attempts:
+                return True
+            if self.budget is None:
+                return False
+            elapsed = retry_state.seconds_since_start or 0.0
+            return elapsed + next_delay(retry_state) > self.budget
+
+        def log_retry(retry_state: RetryCallState) -> None:
+            exc = retry_state.outcome.exception() if retry_state.outcome else None
+            logger.warning(
+                f"Attempt {retry_state.attempt_number}/{self.attempts} failed: {exc!r}; "
+                f"retrying in {next_delay(retry_state):.2f}s"
+            )
+
+        return AsyncRetrying(
+            stop=should_stop,
+            wait=next_delay,
+            retry=retry_if_exception(self.is_retryable),
+            before_sleep=log_retry,
+            reraise=True,
+        )
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` under this policy.
+
+        Args:
+            fn: A zero-argument coroutine function making one attempt.
+
+        Returns:
+            The result of the first successful attempt.
+
+        Raises:
+            The exception from the last attempt if it was not retryable or the
+            policy gave up.
+        """
+        return await self.retrying()(fn)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a ``Retry-After`` header value.
+
+    Args:
+        value: The header value, either delay-seconds or an HTTP date.
+
+    Returns:
+        The number of seconds to wait, or None if the value is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+#: Policy used by clients that are not given one explicitly. Replace it to
+#: change the retry behaviour of the whole process.
+DEFAULT_RETRY_POLICY: RetryPolicy = RetryPolicy()
@@ -1,19 +1,48 @@
 """ROM manipulation utilities for ALTTPR."""
 
-from typing import List, Dict, Union, Optional
-import io
+from typing import Sequence, Union, Optional
 import itertools
+import mmap
 
-import bps.apply
+import aiofiles
 
+from . import bpspatch, cosmetics
+from .cosmetics import CosmeticPreset
 from .exceptions import Pyz3rException
+from .patches import PatchPlan, Patches
+from .zspr import ZsprSprite
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore[assignment, unused-ignore]
+
+# bytes 0x7FDB-0x7FDF are left out of the checksum
+CHECKSUM_EXCLUDE = slice(32731, 32736)
+
+
+def _byte_sum(data: Union[bytes, bytearray, memoryview, mmap.mmap]) -> int:
+    """Sum every byte of a buffer, with NumPy when it is installed."""
+    if np is not None:
+        return int(np.frombuffer(data, dtype=np.uint8).sum(dtype=np.uint64))
+    if isinstance(data, mmap.mmap):
+        # iterating an mmap yields bytes objects, a memoryview yields ints
+        with memoryview(data) as view:
+            return sum(view)
+    return sum(data)
 
 
 class Rom:
     """Represents a Super Nintendo ROM with patching and modification capabilities.
     
+    Once :attr:`byte_sum` has been used, for example by :meth:`checksum`, the
+    sum of the ROM's bytes is kept up to date by every method that writes to
+    the ROM, so later checksums do not have to re-read it.  Writes made
+    directly to :attr:`rom` are not tracked; assigning :attr:`rom` starts over.
+
     Attributes:
-        rom: The ROM data as a mutable bytearray.
+        rom: The ROM data as a mutable bytearray, or an mmap for a ROM created
+            with :meth:`mmap_file`.
     """
     
     def __init__(self, input_filename: str) -> None:
@@ -22,9 +51,27 @@ class Rom:
         Args:
             input_filename: Path to the ROM file to read.
         """
-        self.rom: bytearray
+        self._rom: bytearray
+        self._sum: Optional[int] = None
         self.read(input_filename)
 
+    @property
+    def rom(self) -> bytearray:
+        """The ROM data."""
+        return self._rom
+
+    @rom.setter
+    def rom(self, data: bytearray) -> None:
+        self._rom = data
+        self._sum = None
+
+    @property
+    def byte_sum(self) -> int:
+        """The sum of every byte in the ROM, computed on first use and then maintained."""
+        if self._sum is None:
+            self._sum = _byte_sum(self._rom)
+        return self._sum
+
     def read(self, filename: str) -> None:
         """Read ROM data from a file.
         
@@ -34,6 +81,120 @@ class Rom:
         with open(filename, "rb") as f:
             self.rom = bytearray(f.read())
 
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview], byte_sum: Optional[int] = None) -> 'Rom':
+        """Create a ROM object from data already in memory.
+
+        Args:
+            data: The ROM data. It is copied, so later changes to the Rom do not affect it.
+            byte_sum: The sum of the bytes of ``data``, if known. See :attr:`byte_sum`.
+
+        Returns:
+            A new Rom.
+        """
+        rom = cls.from_buffer(bytearray(data))
+        rom._sum = byte_sum
+        return rom
+
+    @classmethod
+    def from_buffer(cls, buffer: bytearray) -> 'Rom':
+        """Create a ROM object that uses a bytearray as its data, without copying it.
+
+        Changes made through the Rom are visible in ``buffer``; use
+        :meth:`from_bytes` or :meth:`clone` to work on a copy.
+
+        Args:
+            buffer: The ROM data.
+
+        Returns:
+            A new Rom.
+
+        Raises:
+            TypeError: If ``buffer`` is not a bytearray.
+        """
+        if not isinstance(buffer, bytearray):
+            raise TypeError(f'Rom.from_buffer needs a bytearray, not {type(buffer).__name__}')
+        rom = cls.__new__(cls)
+        rom.rom = buffer
+        return rom
+
+    @classmethod
+    def mmap_file(
+        cls,
+        filename: str,
+        data: Union[bytes, bytearray, memoryview],
+        length: Optional[int] = None,
+        byte_sum: Optional[int] = None,
+    ) -> 'Rom':
+        """Create a ROM object backed by a memory-mapped output file.
+
+        The file is created, or truncated, at ``length`` bytes and ``data`` is
+        copied into it.  Everything written to the Rom afterwards goes straight
+        to the mapping, so the finished ROM only needs :meth:`flush` instead of
+        :meth:`write_to_file`.
+
+        Args:
+            filename: Path of the output file.
+            data: The initial ROM data.
+            length: Size to preallocate the file at. Defaults to the size of ``data``.
+            byte_sum: The sum of the bytes of ``data``, if known. See :attr:`byte_sum`.
+
+        Returns:
+            A new Rom. Call :meth:`close` when done with it.
+
+        Raises:
+            Pyz3rException: If ``length`` is smaller than ``data`` or zero.
+        """
+        if length is None:
+            length = len(data)
+        if length < len(data) or length == 0:
+            raise Pyz3rException(f'Cannot map {len(data)} bytes of ROM data into a {length} byte file')
+        with open(filename, "w+b") as f:
+            f.truncate(length)
+            mapping = mmap.mmap(f.fileno(), length)
+        mapping[:len(data)] = data
+        rom = cls.__new__(cls)
+        rom.rom = mapping  # type: ignore[assignment]
+        rom._sum = byte_sum
+        return rom
+
+    def flush(self) -> None:
+        """Flush a memory-mapped ROM to its file. Does nothing for an in-memory ROM."""
+        if isinstance(self.rom, mmap.mmap):
+            self.rom.flush()
+
+    def close(self) -> None:
+        """Flush and unmap a memory-mapped ROM. Does nothing for an in-memory ROM."""
+        if isinstance(self.rom, mmap.mmap) and not self.rom.closed:
+            self.rom.flush()
+            self.rom.close()
+
+    def clone(self) -> 'Rom':
+        """Copy this ROM.
+
+        Loading a base ROM once and cloning it for each game avoids reading
+        the file again; the copy is a single memcpy of the ROM data.  The
+        clone keeps this ROM's :attr:`byte_sum`, if known.
+
+        Returns:
+            A new Rom with its own copy of the data.
+        """
+        return type(self).from_bytes(self._rom, byte_sum=self._sum)
+
+    @classmethod
+    async def aread(cls, filename: str) -> 'Rom':
+        """Create a ROM object by reading a file without blocking the event loop.
+
+        Args:
+            filename: Path to the ROM file to read.
+
+        Returns:
+            A new Rom.
+        """
+        async with aiofiles.open(filename, "rb") as f:
+            data = await f.read()
+        return cls.from_bytes(data)
+
     def write_to_file(self, path: str) -> None:
         """Write the ROM data to a file.
         
@@ -43,38 +204,65 @@ class Rom:
         with open(path, "wb") as f:
             f.write(self.rom)
 
+    async def awrite(self, path: str) -> None:
+        """Write the ROM data to a file without blocking the event loop.
+
+        Args:
+            path: Path to write the ROM file to.
+        """
+        async with aiofiles.open(path, "wb") as f:
+            await f.write(self.rom)
+
     def apply_bps_patch(self, patch: bytes) -> None:
         """Apply a BPS patch to the ROM.
 
         Args:
             patch: A bytes object representing a BPS patch.
-            
+
+        Raises:
+            Pyz3rException: If the patch is corrupt or does not apply to this ROM.
+
         Note:
-            Uses apply_to_files instead of apply_to_bytearrays to ensure
-            CRC validation of both input and output.
+            The CRC32 of the patch, the input and the output are all validated.
+            The patch is applied straight from the current ROM buffer into the
+            new one, see :func:`pyz3r.bpspatch.apply`.  A memory-mapped ROM is
+            resized to the patched size and stays mapped.
         """
-        # create "files" for apply_to_files
-        # although there is an apply_to_bytearrays it does not perform CRC
-        # validation of input or output, apply_to_files does.
-        patch_file = io.BytesIO(patch)
-        source_file = io.BytesIO(bytes(self.rom))
-        target_file = io.BytesIO()
-
-        bps.apply.apply_to_files(patch_file, source_file, target_file)
-        target_file.seek(0)
-        self.rom = bytearray(target_file.read())
-
-    def apply_dict_patches(self, patches: List[Dict[str, List[int]]]) -> None:
+        target = bpspatch.apply(patch, self.rom)
+        if isinstance(self.rom, mmap.mmap):
+            if len(target) != len(self.rom):
+                self.rom.resize(len(target))
+            self.rom[:] = target
+            self._sum = None
+        else:
+            self.rom = target
+
+    def apply_dict_patches(
+        self,
+        patches: Union[Patches, PatchPlan],
+        use_numpy: Optional[bool] = None,
+    ) -> None:
         """Apply a list of patch dictionaries to the ROM.
 
         Args:
             patches: A list of dictionaries mapping byte offsets to byte values.
                     Each dict has one key (the offset) and the value is a list of bytes.
+                    PackedPatches, or a PatchPlan compiled from either, may be passed
+                    instead; a plan avoids compiling the patches again.
+            use_numpy: Apply with NumPy. See :meth:`pyz3r.patches.PatchPlan.apply`.
+
+        Raises:
+            Pyz3rException: If the patches are invalid or write past the end of the
+                ROM. Nothing is written in that case.
         """
-        for patch in patches:
-            offset = int(list(patch.keys())[0])
-            values = list(patch.values())[0]
-            self.write_bytes(offset, values)
+        plan = patches if isinstance(patches, PatchPlan) else PatchPlan.compile(patches)
+        if self._sum is None:
+            plan.apply(self._rom, use_numpy=use_numpy)
+            return
+        rom = self._rom
+        delta = sum(sum(data) - sum(rom[offset:offset + len(data)]) for offset, data in plan.ranges)
+        plan.apply(rom, use_numpy=use_numpy)
+        self._sum += delta
 
     def write_byte(self, offset: int, value: int) -> None:
         """Write a single byte to the ROM at the specified offset.
@@ -83,17 +271,35 @@ class Rom:
             offset: The byte offset in the ROM.
             value: The byte value to write (0-255).
         """
-        self.rom[offset] = value
-
-    def write_bytes(self, offset: int, values: List[int]) -> None:
+        if self._sum is None:
+            self._rom[offset] = value
+            return
+        old = self._rom[offset]
+        self._rom[offset] = value
+        self._sum += value - old
+
+    def write_bytes(self, offset: int, values: Sequence[int]) -> None:
         """Write multiple bytes to the ROM starting at the specified offset.
         
         Args:
             offset: The starting byte offset in the ROM.
-            values: List of byte values to write.
+            values: Byte values to write, as a list or a bytes-like object.
+
+        Raises:
+            IndexError: If the values do not fit in the ROM.
         """
-        for idx, value in enumerate(values):
-            self.write_byte(offset + idx, value)
+        end = offset + len(values)
+        if offset < 0 or end > len(self._rom):
+            raise IndexError('bytearray index out of range')
+        if not isinstance(values, (bytes, bytearray, memoryview)):
+            # an mmap only takes bytes-like values
+            values = bytes(values)
+        if self._sum is None:
+            self._rom[offset:end] = values
+            return
+        delta = sum(values) - sum(self._rom[offset:end])
+        self._rom[offset:end] = values
+        self._sum += delta
 
     def heart_speed(self, speed: str = 'half') -> None:
         """Set the low-health warning beep interval.
@@ -103,14 +309,7 @@ class Rom:
                   Options are 'off', 'double', 'normal', 'half', and 'quarter'.
                   Defaults to 'half'.
         """
-        sbyte = {
-            'off': 0,
-            'double': 16,
-            'normal': 32,
-            'half': 64,
-            'quarter': 128,
-        }
-        self.write_byte(0x180033, sbyte[speed])
+        self._write_all(cosmetics.heart_speed_writes(speed))
 
     def heart_color(self, color: str = 'red') -> None:
         """Set the color of the hearts on the player's HUD.
@@ -122,39 +321,7 @@ class Rom:
         Raises:
             Pyz3rException: If an unknown heart color is specified.
         """
-        if self.rom_version >= 4:
-            cbyte = {
-                'blue': 0x01,
-                'green': 0x02,
-                'yellow': 0x03,
-                'red': 0x00,
-            }
-            try:
-                self.write_byte(0x187020, cbyte[color])
-            except KeyError:
-                raise Pyz3rException(f'Unknown heart color: {color}')
-        else:
-            cbyte = {
-                'blue': [44, 13],
-                'green': [60, 25],
-                'yellow': [40, 9],
-                'red': [36, 5],
-            }
-
-            byte = cbyte[color][0]
-            file_byte = cbyte[color][1]
-
-            self.write_byte(0x6fa1e, byte)
-            self.write_byte(0x6fa20, byte)
-            self.write_byte(0x6fa22, byte)
-            self.write_byte(0x6fa24, byte)
-            self.write_byte(0x6fa26, byte)
-            self.write_byte(0x6fa28, byte)
-            self.write_byte(0x6fa2a, byte)
-            self.write_byte(0x6fa2c, byte)
-            self.write_byte(0x6fa2e, byte)
-            self.write_byte(0x6fa30, byte)
-            self.write_byte(0x65561, file_byte)
+        self._write_all(cosmetics.heart_color_writes(color, self.rom_version))
 
     def music(self, music: bool = True) -> None:
         """Enable or disable the in-game music.
@@ -164,7 +331,7 @@ class Rom:
         Args:
             music: If True, music is enabled. If False, music is disabled. Defaults to True.
         """
-        self.write_byte(0x18021a, 0x00 if music else 0x01)
+        self._write_all(cosmetics.music_writes(music))
 
     def msu1_resume(self, enable: bool = True) -> None:
         """Enable or disable the MSU-1 resume feature.
@@ -175,9 +342,7 @@ class Rom:
             enable: If True, the MSU-1 resume feature is enabled. 
                    If False, it is disabled. Defaults to True.
         """
-        if not enable:
-            self.write_byte(0x18021D, 0x00)
-            self.write_byte(0x18021E, 0x00)
+        self._write_all(cosmetics.msu1_resume_writes(enable))
 
     def quickswap(self, quickswap: bool = False) -> None:
         """Enable or disable quickswap functionality.
@@ -185,7 +350,7 @@ class Rom:
         Args:
             quickswap: If True, quickswap is enabled. Defaults to False.
         """
-        self.write_byte(0x18004b, 0x01 if quickswap else 0x00)
+        self._write_all(cosmetics.quickswap_writes(quickswap))
 
     def reduce_flashing(self, enable: bool = False) -> None:
         """Enable or disable reduced flashing for photosensitivity.
@@ -193,7 +358,7 @@ class Rom:
         Args:
             enable: If True, flashing is reduced. Defaults to False.
         """
-        self.write_byte(0x18017f, 0x01 if enable else 0x00)
+        self._write_all(cosmetics.reduce_flashing_writes(enable))
 
     def menu_speed(self, speed: str = 'normal') -> None:
         """Set the menu speed.
@@ -202,97 +367,62 @@ class Rom:
             speed: Menu speed setting. Options are 'instant', 'fast', 'normal', 'slow'.
                   Defaults to 'normal'.
         """
-        sbyte = {
-            'instant': 0xE8,
-            'fast': 0x10,
-            'normal': 0x08,
-            'slow': 0x04
-        }
-        self.write_byte(0x180048, sbyte[speed])
-        self.write_byte(0x6dd9a, 0x20 if speed == 'instant' else 0x11)
-        self.write_byte(0x6df2a, 0x20 if speed == 'instant' else 0x12)
-        self.write_byte(0x6e0e9, 0x20 if speed == 'instant' else 0x12)
-
-    def sprite(self, zspr: Union[bytearray, bytes]) -> None:
-        """Replace Link's sprite with the contents of a ZSPR file.
+        self._write_all(cosmetics.menu_speed_writes(speed))
+
+    def apply_cosmetics(self, preset: CosmeticPreset) -> None:
+        """Apply a compiled set of cosmetic choices in one pass.
+
+        This writes the same bytes as calling :meth:`heart_speed`, :meth:`heart_color`,
+        :meth:`menu_speed`, :meth:`quickswap`, :meth:`music`, :meth:`msu1_resume`
+        and :meth:`reduce_flashing` in turn.
 
         Args:
-            zspr: A bytes-like object containing ZSPR sprite data.
+            preset: The preset, usually from :meth:`pyz3r.cosmetics.CosmeticPreset.compile`
+                with this ROM's :attr:`rom_version`.
+
+        Raises:
+            Pyz3rException: If the preset writes past the end of the ROM. Nothing
+                is written in that case.
         """
+        rom = self._rom
+        if self._sum is None:
+            preset.apply(rom)
+            return
+        preset.check_bounds(len(rom))
+        delta = preset.value_sum - sum(rom[offset] for offset in preset.offsets)
+        preset.apply(rom)
+        self._sum += delta
+
+    def _write_all(self, writes: cosmetics.Writes) -> None:
+        for offset, value in writes:
+            self.write_byte(offset, value)
+
+    def sprite(self, zspr: Union[bytearray, bytes, ZsprSprite]) -> None:
+        """Replace Link's sprite with the contents of a ZSPR file.
 
-        # stolen from VT's code
-        gfx_offset = zspr[12] << 24 | zspr[11] << 16 | zspr[10] << 8 | zspr[9]
-        palette_offset = zspr[18] << 24 | zspr[17] << 16 | zspr[16] << 8 | zspr[15]
+        Args:
+            zspr: A bytes-like object containing ZSPR sprite data, or a parsed
+                sprite. Raw data is parsed with :meth:`pyz3r.zspr.ZsprSprite.load`,
+                which caches the result.
+        """
+        sprite = zspr if isinstance(zspr, ZsprSprite) else ZsprSprite.load(zspr)
 
         if self.rom[0x118000] == 0x02 and self.rom[0x118001] == 0x37 and self.rom[0x11801E] == 0x02 and self.rom[0x11801F] == 0x37:
-            # skip past unicode title and author
-            metadata_index = 0x1D
-            junk = 2
-            while metadata_index < gfx_offset and junk > 0:
-                if zspr[metadata_index + 1] == 0 and zspr[metadata_index] == 0:
-                    junk = junk - 1
-
-                metadata_index = metadata_index + 2
-
-            sprite_author_short = ""
-
-            while metadata_index < gfx_offset and zspr[metadata_index] != 0x00:
-                char = chr(zspr[metadata_index])
-                sprite_author_short += char
-                metadata_index = metadata_index + 1
-
-            if self.rom_version >= 4:
-                sprite_author_map = {
-                    " ": (0x9F, 0x9F), "0": (0x53, 0x79), "1": (0x54, 0x7A),
-                    "2": (0x55, 0x7B), "3": (0x56, 0x7C), "4": (0x57, 0x7D),
-                    "5": (0x58, 0x7E), "6": (0x59, 0x7F), "7": (0x5A, 0x80),
-                    "8": (0x5B, 0x81), "9": (0x5C, 0x82), "A": (0x5D, 0x83),
-                    "B": (0x5E, 0x84), "C": (0x5F, 0x85), "D": (0x60, 0x86),
-                    "E": (0x61, 0x87), "F": (0x62, 0x88), "G": (0x63, 0x89),
-                    "H": (0x64, 0x8A), "I": (0x65, 0x8B), "J": (0x66, 0x8C),
-                    "K": (0x67, 0x8D), "L": (0x68, 0x8E), "M": (0x69, 0x8F),
-                    "N": (0x6A, 0x90), "O": (0x6B, 0x91), "P": (0x6C, 0x92),
-                    "Q": (0x6D, 0x93), "R": (0x6E, 0x94), "S": (0x6F, 0x95),
-                    "T": (0x70, 0x96), "U": (0x71, 0x97), "V": (0x72, 0x98),
-                    "W": (0x73, 0x99), "X": (0x74, 0x9A), "Y": (0x75, 0x9B),
-                    "Z": (0x76, 0x9C), "'": (0xD9, 0xEC), ".": (0xDC, 0xEF),
-                    "/": (0xDB, 0xEE), ":": (0xDD, 0xF0), "_": (0xDE, 0xF1)
-                }
-            else:
-                sprite_author_map = {
-                    " ": (0x9F, 0x9F), "0": (0x53, 0x79), "1": (0x54, 0x7A),
-                    "2": (0x55, 0x7B), "3": (0x56, 0x7C), "4": (0x57, 0x7D),
-                    "5": (0x58, 0x7E), "6": (0x59, 0x7F), "7": (0x5A, 0x80),
-                    "8": (0x5B, 0x81), "9": (0x5C, 0x82), "A": (0x5D, 0x83),
-                    "B": (0x5E, 0x84), "C": (0x5F, 0x85), "D": (0x60, 0x86),
-                    "E": (0x61, 0x87), "F": (0x62, 0x88), "G": (0x63, 0x89),
-                    "H": (0x64, 0x8A), "I": (0x65, 0x8B), "J": (0x66, 0x8C),
-                    "K": (0x67, 0x8D), "L": (0x68, 0x8E), "M": (0x69, 0x8F),
-                    "N": (0x6A, 0x90), "O": (0x6B, 0x91), "P": (0x6C, 0x92),
-                    "Q": (0x6D, 0x93), "R": (0x6E, 0x94), "S": (0x6F, 0x95),
-                    "T": (0x70, 0x96), "U": (0x71, 0x97), "V": (0x72, 0x98),
-                    "W": (0x73, 0x99), "X": (0x74, 0x9A), "Y": (0x75, 0x9B),
-                    "Z": (0x76, 0x9C), "'": (0x77, 0x9d), ".": (0xA0, 0xC0),
-                    "/": (0xA2, 0xC2), ":": (0xA3, 0xC3), "_": (0xA6, 0xC6)
-                }
-
-            sprite_author_short = sprite_author_short[:28].center(28, ' ').upper()
-            sprite_author_bytes = [sprite_author_map[a] if a in sprite_author_map else (0x9F, 0x9F) for a in sprite_author_short]
-
-            for idx, (upper, lower) in enumerate(sprite_author_bytes):
-                self.write_byte(0x118002 + idx, upper)
-                self.write_byte(0x118020 + idx, lower)
-
-        self.write_bytes(0x80000, zspr[gfx_offset:gfx_offset + 28671])
-        self.write_bytes(0xDD308, zspr[palette_offset:palette_offset + 120])
-        self.write_bytes(0xDEDF5, zspr[palette_offset + 120:palette_offset + 120 + 4])
+            upper, lower = sprite.author_bytes(self.rom_version)
+            self.write_bytes(0x118002, upper)
+            self.write_bytes(0x118020, lower)
+
+        self.write_bytes(0x80000, sprite.gfx)
+        self.write_bytes(0xDD308, sprite.palette)
+        self.write_bytes(0xDEDF5, sprite.gloves)
 
     def checksum(self) -> None:
         """Calculate and write the ROM's checksum.
         
         This should be the last patch applied to a ROM before it is written.
+        Only the first checksum of a ROM reads all of it, see :attr:`byte_sum`.
         """
-        sum_of_bytes = sum(self.rom[:32731]) + sum(self.rom[32736:])
+        sum_of_bytes = self.byte_sum - sum(self._rom[CHECKSUM_EXCLUDE])
         checksum = (sum_of_bytes + 510) & 65535
         inverse = checksum ^ 65535
         self.write_bytes(0x7fdc, [
@@ -314,6 +444,14 @@ class Rom:
             Pyz3rException: If the ROM is already larger than the target size.
         """
         newlen = int(newlenmb) * 1024 * 1024
+        if isinstance(self.rom, mmap.mmap):
+            # mapped ROMs are usually preallocated at their expanded length already
+            length = self.expanded_length(newlenmb)
+            if len(self.rom) > length:
+                raise Pyz3rException(f'ROM is already larger than {newlen}')
+            if len(self.rom) < length:
+                self.rom.resize(length)
+            return
         if len(self.rom) > newlen:
             raise Pyz3rException(f'ROM is already larger than {newlen}')
         diff = len(self.rom) - newlen
@@ -323,6 +461,20 @@ class Rom:
             self.rom.extend(itertools.repeat(0, -diff))
             self.rom.append(0)
 
+    @staticmethod
+    def expanded_length(newlenmb: int) -> int:
+        """Get the length of a ROM after :meth:`expand`.
+
+        An expanded ROM has one trailing byte after its last megabyte.
+
+        Args:
+            newlenmb: The target size of the ROM in megabytes.
+
+        Returns:
+            The length in bytes.
+        """
+        return int(newlenmb) * 1024 * 1024 + 1
+
     @property
     def rom_version(self) -> int:
         """Get the version of the ROM.
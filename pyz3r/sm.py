@@ -7,10 +7,16 @@ import uuid
 import asyncio
 import aiohttp
 
-from . import exceptions
+from . import client, exceptions
+from .cache import SeedCache, get_default_seed_cache
+from .ratelimit import TokenBucket
+from .retry import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
+# concurrent retrieves of the same seed share one request
+_retrieve_flights = client.SingleFlight()
+
 
 async def sm(
     settings: Optional[Dict[str, Any]] = None,
@@ -20,6 +26,10 @@ async def sm(
     randomizer: str = 'sm',
     username: Optional[str] = None,
     password: Optional[str] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    rate_limiter: Optional[TokenBucket] = None,
+    seed_cache: Optional[SeedCache] = None,
 ) -> 'smClass':
     """Create a Super Metroid randomizer seed (async factory function).
     
@@ -31,6 +41,10 @@ async def sm(
         randomizer: Randomizer type ('sm' or 'smz3'). Defaults to 'sm'.
         username: Optional username for authentication.
         password: Optional password for authentication.
+        session: Optional shared ``aiohttp.ClientSession`` to reuse for all requests.
+        retry_policy: Optional retry policy for requests.
+        rate_limiter: Optional token bucket to wait on before each request.
+        seed_cache: Optional cache for retrieved seed data.
         
     Returns:
         An initialized smClass instance.
@@ -43,7 +57,11 @@ async def sm(
         baseurl=baseurl,
         randomizer=randomizer,
         username=username,
-        password=password
+        password=password,
+        session=session,
+        retry_policy=retry_policy,
+        rate_limiter=rate_limiter,
+        seed_cache=seed_cache,
     )
     await seed._init()
     return seed
@@ -60,6 +78,10 @@ class smClass:
         randomizer: Type of randomizer ('sm' or 'smz3').
         data: Game data from the API.
         auth: Authentication credentials (if provided).
+        session: Shared HTTP client session used for requests (if provided).
+        retry_policy: Retry policy for requests (if None, the process-wide default is used).
+        rate_limiter: Rate limiter for requests (if None, any limiter registered for the host is used).
+        seed_cache: Cache for retrieved seed data (if None, the process-wide default is used).
     """
     
     def __init__(
@@ -71,6 +93,10 @@ class smClass:
         randomizer: str,
         username: Optional[str],
         password: Optional[str],
+        session: Optional[aiohttp.ClientSession] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        seed_cache: Optional[SeedCache] = None,
     ) -> None:
         """Initialize the SM randomizer client.
         
@@ -82,6 +108,13 @@ class smClass:
             randomizer: Randomizer type.
             username: Optional username for authentication.
             password: Optional password for authentication.
+            session: Optional shared ``aiohttp.ClientSession`` to reuse for all requests.
+            retry_policy: Optional retry policy for requests. Defaults to
+                ``pyz3r.retry.DEFAULT_RETRY_POLICY``.
+            rate_limiter: Optional token bucket to wait on before each request. Defaults to
+                the limiter registered for ``baseurl`` with :func:`pyz3r.ratelimit.set_rate_limit`.
+            seed_cache: Optional cache for retrieved seed data. Defaults to
+                :func:`pyz3r.cache.get_default_seed_cache`.
         """
         self.settings = settings
         self.slug_id = slug_id
@@ -94,6 +127,10 @@ class smClass:
             aiohttp.BasicAuth(login=username, password=password) 
             if username and password else None
         )
+        self.session: Optional[aiohttp.ClientSession] = session
+        self.retry_policy: Optional[RetryPolicy] = retry_policy
+        self.rate_limiter: Optional[TokenBucket] = rate_limiter
+        self.seed_cache: Optional[SeedCache] = seed_cache
         self.data: Optional[Dict[str, Any]] = None
         self.guid: Optional[uuid.UUID] = None
         self.endpoint: Optional[str] = None
@@ -130,26 +167,18 @@ class smClass:
             Dictionary containing the generated game data.
             
         Raises:
-            AlttprFailedToGenerate: If generation fails after 5 retries.
+            AlttprFailedToGenerate: If generation fails, or the retry policy gives up.
         """
-        for attempt in range(1, 6):
-            try:
-                logger.debug(f"Game generation attempt {attempt}/5")
-                async with aiohttp.request(
-                    method='post', 
-                    url=self.baseurl + self.endpoint, 
-                    json=self.settings, 
-                    auth=self.auth
-                ) as resp:
-                    req = await resp.json()
-                logger.info(f"Game generated successfully on attempt {attempt}")
-                return req
-            except aiohttp.client_exceptions.ServerDisconnectedError as e:
-                logger.warning(f"Generation attempt {attempt}/5 failed with disconnect: {e}")
-                continue
-        
-        logger.error("Failed to generate game after 5 attempts")
-        raise exceptions.AlttprFailedToGenerate('failed to generate game')
+        url = f'{self.baseurl}{self.endpoint}'
+        try:
+            logger.debug(f"Generating game via {url}")
+            req = await self._fetch_json('post', url, json=self.settings, auth=self.auth)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to generate game: {e}")
+            raise exceptions.AlttprFailedToGenerate('failed to generate game') from e
+
+        logger.info("Game generated successfully")
+        return req
 
     async def retrieve_game(self) -> Dict[str, Any]:
         """Retrieve game data from the API.
@@ -158,29 +187,40 @@ class smClass:
             Dictionary containing the game data.
             
         Raises:
-            AlttprFailedToRetrieve: If retrieval fails after 5 retries.
+            AlttprFailedToRetrieve: If there is no seed to retrieve, retrieval fails,
+                or the retry policy gives up.
+
+        Note:
+            Concurrent retrievals of the same seed (by slug ID or GUID) from the
+            same site share a single request, and receive the same parsed dictionary.
+            Retrieved seeds are kept in the seed cache, so later retrievals of the
+            same seed do not contact the API at all.
         """
-        for attempt in range(1, 6):
+        if self.guid is None:
+            raise exceptions.AlttprFailedToRetrieve('no seed to retrieve, specify a slug_id or guid_id')
+        guid = self.guid.hex
+        seed_cache = self.seed_cache if self.seed_cache is not None else get_default_seed_cache()
+        cache_key = f'sm:{self.baseurl}/api/seed/{guid}'
+
+        async def download() -> Dict[str, Any]:
+            cached = await seed_cache.aget(cache_key)
+            if cached is not None:
+                logger.debug(f"Game data for guid {guid} found in seed cache")
+                return cached
             try:
-                logger.debug(f"Game retrieval attempt {attempt}/5 for guid: {self.guid.hex}")
-                async with aiohttp.request(
-                    method='get', 
-                    url=f'{self.baseurl}/api/seed/{self.guid.hex}'
-                ) as resp:
-                    patch = await resp.json()
-                logger.info(f"Game retrieved successfully on attempt {attempt}")
-                return patch
-            except aiohttp.ClientResponseError as e:
-                logger.warning(f"Retrieval attempt {attempt}/5 failed with HTTP error: {e}")
-                await asyncio.sleep(5)
-                continue
-            except aiohttp.client_exceptions.ServerDisconnectedError as e:
-                logger.warning(f"Retrieval attempt {attempt}/5 failed with disconnect: {e}")
-                continue
-        
-        logger.error(f"Failed to retrieve game {self.slug_id} after 5 attempts")
-        raise exceptions.AlttprFailedToRetrieve(
-            f'failed to retrieve game {self.slug_id}, the game is likely not found')
+                logger.debug(f"Retrieving game data for guid: {guid}")
+                data = await self._fetch_json('get', f'{self.baseurl}/api/seed/{guid}')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Failed to retrieve game {self.slug_id}: {e}")
+                raise exceptions.AlttprFailedToRetrieve(
+                    f'failed to retrieve game {self.slug_id}, the game is likely not found') from e
+            await seed_cache.aset(cache_key, data)
+            return data
+
+        patch = await _retrieve_flights.do((self.baseurl, guid), download)
+
+        logger.info(f"Game retrieved successfully: {self.slug_id}")
+        return patch
 
     @classmethod
     async def create(
@@ -192,6 +232,10 @@ class smClass:
         randomizer: str = 'sm',
         username: Optional[str] = None,
         password: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        seed_cache: Optional[SeedCache] = None,
     ) -> 'smClass':
         """Create and initialize an SM randomizer seed (alternative async factory).
         
@@ -203,6 +247,10 @@ class smClass:
             randomizer: Randomizer type ('sm' or 'smz3').
             username: Optional username for authentication.
             password: Optional password for authentication.
+            session: Optional shared ``aiohttp.ClientSession`` to reuse for all requests.
+            retry_policy: Optional retry policy for requests.
+            rate_limiter: Optional token bucket to wait on before each request.
+            seed_cache: Optional cache for retrieved seed data.
             
         Returns:
             An initialized smClass instance.
@@ -215,7 +263,11 @@ class smClass:
             baseurl=baseurl,
             randomizer=randomizer,
             username=username,
-            password=password
+            password=password,
+            session=session,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
+            seed_cache=seed_cache,
         )
         await seed._init()
         return seed
@@ -227,14 +279,16 @@ class smClass:
             Dictionary of valid settings that can be used.
         """
         logger.debug("Fetching randomizer settings")
-        async with aiohttp.request(
-            method='get', 
-            url=f'{self.baseurl}/api/randomizers/{self.randomizer}'
-        ) as resp:
-            settings = await resp.json()
+        settings = await self._fetch_json('get', f'{self.baseurl}/api/randomizers/{self.randomizer}')
         logger.debug("Successfully fetched randomizer settings")
         return settings
 
+    async def _fetch_json(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Fetch and decode a JSON document using this client's session and retry policy."""
+        return await client.fetch_json(
+            method, url, session=self.session, retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter, **kwargs)
+
     @property
     def url(self) -> str:
         """Get the permalink URL for this seed.
@@ -7,8 +7,8 @@ import json
 import uuid
 
 import aiohttp
-from tenacity import RetryError, AsyncRetrying, stop_after_attempt, retry_if_exception_type
 
+from . import client, jsoncodec, ratelimit, retry
 from .misc import mergedicts
 from .exceptions import UnableToRetrieve, UnableToGenerate
 
@@ -24,6 +24,9 @@ class SuperMetroidVaria:
         race: Whether to generate a race mode seed.
         baseurl: Base URL for the VARIA API.
         auth: Authentication credentials (if provided).
+        session: Shared HTTP client session used for requests (if provided).
+        retry_policy: Retry policy for requests (if None, the process-wide default is used).
+        rate_limiter: Rate limiter for requests (if None, any limiter registered for the host is used).
         settings_dict: Additional settings overrides.
         settings: Combined settings for generation.
         data: Game data returned from the API.
@@ -39,6 +42,9 @@ class SuperMetroidVaria:
         username: Optional[str],
         password: Optional[str],
         settings_dict: Optional[Dict[str, Any]],
+        session: Optional[aiohttp.ClientSession] = None,
+        retry_policy: Optional[retry.RetryPolicy] = None,
+        rate_limiter: Optional[ratelimit.TokenBucket] = None,
     ) -> None:
         """Initialize the VARIA randomizer client.
         
@@ -50,6 +56,11 @@ class SuperMetroidVaria:
             username: Optional username for authentication.
             password: Optional password for authentication.
             settings_dict: Optional dictionary of additional settings.
+            session: Optional shared ``aiohttp.ClientSession`` to reuse for all requests.
+            retry_policy: Optional retry policy for requests. Defaults to
+                ``pyz3r.retry.DEFAULT_RETRY_POLICY``.
+            rate_limiter: Optional token bucket to wait on before each request. Defaults to
+                the limiter registered for ``baseurl`` with :func:`pyz3r.ratelimit.set_rate_limit`.
         """
         self.skills_preset = skills_preset
         self.settings_preset = settings_preset
@@ -62,6 +73,9 @@ class SuperMetroidVaria:
             if username and password else None
         )
         self.settings_dict = settings_dict
+        self.session: Optional[aiohttp.ClientSession] = session
+        self.retry_policy: Optional[retry.RetryPolicy] = retry_policy
+        self.rate_limiter: Optional[ratelimit.TokenBucket] = rate_limiter
         self.settings: Optional[Dict[str, Any]] = None
         self.data: Optional[Union[Dict[str, Any], str]] = None
         self.guid: Optional[uuid.UUID] = None
@@ -80,30 +94,27 @@ class SuperMetroidVaria:
             The exception from the last failed attempt if all retries fail.
         """
         logger.info("Generating VARIA randomizer seed")
+
+        async def attempt() -> Union[Dict[str, Any], str]:
+            async with self._request(
+                    method='post',
+                    url=f'{self.baseurl}/randomizerWebService',
+                    data=self.settings,
+                    auth=self.auth,
+                    raise_for_status=raise_for_status) as resp:
+                try:
+                    return await resp.json(content_type='text/html', loads=jsoncodec.loads)
+                except json.decoder.JSONDecodeError:
+                    return await resp.text()
+
+        policy = self.retry_policy if self.retry_policy is not None else retry.DEFAULT_RETRY_POLICY
         try:
-            async for attempt in AsyncRetrying(
-                    stop=stop_after_attempt(3),
-                    retry=retry_if_exception_type((
-                        aiohttp.ClientResponseError, 
-                        aiohttp.client_exceptions.ServerDisconnectedError
-                    ))):
-                with attempt:
-                    logger.debug(f"Generation attempt {attempt.retry_state.attempt_number}/3")
-                    async with aiohttp.request(
-                            method='post',
-                            url=f'{self.baseurl}/randomizerWebService',
-                            data=self.settings,
-                            auth=self.auth,
-                            raise_for_status=raise_for_status) as resp:
-                        try:
-                            req = await resp.json(content_type='text/html')
-                        except json.decoder.JSONDecodeError:
-                            req = await resp.text()
-                    logger.info("Successfully generated VARIA seed")
-                    return req
-        except RetryError as e:
-            logger.error(f"Failed to generate VARIA seed after 3 attempts: {e}")
-            raise e.last_attempt._exception from e
+            req = await policy.call(attempt)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to generate VARIA seed: {e}")
+            raise
+        logger.info("Successfully generated VARIA seed")
+        return req
 
     @classmethod
     async def create(
@@ -116,6 +127,9 @@ class SuperMetroidVaria:
         password: Optional[str] = None,
         settings_dict: Optional[Dict[str, Any]] = None,
         raise_for_status: bool = True,
+        session: Optional[aiohttp.ClientSession] = None,
+        retry_policy: Optional[retry.RetryPolicy] = None,
+        rate_limiter: Optional[ratelimit.TokenBucket] = None,
     ) -> 'SuperMetroidVaria':
         """Create and generate a VARIA randomizer seed.
         
@@ -128,6 +142,9 @@ class SuperMetroidVaria:
             password: Optional password for authentication.
             settings_dict: Optional additional settings.
             raise_for_status: Whether to raise exceptions on HTTP errors.
+            session: Optional shared ``aiohttp.ClientSession`` to reuse for all requests.
+            retry_policy: Optional retry policy for requests.
+            rate_limiter: Optional token bucket to wait on before each request.
             
         Returns:
             An initialized SuperMetroidVaria instance with generated seed.
@@ -141,6 +158,9 @@ class SuperMetroidVaria:
             username=username,
             password=password,
             settings_dict=settings_dict,
+            session=session,
+            retry_policy=retry_policy,
+            rate_limiter=rate_limiter,
         )
 
         seed.settings = await seed.get_settings()
@@ -213,14 +233,8 @@ class SuperMetroidVaria:
         logger.debug(f"Fetching settings preset: {setting}")
         data = {"randoPreset": setting, "origin": "extStats"}
         try:
-            async with aiohttp.request(
-                method='post', 
-                url=f'{self.baseurl}/randoPresetWebService', 
-                data=data, 
-                auth=self.auth, 
-                raise_for_status=True
-            ) as resp:
-                settings = await resp.json(content_type='text/html')
+            settings = await self._fetch_json(
+                'post', f'{self.baseurl}/randoPresetWebService', data=data, auth=self.auth, content_type='text/html')
             logger.debug(f"Successfully fetched settings preset: {setting}")
         except aiohttp.client_exceptions.ClientResponseError as e:
             if e.status == 400:
@@ -243,14 +257,9 @@ class SuperMetroidVaria:
         """
         logger.debug(f"Fetching skills preset: {skill}")
         try:
-            async with aiohttp.request(
-                method='post', 
-                url=f'{self.baseurl}/presetWebService', 
-                data={"preset": skill}, 
-                auth=self.auth, 
-                raise_for_status=True
-            ) as resp:
-                settings = await resp.json(content_type='text/html')
+            settings = await self._fetch_json(
+                'post', f'{self.baseurl}/presetWebService', data={"preset": skill}, auth=self.auth,
+                content_type='text/html')
             logger.debug(f"Successfully fetched skills preset: {skill}")
         except aiohttp.client_exceptions.ClientResponseError as e:
             if e.status == 400:
@@ -259,6 +268,16 @@ class SuperMetroidVaria:
             raise
         return settings
 
+    def _request(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Make an HTTP request through this client's session, if it has one."""
+        return client.request(method, url, session=self.session, rate_limiter=self.rate_limiter, **kwargs)
+
+    async def _fetch_json(self, method: str, url: str, **kwargs: Any) -> Any:
+        """Fetch and decode a JSON document using this client's session and retry policy."""
+        return await client.fetch_json(
+            method, url, session=self.session, retry_policy=self.retry_policy,
+            rate_limiter=self.rate_limiter, **kwargs)
+
     @property
     def url(self) -> str:
         """Get the URL for this VARIA seed.
@@ -4,7 +4,7 @@ from typing import Dict, List, Tuple, Any, Optional, TYPE_CHECKING
 from collections import OrderedDict
 import logging
 
-from . import misc
+from .patches import PatchIndex
 
 if TYPE_CHECKING:
     from .alttpr import ALTTPR
@@ -167,7 +167,7 @@ def create_filtered_spoiler(seed: 'ALTTPR', translate_dungeon_items: bool = Fals
         except KeyError:
             continue
 
-    drops = get_seed_prizepacks(seed.data)
+    drops = get_seed_prizepacks(seed.data, seed.patch_index)
     sorteddict['Drops'] = {}
     sorteddict['Drops']['PullTree'] = drops['PullTree']
     sorteddict['Drops']['RupeeCrab'] = {}
@@ -177,8 +177,10 @@ def create_filtered_spoiler(seed: 'ALTTPR', translate_dungeon_items: bool = Fals
     sorteddict['Drops']['FishSave'] = drops['FishSave']
     sorteddict['Drops']['PrizePacks'] = drops['PrizePacks']
 
-    sorteddict['Special']['DiggingGameDigs'] = misc.seek_patch_data(
-        seed.data['patch'], 982421, 1)[0]
+    try:
+        sorteddict['Special']['DiggingGameDigs'] = seed.patch_index.read(982421, 1)[0]
+    except KeyError:
+        raise ValueError('Offset 982421 is not patched') from None
 
     if spoiler['meta'].get('mode', 'open') == 'retro':
         sorteddict['Shops'] = spoiler['Shops']
@@ -199,52 +201,68 @@ def create_filtered_spoiler(seed: 'ALTTPR', translate_dungeon_items: bool = Fals
     return sorteddict
 
 
-def get_seed_prizepacks(data: Dict[str, Any]) -> Dict[str, Any]:
+def get_seed_prizepacks(data: Dict[str, Any], index: Optional[PatchIndex] = None) -> Dict[str, Any]:
     """Extract prize pack information from seed data.
     
+    Each value is read from the bytes the seed writes at its offset, so it is
+    found even when a patch covering it starts at a lower address.
+
     Args:
-        data: Seed data containing patch information.
+        data: Seed data containing patch information, either as a patch list
+            or as :class:`pyz3r.patches.PackedPatches`.
+        index: Index of the seed's patches, such as :attr:`pyz3r.alttpr.ALTTPR.patch_index`.
+            Compiled from ``data['patch']`` if not given.
         
     Returns:
         Dictionary containing prize pack details for various drop types.
+        Drops whose bytes the seed does not write are left out.
     """
+    if index is None:
+        index = PatchIndex.compile(data['patch'])
+
+    def read(offset: int, length: int) -> bytes:
+        try:
+            values = index.read(offset, length)
+        except KeyError:
+            return b''
+        return values if len(values) == length else b''
+
     d: Dict[str, Any] = {}
     d['PullTree'] = {}
     d['RupeeCrab'] = {}
     d['PrizePacks'] = {}
 
-    stun_offset = '227731'
-    pulltree_offset = '981972'
-    rupeecrap_main_offset = '207304'
-    rupeecrab_final_offset = '207300'
-    fishsave_offset = '950988'
-    prize_packs_offset = '227960'
-
-    for patch in data['patch']:
-        if stun_offset in patch:
-            d['Stun'] = get_sprite_droppable(patch[stun_offset][0])
-        if pulltree_offset in patch:
-            d['PullTree']['Tier1'] = get_sprite_droppable(
-                patch[pulltree_offset][0])
-            d['PullTree']['Tier2'] = get_sprite_droppable(
-                patch[pulltree_offset][1])
-            d['PullTree']['Tier3'] = get_sprite_droppable(
-                patch[pulltree_offset][2])
-        if rupeecrap_main_offset in patch:
-            d['RupeeCrab']['Main'] = get_sprite_droppable(
-                patch[rupeecrap_main_offset][0])
-        if rupeecrab_final_offset in patch:
-            d['RupeeCrab']['Final'] = get_sprite_droppable(
-                patch[rupeecrab_final_offset][0])
-        if fishsave_offset in patch:
-            d['FishSave'] = get_sprite_droppable(patch[fishsave_offset][0])
-        if prize_packs_offset in patch:
-            d['PrizePacks'] = {}
-            prize_pack_values = list(zip(*[iter(patch[prize_packs_offset][0:56])] * 8))
-            for group_index, prize_pack_set in enumerate(prize_pack_values, 1):
-                group_name = get_enemy_group_name(group_index)
-                prize_pack_name = get_prize_pack_name(prize_pack_set)
-                d['PrizePacks'][group_name] = prize_pack_name
+    stun_offset = 227731
+    pulltree_offset = 981972
+    rupeecrap_main_offset = 207304
+    rupeecrab_final_offset = 207300
+    fishsave_offset = 950988
+    prize_packs_offset = 227960
+
+    values = read(stun_offset, 1)
+    if values:
+        d['Stun'] = get_sprite_droppable(values[0])
+    values = read(pulltree_offset, 3)
+    if values:
+        d['PullTree']['Tier1'] = get_sprite_droppable(values[0])
+        d['PullTree']['Tier2'] = get_sprite_droppable(values[1])
+        d['PullTree']['Tier3'] = get_sprite_droppable(values[2])
+    values = read(rupeecrap_main_offset, 1)
+    if values:
+        d['RupeeCrab']['Main'] = get_sprite_droppable(values[0])
+    values = read(rupeecrab_final_offset, 1)
+    if values:
+        d['RupeeCrab']['Final'] = get_sprite_droppable(values[0])
+    values = read(fishsave_offset, 1)
+    if values:
+        d['FishSave'] = get_sprite_droppable(values[0])
+    values = read(prize_packs_offset, 56)
+    if values:
+        prize_pack_values = list(zip(*[iter(values)] * 8))
+        for group_index, prize_pack_set in enumerate(prize_pack_values, 1):
+            group_name = get_enemy_group_name(group_index)
+            prize_pack_name = get_prize_pack_name(prize_pack_set)
+            d['PrizePacks'][group_name] = prize_pack_name
 
     return d
 
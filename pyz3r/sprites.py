@@ -0,0 +1,344 @@
+"""Cached sprite catalogs for :meth:`pyz3r.alttpr.ALTTPR.get_sprite`.
+
+A :class:`SpriteCatalog` holds the ``/sprites`` list of one site.  The list is
+downloaded once, indexed by name, and afterwards only revalidated with a
+conditional request (``If-None-Match`` / ``If-Modified-Since``) once it is
+older than ``max_age``.  Downloaded ZSPR files are stored on disk by the
+SHA-256 of their contents, in the system's temp directory
+(``/tmp/pyz3r/sprites`` on *nix systems) by default, so each sprite is only
+downloaded once per version.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+from . import client, jsoncodec, retry
+from .cache import FileStore
+from .exceptions import Pyz3rException
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE: float = 300.0
+DEFAULT_SPRITE_BYTES: int = 64 * 1024 * 1024
+
+
+def sprite_directory() -> Path:
+    """The default directory sprites are cached in (``/tmp/pyz3r/sprites`` on *nix systems)."""
+    return Path(tempfile.gettempdir(), 'pyz3r', 'sprites')
+
+
+class SpriteFiles(FileStore):
+    """Size-bounded store of sprite files, keyed by the SHA-256 of their contents.
+
+    Files are checked against their key when read, and corrupt files are discarded.
+    """
+
+    SUFFIX = '.zspr'
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_SPRITE_BYTES) -> None:
+        """Initialize a sprite store.
+
+        Args:
+            directory: Directory to store sprites in.
+            max_bytes: Maximum total size of the sprite files. Defaults to 64 MiB.
+        """
+        super().__init__(directory, max_bytes, self.SUFFIX)
+
+    def load(self, key: str) -> Optional[bytes]:
+        data = super().load(key)
+        if data is not None and hashlib.sha256(data).hexdigest() != key:
+            logger.warning(f"Discarding corrupt sprite file {self.path(key)}")
+            self.remove(key)
+            return None
+        return data
+
+
+class SpriteCatalog:
+    """The sprite list of one site, indexed by name and revalidated on demand.
+
+    The list, its validators and the file hashes of downloaded sprites are
+    saved alongside the sprite files, so a new process starts with a
+    conditional request instead of downloading the whole list again.
+
+    Attributes:
+        baseurl: Base URL of the site.
+        max_age: Seconds a fetched list is used before it is revalidated.
+        files: Store of downloaded sprite files.
+    """
+
+    def __init__(
+        self,
+        baseurl: str,
+        directory: Optional[str] = None,
+        max_age: float = DEFAULT_MAX_AGE,
+        max_bytes: int = DEFAULT_SPRITE_BYTES,
+    ) -> None:
+        """Initialize a catalog, loading any saved state on first use.
+
+        Args:
+            baseurl: Base URL of the site, such as 'https://alttpr.com'.
+            directory: Directory to store sprites in. Defaults to :func:`sprite_directory`.
+            max_age: Seconds before the list is revalidated. Defaults to 300.
+            max_bytes: Maximum total size of stored sprite files. Defaults to 64 MiB.
+        """
+        self.baseurl = baseurl
+        self.max_age = max_age
+        self.files = SpriteFiles(directory or str(sprite_directory()), max_bytes)
+        key = hashlib.sha1(baseurl.encode('utf-8')).hexdigest()[:16]
+        self._state_path = self.files.directory / f'catalog-{key}.json'
+        self._loaded = False
+        self._sprites: Optional[List[Dict[str, Any]]] = None
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._by_lower_name: Dict[str, Dict[str, Any]] = {}
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._file_hashes: Dict[str, str] = {}
+        self._checked: float = 0.0
+        self._refreshes = client.SingleFlight()
+        self._lock = threading.Lock()
+        self._state_version = 0
+        self._written_version = 0
+        self._write_lock = threading.Lock()
+
+    @property
+    def sprites(self) -> List[Dict[str, Any]]:
+        """The sprite list as last fetched, or an empty list if it has not been fetched."""
+        return self._sprites or []
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        """Look up a sprite in the current list without contacting the site.
+
+        Args:
+            name: The sprite name. An exact match is preferred, otherwise
+                the name is matched case-insensitively.
+
+        Returns:
+            The sprite's entry from the list, or None if there is no such sprite.
+        """
+        self._load_state()
+        return self._by_name.get(name) or self._by_lower_name.get(name.lower())
+
+    async def refresh(self, force: bool = False, **kwargs: Any) -> None:
+        """Fetch or revalidate the sprite list if it is older than ``max_age``.
+
+        Concurrent refreshes share one request.  If revalidation fails and a
+        list was fetched before, the old list keeps being used.
+
+        Args:
+            force: Revalidate even if the list is still fresh.
+            **kwargs: Arguments for the request, such as ``session``,
+                ``retry_policy``, ``rate_limiter`` and ``auth``.
+        """
+        self._load_state()
+        if not force and self._sprites is not None and time.monotonic() - self._checked < self.max_age:
+            return
+        try:
+            await self._refreshes.do('refresh', lambda: self._revalidate(**kwargs))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if self._sprites is None:
+                raise
+            logger.warning(f"Unable to revalidate sprite list for {self.baseurl}, using cached list: {e}")
+
+    async def get(self, name: str, **kwargs: Any) -> Dict[str, Any]:
+        """Look up a sprite, refreshing the list if needed.
+
+        If the name is not found in a list that was not just fetched, the
+        list is revalidated once in case the sprite was added since.
+
+        Args:
+            name: The sprite name.
+            **kwargs: Arguments for the request, see :meth:`refresh`.
+
+        Returns:
+            The sprite's entry from the list.
+
+        Raises:
+            Pyz3rException: If the sprite does not exist.
+        """
+        checked = self._checked
+        await self.refresh(**kwargs)
+        spriteinfo = self.find(name)
+        if spriteinfo is None and self._checked == checked:
+            await self.refresh(force=True, **kwargs)
+            spriteinfo = self.find(name)
+        if spriteinfo is None:
+            logger.error(f"Sprite '{name}' not found on {self.baseurl}")
+            raise Pyz3rException(f"Sprite {name} does not exist on {self.baseurl}.")
+        return spriteinfo
+
+    async def download(self, name: str, **kwargs: Any) -> bytes:
+        """Get the ZSPR file for a sprite, from disk if it was downloaded before.
+
+        Args:
+            name: The sprite name.
+            **kwargs: Arguments for the request, see :meth:`refresh`.
+
+        Returns:
+            The sprite file.
+
+        Raises:
+            Pyz3rException: If the sprite does not exist or can't be downloaded.
+        """
+        spriteinfo = await self.get(name, **kwargs)
+        file_key = f"{spriteinfo['file']}@{spriteinfo.get('version', '')}"
+
+        digest = self._file_hashes.get(file_key)
+        if digest is not None:
+            data = self.files.load(digest)
+            if data is not None:
+                logger.debug(f"Loaded sprite {name} from cache")
+                return data
+
+        # sprite files are public, and usually served from a different host
+        kwargs.pop('auth', None)
+        try:
+            logger.debug(f"Downloading sprite from {spriteinfo['file']}")
+            data = await client.fetch_bytes('get', spriteinfo['file'], **kwargs)
+        except Exception as e:
+            logger.error(f"Failed to download sprite '{name}': {e}")
+            raise Pyz3rException(f'Sprite "{name}" could not be downloaded.') from e
+
+        digest = hashlib.sha256(data).hexdigest()
+        self.files.store(digest, data)
+        with self._lock:
+            self._file_hashes[file_key] = digest
+        await self._save_state()
+        logger.info(f"Successfully downloaded sprite: {name}")
+        return data
+
+    async def _revalidate(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        retry_policy: Optional[retry.RetryPolicy] = None,
+        **kwargs: Any,
+    ) -> None:
+        headers = {}
+        if self._sprites is not None:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+
+        async def attempt() -> Optional[Tuple[Any, Optional[str], Optional[str]]]:
+            async with client.request(
+                'get', self.baseurl + '/sprites', session=session,
+                headers=headers, raise_for_status=True, **kwargs
+            ) as resp:
+                if resp.status == 304:
+                    return None
+                return await resp.json(loads=jsoncodec.loads), resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+
+        logger.debug(f"Revalidating sprite list for {self.baseurl}")
+        policy = retry_policy if retry_policy is not None else retry.DEFAULT_RETRY_POLICY
+        result = await policy.call(attempt)
+        self._checked = time.monotonic()
+        if result is None:
+            logger.debug(f"Sprite list for {self.baseurl} not modified")
+            return
+
+        sprites, self._etag, self._last_modified = result
+        self._index(sprites)
+        with self._lock:
+            # forget downloaded files that are no longer listed
+            listed = {f"{s['file']}@{s.get('version', '')}" for s in sprites}
+            self._file_hashes = {k: v for k, v in self._file_hashes.items() if k in listed}
+        await self._save_state()
+
+    def _index(self, sprites: List[Dict[str, Any]]) -> None:
+        self._sprites = sprites
+        self._by_name = {s['name']: s for s in sprites}
+        self._by_lower_name = {}
+        for s in sprites:
+            self._by_lower_name.setdefault(s['name'].lower(), s)
+
+    def _load_state(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self._state_path, 'rb') as f:
+                state = jsoncodec.loads(f.read())
+            self._etag = state.get('etag')
+            self._last_modified = state.get('last_modified')
+            self._file_hashes = state.get('files', {})
+            if state.get('sprites') is not None:
+                self._index(state['sprites'])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable sprite catalog {self._state_path}: {e}")
+
+    async def _save_state(self) -> None:
+        """Save the catalog's state, encoding and writing it in an executor."""
+        with self._lock:
+            self._state_version += 1
+            version = self._state_version
+            state = {
+                'baseurl': self.baseurl,
+                'etag': self._etag,
+                'last_modified': self._last_modified,
+                'sprites': self._sprites,
+                'files': dict(self._file_hashes),
+            }
+        await asyncio.get_running_loop().run_in_executor(None, self._write_state, version, state)
+
+    def _write_state(self, version: int, state: Dict[str, Any]) -> None:
+        with self._write_lock:
+            # a newer state may have been written while this one waited
+            if version < self._written_version:
+                return
+            data = jsoncodec.dumps(state)
+            tmp = self._state_path.with_name(f'{self._state_path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+            try:
+                self._state_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self._state_path)
+            except OSError as e:
+                logger.warning(f"Unable to write sprite catalog {self._state_path}: {e}")
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+                return
+            self._written_version = version
+
+
+_catalogs: Dict[str, SpriteCatalog] = {}
+
+
+def get_sprite_catalog(baseurl: str) -> SpriteCatalog:
+    """Get the process-wide sprite catalog for a site.
+
+    Args:
+        baseurl: Base URL of the site, such as 'https://alttpr.com'.
+
+    Returns:
+        The site's catalog, created on first use.
+    """
+    catalog = _catalogs.get(baseurl)
+    if catalog is None:
+        catalog = _catalogs[baseurl] = SpriteCatalog(baseurl)
+    return catalog
+
+
+def set_sprite_catalog(baseurl: str, catalog: Optional[SpriteCatalog]) -> None:
+    """Replace the process-wide sprite catalog for a site.
+
+    Args:
+        baseurl: Base URL of the site.
+        catalog: The new catalog, or None to go back to a default one on next use.
+    """
+    if catalog is None:
+        _catalogs.pop(baseurl, None)
+    else:
+        _catalogs[baseurl] = catalog
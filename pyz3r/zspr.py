@@ -0,0 +1,152 @@
+"""Parsed ZSPR sprite files.
+
+Applying a ZSPR file to a ROM means finding the graphics and palette in it,
+walking its UTF-16 title and author metadata, and mapping the short author
+name to the in-game font.  A :class:`ZsprSprite` does all of that once, and
+:meth:`ZsprSprite.load` keeps a process-wide cache of them keyed by the
+SHA-256 of the file, so a sprite used for many ROMs is only parsed once.
+
+See https://github.com/Zarby89/ZScreamRandomizer/blob/master/ZScream/zspr_format.md
+for the file format.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, Union
+
+from .exceptions import Pyz3rException
+
+# number of parsed sprites kept by ZsprSprite.load
+MAX_CACHED_SPRITES: int = 256
+
+GFX_LENGTH = 28671
+PALETTE_LENGTH = 120
+GLOVES_LENGTH = 4
+AUTHOR_LENGTH = 28
+
+# in-game font (upper row, lower row) for each character of the short author name
+AUTHOR_CHARACTERS: Dict[str, Tuple[int, int]] = {
+    " ": (0x9F, 0x9F), "0": (0x53, 0x79), "1": (0x54, 0x7A),
+    "2": (0x55, 0x7B), "3": (0x56, 0x7C), "4": (0x57, 0x7D),
+    "5": (0x58, 0x7E), "6": (0x59, 0x7F), "7": (0x5A, 0x80),
+    "8": (0x5B, 0x81), "9": (0x5C, 0x82), "A": (0x5D, 0x83),
+    "B": (0x5E, 0x84), "C": (0x5F, 0x85), "D": (0x60, 0x86),
+    "E": (0x61, 0x87), "F": (0x62, 0x88), "G": (0x63, 0x89),
+    "H": (0x64, 0x8A), "I": (0x65, 0x8B), "J": (0x66, 0x8C),
+    "K": (0x67, 0x8D), "L": (0x68, 0x8E), "M": (0x69, 0x8F),
+    "N": (0x6A, 0x90), "O": (0x6B, 0x91), "P": (0x6C, 0x92),
+    "Q": (0x6D, 0x93), "R": (0x6E, 0x94), "S": (0x6F, 0x95),
+    "T": (0x70, 0x96), "U": (0x71, 0x97), "V": (0x72, 0x98),
+    "W": (0x73, 0x99), "X": (0x74, 0x9A), "Y": (0x75, 0x9B),
+    "Z": (0x76, 0x9C), "'": (0xD9, 0xEC), ".": (0xDC, 0xEF),
+    "/": (0xDB, 0xEE), ":": (0xDD, 0xF0), "_": (0xDE, 0xF1),
+}
+
+# ROMs before version 4 place the punctuation elsewhere in the font
+LEGACY_AUTHOR_CHARACTERS: Dict[str, Tuple[int, int]] = dict(AUTHOR_CHARACTERS, **{
+    "'": (0x77, 0x9d), ".": (0xA0, 0xC0),
+    "/": (0xA2, 0xC2), ":": (0xA3, 0xC3), "_": (0xA6, 0xC6),
+})
+
+_cache: 'OrderedDict[str, ZsprSprite]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _encode_author(author: str, characters: Dict[str, Tuple[int, int]]) -> Tuple[bytes, bytes]:
+    """Encode a short author name as the upper and lower rows of the in-game font."""
+    pairs = [characters.get(char, (0x9F, 0x9F)) for char in author[:AUTHOR_LENGTH].center(AUTHOR_LENGTH, ' ').upper()]
+    return bytes(upper for upper, _ in pairs), bytes(lower for _, lower in pairs)
+
+
+class ZsprSprite:
+    """A ZSPR file parsed into the buffers that are written to a ROM.
+
+    Attributes:
+        sha256: SHA-256 hex digest of the file.
+        author: The short author name from the metadata.
+        gfx: Sprite graphics.
+        palette: Sprite palette.
+        gloves: Glove palette.
+    """
+
+    __slots__ = ('sha256', 'author', 'gfx', 'palette', 'gloves', '_author_bytes', '_legacy_author_bytes')
+
+    def __init__(self, data: Union[bytes, bytearray]) -> None:
+        """Parse a ZSPR file. Use :meth:`load` to reuse an earlier parse of the same file.
+
+        Args:
+            data: The contents of the file.
+
+        Raises:
+            Pyz3rException: If the file is too short to hold a ZSPR header.
+        """
+        if len(data) < 0x1D:
+            raise Pyz3rException(f'ZSPR data is too short ({len(data)} bytes)')
+        data = bytes(data)
+        self.sha256: str = hashlib.sha256(data).hexdigest()
+
+        # stolen from VT's code
+        gfx_offset = int.from_bytes(data[9:13], 'little')
+        palette_offset = int.from_bytes(data[15:19], 'little')
+        self.gfx: bytes = data[gfx_offset:gfx_offset + GFX_LENGTH]
+        self.palette: bytes = data[palette_offset:palette_offset + PALETTE_LENGTH]
+        self.gloves: bytes = data[palette_offset + PALETTE_LENGTH:palette_offset + PALETTE_LENGTH + GLOVES_LENGTH]
+
+        # skip past the null-terminated UTF-16 title and author, to the ASCII short author name
+        metadata_index = 0x1D
+        junk = 2
+        while metadata_index < gfx_offset and junk > 0:
+            if data[metadata_index + 1] == 0 and data[metadata_index] == 0:
+                junk = junk - 1
+            metadata_index = metadata_index + 2
+        end = metadata_index
+        while end < gfx_offset and data[end] != 0x00:
+            end = end + 1
+        self.author: str = ''.join(map(chr, data[metadata_index:end]))
+
+        self._author_bytes = _encode_author(self.author, AUTHOR_CHARACTERS)
+        self._legacy_author_bytes = _encode_author(self.author, LEGACY_AUTHOR_CHARACTERS)
+
+    @classmethod
+    def load(cls, data: Union[bytes, bytearray]) -> 'ZsprSprite':
+        """Parse a ZSPR file, or return the cached parse of an identical one.
+
+        Args:
+            data: The contents of the file.
+
+        Returns:
+            The parsed sprite.
+
+        Raises:
+            Pyz3rException: If the file is too short to hold a ZSPR header.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with _cache_lock:
+            sprite = _cache.get(digest)
+            if sprite is not None:
+                _cache.move_to_end(digest)
+                return sprite
+        sprite = cls(data)
+        with _cache_lock:
+            _cache[digest] = sprite
+            while len(_cache) > MAX_CACHED_SPRITES:
+                _cache.popitem(last=False)
+        return sprite
+
+    def author_bytes(self, rom_version: int) -> Tuple[bytes, bytes]:
+        """Get the short author name in the font of a ROM version.
+
+        Args:
+            rom_version: The ROM's :attr:`~pyz3r.rom.Rom.rom_version`.
+
+        Returns:
+            The upper and lower rows of the name, 28 bytes each.
+        """
+        return self._author_bytes if rom_version >= 4 else self._legacy_author_bytes
+
+
+def clear_cache() -> None:
+    """Remove every sprite cached by :meth:`ZsprSprite.load`."""
+    with _cache_lock:
+        _cache.clear()
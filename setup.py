@@ -36,5 +36,8 @@ setup(
         'python-bps-continued>=7',
         'slugid',
         'tenacity'
-    ]
+    ],
+    extras_require={
+        'numpy': ['numpy'],
+    }
 )
@@ -2,6 +2,30 @@
 
 import pytest
 
+from pyz3r import cache, sprites
+
+
+@pytest.fixture(autouse=True)
+def isolated_seed_cache(tmp_path, monkeypatch):
+    """Give each test empty caches instead of the shared defaults.
+
+    Seed and ROM caches are kept in memory, and BPS patches and sprite
+    catalogs are stored under the test's temporary directory.
+    """
+    cache.set_default_seed_cache(cache.MemoryCache())
+    cache.set_default_base_rom_cache(cache.BaseRomCache())
+    cache.set_default_seed_rom_cache(cache.SeedRomCache())
+    cache.set_default_bps_cache(cache.BpsCache(str(tmp_path / 'bps')))
+    cache.set_default_bps_index(cache.BpsIndex(str(tmp_path / 'bps' / 'index.json')))
+    monkeypatch.setattr(sprites, 'sprite_directory', lambda: tmp_path / 'sprites')
+    monkeypatch.setattr(sprites, '_catalogs', {})
+    yield
+    cache.set_default_seed_cache(None)
+    cache.set_default_base_rom_cache(None)
+    cache.set_default_seed_rom_cache(None)
+    cache.set_default_bps_cache(None)
+    cache.set_default_bps_index(None)
+
 
 @pytest.fixture
 def sample_alttpr_settings():
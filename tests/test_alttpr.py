@@ -2,8 +2,12 @@
 
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
+from pyz3r import alttpr as alttpr_module, spoiler
 from pyz3r.alttpr import ALTTPR
 from pyz3r.exceptions import Pyz3rException, AlttprFailedToGenerate, AlttprFailedToRetrieve
+from pyz3r.retry import RetryPolicy
+from pyz3r.patches import PackedPatches
+from pyz3r.rom import Rom
 
 
 class TestALTTPRInit:
@@ -71,6 +75,52 @@ class TestALTTPRProperties:
         assert len(code) == 5
         assert code[0] == 'Bow'
 
+    def test_code_only_patch(self):
+        """Test that the code is found when it is the first (and only) patch."""
+        alttpr = ALTTPR()
+        alttpr.data = {'patch': [{'1573397': [1, 2, 3, 4, 5]}]}
+        assert alttpr.code == ['Boomerang', 'Hookshot', 'Bombs', 'Mushroom', 'Magic Powder']
+
+    def test_patch_index_cached(self):
+        """Test that the patch index is built once per patch list."""
+        alttpr = ALTTPR()
+        alttpr.data = {'patch': [{'10': [1]}]}
+        index = alttpr.patch_index
+        assert alttpr.patch_index is index
+        alttpr.data = {'patch': [{'10': [2]}]}
+        assert alttpr.patch_index.read(10, 1) == b'\x02'
+
+    def test_pack_patches(self):
+        """Test that packed patches give the same code and prize packs as the patch list."""
+        patch_list = [
+            {'227731': [0xD9]},
+            {'981972': [0xDA, 0xDB, 0xDF]},
+            {'1573397': [1, 2, 3, 4, 5]},
+            {'227960': list(range(0xD8, 0xE0)) * 7},
+        ]
+        alttpr = ALTTPR()
+        alttpr.data = {'patch': patch_list}
+        code = alttpr.code
+        prizepacks = spoiler.get_seed_prizepacks(alttpr.data)
+        data = alttpr.data
+        packed = alttpr.pack_patches()
+        assert alttpr.data['patch'] is packed
+        assert data['patch'] is patch_list
+        assert alttpr.packed_patches is packed
+        assert packed.to_list() == patch_list
+        assert alttpr.code == code
+        assert spoiler.get_seed_prizepacks(alttpr.data) == prizepacks
+        assert prizepacks['Stun'] == 'RupeeGreen'
+
+    def test_prizepacks_inside_a_longer_write(self):
+        """Test that drops are read from patches that start below their offsets."""
+        alttpr = ALTTPR()
+        alttpr.data = {'patch': [{'227730': [0, 0xD9]}, {'981970': [0, 0, 0xDA, 0xDB, 0xDF]}]}
+        prizepacks = spoiler.get_seed_prizepacks(alttpr.data, alttpr.patch_index)
+        assert prizepacks['Stun'] == 'RupeeGreen'
+        assert prizepacks['PullTree'] == {'Tier1': 'RupeeBlue', 'Tier2': 'RupeeRed', 'Tier3': 'MagicRefillSmall'}
+        assert 'FishSave' not in prizepacks
+
 
 @pytest.mark.asyncio
 class TestALTTPRGenerate:
@@ -98,7 +148,59 @@ class TestALTTPRGenerate:
             mock_request.return_value.__aenter__.side_effect = aiohttp.client_exceptions.ServerDisconnectedError()
             
             with pytest.raises(AlttprFailedToGenerate):
-                await ALTTPR.generate(settings={'glitches': 'none'})
+                await ALTTPR.generate(settings={'glitches': 'none'}, retry_policy=RetryPolicy(base_delay=0))
+
+            assert mock_request.call_count == 5
+
+
+@pytest.mark.asyncio
+class TestALTTPRGenerateMany:
+    """Test bounded-concurrency batch generation."""
+
+    async def test_generate_many_reports_failures_per_item(self):
+        """Test that a failed item does not abort the rest of the batch."""
+        async def fake_generate(settings, endpoint, **kwargs):
+            if settings['n'] == 1:
+                raise AlttprFailedToGenerate('failed to generate game')
+            seed = ALTTPR()
+            seed.hash = f"hash{settings['n']}"
+            return seed
+
+        with patch.object(ALTTPR, 'generate', side_effect=fake_generate):
+            results = [r async for r in ALTTPR.generate_many([{'n': i} for i in range(4)], concurrency=2)]
+
+        assert sorted(r.position for r in results) == [0, 1, 2, 3]
+        failed = [r for r in results if not r.ok]
+        assert len(failed) == 1
+        assert failed[0].position == 1
+        assert isinstance(failed[0].error, AlttprFailedToGenerate)
+        assert {r.seed.hash for r in results if r.ok} == {'hash0', 'hash2', 'hash3'}
+
+    async def test_generate_many_respects_concurrency(self):
+        """Test that no more than the configured number of generations run at once."""
+        import asyncio
+        running = 0
+        peak = 0
+
+        async def fake_generate(settings, endpoint, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return ALTTPR()
+
+        with patch.object(ALTTPR, 'generate', side_effect=fake_generate):
+            results = [r async for r in ALTTPR.generate_many(({'n': i} for i in range(10)), concurrency=3)]
+
+        assert len(results) == 10
+        assert peak == 3
+
+    async def test_generate_many_invalid_concurrency(self):
+        """Test that a concurrency below one is rejected."""
+        with pytest.raises(ValueError):
+            async for _ in ALTTPR.generate_many([{}], concurrency=0):
+                pass
 
 
 @pytest.mark.asyncio
@@ -127,7 +229,169 @@ class TestALTTPRRetrieve:
             mock_request.return_value.__aenter__.side_effect = aiohttp.client_exceptions.ServerDisconnectedError()
             
             with pytest.raises(AlttprFailedToRetrieve):
-                await ALTTPR.retrieve(hash_id='notFound')
+                await ALTTPR.retrieve(hash_id='notFound', retry_policy=RetryPolicy(base_delay=0))
+
+            assert mock_request.call_count == 5
+
+
+@pytest.mark.asyncio
+class TestALTTPRCreatePatchedGame:
+    """Test the staged patching pipeline."""
+
+    async def test_downloads_run_concurrently(self):
+        """Test that the sprite download starts before the base patch download finishes."""
+        import asyncio
+        sprite_started = asyncio.Event()
+
+        async def fake_patch_base():
+            await asyncio.wait_for(sprite_started.wait(), timeout=1)
+            return 'md5', b'BPS1'
+
+        async def fake_sprite(name):
+            sprite_started.set()
+            return bytearray(b'ZSPR')
+
+        seed = ALTTPR()
+        seed.data = {'size': 2, 'patch': []}
+        with patch('pyz3r.alttpr.Rom.aread', new_callable=AsyncMock, return_value=Mock(rom=bytearray(2), rom_version=4)) as mock_rom, \
+                patch.object(seed, '_get_patch_base', side_effect=fake_patch_base), \
+                patch.object(seed, 'get_sprite', side_effect=fake_sprite):
+            rom = await seed.create_patched_game('base.sfc', spritename='Mario')
+
+        rom.apply_bps_patch.assert_called_once_with(patch=b'BPS1')
+        rom.sprite.assert_called_once_with(zspr=bytearray(b'ZSPR'))
+        mock_rom.assert_called_once_with('base.sfc')
+        assert {'read', 'patch_base', 'sprite', 'bps', 'checksum', 'total'} <= set(seed.timings)
+
+    async def test_patching_runs_in_executor(self):
+        """Test that CPU-bound patching runs in the configured executor."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        threads = []
+
+        seed = ALTTPR(executor=ThreadPoolExecutor(max_workers=1))
+        seed.data = {'size': 2, 'patch': []}
+        with patch('pyz3r.alttpr.Rom.aread', new_callable=AsyncMock, return_value=Mock(rom=bytearray(2), rom_version=4)) as mock_rom, \
+                patch.object(seed, '_get_patch_base', AsyncMock(return_value=('md5', b'BPS1'))):
+            mock_rom.return_value.apply_bps_patch.side_effect = lambda patch: threads.append(threading.get_ident())
+            mock_rom.return_value.checksum.side_effect = lambda: threads.append(threading.get_ident())
+            await seed.create_patched_game('base.sfc')
+
+        seed.executor.shutdown()
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+
+    async def test_failed_download_cancels_other_stages(self):
+        """Test that a failing stage is raised and the others are cancelled."""
+        import asyncio
+        sprite_cancelled = False
+
+        async def slow_sprite(name):
+            nonlocal sprite_cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                sprite_cancelled = True
+                raise
+
+        seed = ALTTPR()
+        seed.data = {'size': 2, 'patch': []}
+        with patch('pyz3r.alttpr.Rom.aread', new_callable=AsyncMock, return_value=Mock(rom=bytearray(2), rom_version=4)), \
+                patch.object(seed, '_get_patch_base', side_effect=Pyz3rException('no patch')), \
+                patch.object(seed, 'get_sprite', side_effect=slow_sprite):
+            with pytest.raises(Pyz3rException):
+                await seed.create_patched_game('base.sfc', spritename='Mario')
+            await asyncio.sleep(0)
+
+        assert sprite_cancelled
+
+    async def test_base_rom_cached_between_games(self, tmp_path):
+        """Test that the input ROM is read and base-patched once per randomizer version."""
+        base = tmp_path / 'base.sfc'
+        base.write_bytes(bytes(2 * 1024 * 1024))
+        bps_calls = []
+
+        def fake_bps(self, patch):
+            bps_calls.append(patch)
+            self.rom[0] = 1
+
+        with patch.object(Rom, 'apply_bps_patch', fake_bps), \
+                patch('pyz3r.alttpr.Rom.aread', wraps=Rom.aread) as mock_read:
+            for _ in range(2):
+                seed = ALTTPR()
+                seed.data = {'size': 2, 'patch': [{'1': [2]}]}
+                with patch.object(seed, '_get_patch_base', AsyncMock(return_value=('md5', b'BPS1'))), \
+                        patch.object(Rom, 'checksum'):
+                    rom = await seed.create_patched_game(str(base))
+                assert rom.rom[:3] == bytearray([1, 2, 0])
+
+        assert len(bps_calls) == 1
+        assert mock_read.call_count == 1
+
+    async def test_preloaded_rom_not_read_or_modified(self):
+        """Test that a preloaded Rom is patched as a copy without touching the disk."""
+        base = Rom.from_bytes(bytes(2 * 1024 * 1024))
+
+        def fake_bps(self, patch):
+            self.rom[0] = 1
+
+        seed = ALTTPR()
+        seed.data = {'size': 2, 'patch': [{'1': [2]}]}
+        with patch.object(Rom, 'apply_bps_patch', fake_bps), \
+                patch.object(Rom, 'checksum'), \
+                patch('pyz3r.alttpr.Rom.aread', new_callable=AsyncMock) as mock_read, \
+                patch.object(seed, '_get_patch_base', AsyncMock(return_value=('md5', b'BPS1'))):
+            rom = await seed.create_patched_game(base)
+
+        mock_read.assert_not_called()
+        assert rom.rom[:3] == bytearray([1, 2, 0])
+        assert base.rom[:3] == bytearray(3)
+
+    async def test_mmap_output_matches_in_memory(self, tmp_path):
+        """Test that patching into a mapped output file writes the same ROM."""
+        base = Rom.from_bytes(bytes(2 * 1024 * 1024))
+        outputs = []
+        for mmap_output in (False, True):
+            seed = ALTTPR()
+            seed.data = {'size': 4, 'patch': [{'1': [2]}]}
+            output = tmp_path / f'{mmap_output}.sfc'
+            with patch.object(Rom, 'apply_bps_patch'), \
+                    patch.object(seed, '_get_patch_base', AsyncMock(return_value=(str(mmap_output), b'BPS1'))):
+                rom = await seed.create_patched_game(base, str(output), heartcolor='blue', mmap_output=mmap_output)
+            rom.close()
+            outputs.append(output.read_bytes())
+        assert outputs[0] == outputs[1]
+
+    async def test_seed_rom_shared_between_players(self):
+        """Test that players of one hash share the seed patches and only differ in cosmetics."""
+        base = Rom.from_bytes(bytes(2 * 1024 * 1024))
+        roms = []
+        with patch.object(Rom, 'apply_bps_patch'), \
+                patch.object(Rom, 'apply_dict_patches', autospec=True,
+                             side_effect=lambda self, patches: self.write_byte(1, 2)) as mock_patches:
+            for heartcolor in ('red', 'blue'):
+                seed = ALTTPR()
+                seed.hash = 'seedHash'
+                seed.data = {'size': 2, 'patch': []}
+                with patch.object(seed, '_get_patch_base', AsyncMock(return_value=('md5', b'BPS1'))) as mock_base:
+                    roms.append(await seed.create_patched_game(base, heartcolor=heartcolor))
+
+        assert mock_patches.call_count == 1
+        mock_base.assert_not_called()
+        assert 'seed_rom' in seed.timings
+        red, blue = (rom.rom for rom in roms)
+        assert red[1] == blue[1] == 2
+        assert red != blue
+        for data in (red, blue):
+            checksum = (sum(data[:32731]) + sum(data[32736:]) + 510) & 65535
+            assert int.from_bytes(data[0x7FDE:0x7FE0], 'little') == checksum
+
+    async def test_mmap_output_needs_filename(self):
+        """Test that mmap_output without an output file is rejected."""
+        seed = ALTTPR()
+        seed.data = {'size': 2, 'patch': []}
+        with pytest.raises(Pyz3rException):
+            await seed.create_patched_game(bytes(16), mmap_output=True)
 
 
 class TestALTTPRFormatSpoiler:
@@ -158,3 +422,38 @@ class TestALTTPRBackwardsCompatibility:
         # Both should work
         assert alttpr.hash == 'test123'
         assert hasattr(alttpr, 'hash_id')
+
+
+@pytest.mark.asyncio
+class TestCompactPatches:
+    """Test retrieving games with packed patches."""
+
+    @pytest.fixture(autouse=True)
+    def compact(self):
+        """Pack patches for the duration of a test."""
+        alttpr_module.set_compact_patches(True)
+        yield
+        alttpr_module.set_compact_patches(False)
+
+    async def test_retrieve(self):
+        """Test that the response is decoded with the patches packed."""
+        body = '{"hash":"packedHash","patch":[{"1573397":[1,2,3,4,5]}]}'
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(side_effect=lambda content_type, loads: loads(body))
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = mock_response
+            seed = await ALTTPR.retrieve(hash_id='packedHash')
+
+        assert isinstance(seed.data['patch'], PackedPatches)
+        assert seed.code == ['Boomerang', 'Hookshot', 'Bombs', 'Mushroom', 'Magic Powder']
+
+    async def test_cached_payload_not_modified(self):
+        """Test that packing a cached game leaves the shared cached payload alone."""
+        cached = {'hash': 'cachedHash', 'patch': [{'1573397': [1, 2, 3, 4, 5]}]}
+        seed_cache = Mock(aget=AsyncMock(return_value=cached))
+
+        seed = await ALTTPR.retrieve(hash_id='cachedHash', seed_cache=seed_cache)
+
+        assert isinstance(seed.data['patch'], PackedPatches)
+        assert cached['patch'] == [{'1573397': [1, 2, 3, 4, 5]}]
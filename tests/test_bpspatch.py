@@ -0,0 +1,97 @@
+"""Tests for pyz3r.bpspatch module."""
+
+import io
+import random
+
+import bps.apply
+import bps.diff
+import bps.io
+import bps.optimize
+import pytest
+
+from pyz3r import bpspatch
+from pyz3r.exceptions import Pyz3rException
+from pyz3r.rom import Rom
+
+
+def make_patch(source, target):
+    """Create a BPS patch with the reference implementation."""
+    out = io.BytesIO()
+    bps.io.write_bps(bps.optimize.optimize(bps.diff.diff_bytearrays(16, source, target)), out)
+    return out.getvalue()
+
+
+def reference_apply(patch, source):
+    """Apply a BPS patch with the reference implementation."""
+    target = io.BytesIO()
+    bps.apply.apply_to_files(io.BytesIO(patch), io.BytesIO(source), target)
+    return target.getvalue()
+
+
+@pytest.fixture
+def source_and_target():
+    """A source buffer and a target exercising every BPS action."""
+    rng = random.Random(3)
+    source = bytes(rng.randrange(256) for _ in range(8192))
+    target = bytearray(source)
+    target[100:164] = b'\x07' * 64                  # run-length fill (overlapping target copy)
+    target[500:600] = bytes(range(100))             # new data
+    target[2000:2500] = source[6000:6500]           # moved data
+    target += source[:1000] + b'xyz' * 200          # growth, repeated pattern
+    return source, bytes(target)
+
+
+class TestBpsApply:
+    """Test applying patches."""
+
+    def test_matches_reference(self, source_and_target):
+        """Test that the result matches the bps library."""
+        source, target = source_and_target
+        patch = make_patch(source, target)
+        result = bpspatch.apply(patch, source)
+        assert isinstance(result, bytearray)
+        assert result == target == reference_apply(patch, source)
+
+    def test_accepts_memoryview(self, source_and_target):
+        """Test applying from a memoryview of a bytearray source."""
+        source, target = source_and_target
+        assert bpspatch.apply(make_patch(source, target), memoryview(bytearray(source))) == target
+
+    def test_rom_apply_bps_patch(self, source_and_target):
+        """Test that Rom.apply_bps_patch replaces the ROM with the patched data."""
+        source, target = source_and_target
+        rom = Rom.__new__(Rom)
+        rom.rom = bytearray(source)
+        rom.apply_bps_patch(make_patch(source, target))
+        assert rom.rom == target
+
+
+class TestBpsValidation:
+    """Test CRC and format validation."""
+
+    def test_corrupt_patch(self, source_and_target):
+        """Test that a modified patch fails its CRC check."""
+        source, target = source_and_target
+        patch = bytearray(make_patch(source, target))
+        patch[10] ^= 0xFF
+        with pytest.raises(Pyz3rException, match='patch CRC32'):
+            bpspatch.apply(bytes(patch), source)
+
+    def test_wrong_source(self, source_and_target):
+        """Test that a source of the right size but wrong contents is rejected."""
+        source, target = source_and_target
+        wrong = bytearray(source)
+        wrong[0] ^= 0xFF
+        with pytest.raises(Pyz3rException, match='source CRC32'):
+            bpspatch.apply(make_patch(source, target), wrong)
+
+    def test_wrong_source_size(self, source_and_target):
+        """Test that a source of the wrong size is rejected."""
+        source, target = source_and_target
+        with pytest.raises(Pyz3rException):
+            bpspatch.apply(make_patch(source, target), source[:-1])
+
+    def test_not_a_patch(self):
+        """Test that non-BPS data is rejected."""
+        with pytest.raises(Pyz3rException):
+            bpspatch.apply(b'IPS' + bytes(20), b'')
@@ -0,0 +1,370 @@
+"""Tests for pyz3r.cache module."""
+
+import asyncio
+import gzip
+import zlib
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyz3r import cache
+from pyz3r.alttpr import ALTTPR
+from pyz3r.cache import (
+    BaseRomCache,
+    BpsCache,
+    BpsIndex,
+    DiskCache,
+    FileStore,
+    MemoryCache,
+    MemoryStore,
+    SeedCache,
+    SeedRomCache,
+    TieredCache,
+    encode,
+)
+from pyz3r.patches import PackedPatches
+
+
+def bps_patch(payload=b''):
+    """Build a minimal BPS file with a valid patch CRC32."""
+    body = b'BPS1' + payload + bytes(8)
+    return body + zlib.crc32(body).to_bytes(4, 'little')
+
+
+class TestMemoryCache:
+    """Test the in-process LRU tier."""
+
+    def test_get_and_set(self):
+        """Test storing and looking up an entry, counting hits and misses."""
+        mem = MemoryCache()
+        assert mem.get('a') is None
+        mem.set('a', {'hash': 'a'})
+        assert mem.get('a') == {'hash': 'a'}
+        assert (mem.hits, mem.misses) == (1, 1)
+
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted when over capacity."""
+        mem = MemoryCache(max_bytes=30)
+        mem.set('a', {}, size=10)
+        mem.set('b', {}, size=10)
+        mem.set('c', {}, size=10)
+        mem.get('a')
+        mem.set('d', {}, size=10)
+        assert mem.get('b') is None
+        assert mem.get('a') is not None
+        assert mem.size == 30
+
+    def test_packed_patches_encoded_as_list(self):
+        """Test that packed patches are stored as the patch list they were packed from."""
+        patch_list = [{'10': [1, 2]}, {'0': [3]}]
+        assert cache.decode(encode({'patch': PackedPatches.pack(patch_list)})) == {'patch': patch_list}
+
+    def test_oversized_entry_not_cached(self):
+        """Test that an entry larger than the whole cache is skipped."""
+        mem = MemoryCache(max_bytes=5)
+        mem.set('a', {'hash': 'too big'})
+        assert len(mem) == 0
+
+
+class TestStores:
+    """Test the generic stores the caches are built on."""
+
+    def test_memory_store_holds_any_value(self):
+        """Test that a memory store keeps arbitrary values, bounded by the given sizes."""
+        store = MemoryStore(max_bytes=4)
+        store.set('a', (b'ab', 1), 2)
+        store.set('b', b'cd', 2)
+        store.set('c', b'ef', 2)
+        assert store.get('a') is None
+        assert store.get('c') == b'ef'
+        assert store.size == 4
+
+    def test_file_store_round_trip(self, tmp_path):
+        """Test that files are stored under their key, compressed only when asked."""
+        FileStore(str(tmp_path), 1024, '.bin').store('raw', b'data')
+        FileStore(str(tmp_path), 1024, '.gz', compresslevel=1).store('packed', b'data')
+        assert (tmp_path / 'raw.bin').read_bytes() == b'data'
+        assert gzip.decompress((tmp_path / 'packed.gz').read_bytes()) == b'data'
+        assert FileStore(str(tmp_path), 1024, '.gz', compresslevel=1).load('packed') == b'data'
+
+
+class TestDiskCache:
+    """Test the compressed on-disk tier."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that entries survive a new cache instance on the same directory."""
+        DiskCache(str(tmp_path)).set('a', {'hash': 'a', 'patch': [{'1': [2]}]})
+        assert DiskCache(str(tmp_path)).get('a') == {'hash': 'a', 'patch': [{'1': [2]}]}
+        assert DiskCache(str(tmp_path)).get('b') is None
+
+    def test_no_temp_files_left(self, tmp_path):
+        """Test that atomic writes leave only the final file behind."""
+        DiskCache(str(tmp_path)).set('a', {'hash': 'a'})
+        assert [p.name.endswith(DiskCache.SUFFIX) for p in tmp_path.iterdir()] == [True]
+
+    def test_corrupt_entry_discarded(self, tmp_path):
+        """Test that an unreadable file is treated as a miss and removed."""
+        disk = DiskCache(str(tmp_path))
+        disk.set('a', {'hash': 'a'})
+        path = disk._path('a')
+        path.write_bytes(b'not gzip')
+        assert disk.get('a') is None
+        assert not path.exists()
+
+    def test_evicts_by_capacity(self, tmp_path):
+        """Test that the directory is kept under max_bytes."""
+        disk = DiskCache(str(tmp_path), max_bytes=len(gzip.compress(encode({'n': 0}))) * 2)
+        for n in range(5):
+            disk.set(f'k{n}', {'n': n})
+        assert len(list(tmp_path.iterdir())) <= 2
+        assert disk.get('k4') == {'n': 4}
+
+
+class TestTieredCache:
+    """Test the combined memory and disk cache."""
+
+    def test_disk_hit_promoted(self, tmp_path):
+        """Test that an entry found only on disk is copied into memory."""
+        DiskCache(str(tmp_path)).set('a', {'hash': 'a'})
+        tiered = TieredCache(MemoryCache(), DiskCache(str(tmp_path)))
+        assert tiered.get('a') == {'hash': 'a'}
+        assert len(tiered.memory) == 1
+
+    @pytest.mark.asyncio
+    async def test_async_access(self, tmp_path):
+        """Test that aset writes both tiers and aget promotes disk hits."""
+        await TieredCache(MemoryCache(), DiskCache(str(tmp_path))).aset('a', {'hash': 'a'})
+        tiered = TieredCache(MemoryCache(), DiskCache(str(tmp_path)))
+        assert await tiered.aget('a') == {'hash': 'a'}
+        assert len(tiered.memory) == 1
+        assert await tiered.aget('b') is None
+
+
+@pytest.mark.asyncio
+class TestRetrieveCaching:
+    """Test that the clients use the seed cache."""
+
+    async def test_second_retrieve_hits_cache(self):
+        """Test that retrieving the same hash twice makes one request."""
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(return_value={'hash': 'cachedHash', 'patch': []})
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = mock_response
+            first = await ALTTPR.retrieve(hash_id='cachedHash')
+            second = await ALTTPR.retrieve(hash_id='cachedHash')
+
+        assert mock_request.call_count == 1
+        assert first.data == second.data == {'hash': 'cachedHash', 'patch': []}
+
+    async def test_auth_cached_separately(self):
+        """Test that a game retrieved with credentials is not served to anonymous callers."""
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(return_value={'hash': 'authHash', 'patch': [], 'spoiler': {}})
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = mock_response
+            await ALTTPR.retrieve(hash_id='authHash', username='user', password='secret')
+            await ALTTPR.retrieve(hash_id='authHash', username='user', password='secret')
+            assert mock_request.call_count == 1
+            await ALTTPR.retrieve(hash_id='authHash')
+            assert mock_request.call_count == 2
+
+    async def test_disabled_cache(self):
+        """Test that a plain SeedCache disables caching for a client."""
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(return_value={'hash': 'uncachedHash', 'patch': []})
+        cache.set_default_seed_cache(SeedCache())
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = mock_response
+            await ALTTPR.retrieve(hash_id='uncachedHash')
+            await ALTTPR.retrieve(hash_id='uncachedHash')
+
+        assert mock_request.call_count == 2
+
+
+class TestBpsCache:
+    """Test the bounded BPS patch cache."""
+
+    def test_memory_layer(self, tmp_path):
+        """Test that a patch is read from disk once, then served from memory."""
+        (tmp_path / 'abc.bps').write_bytes(bps_patch())
+        bps = BpsCache(str(tmp_path))
+        assert bps.get('abc') == bps_patch()
+        (tmp_path / 'abc.bps').unlink()
+        assert bps.get('abc') == bps_patch()
+        assert bps.get('def') is None
+        assert (bps.hits, bps.misses) == (2, 1)
+
+    def test_evicts_old_patches(self, tmp_path):
+        """Test that least recently used patches are removed beyond max_bytes."""
+        bps = BpsCache(str(tmp_path), max_bytes=len(bps_patch()) * 3 // 2)
+        bps.set('old', bps_patch())
+        bps.set('new', bps_patch())
+        assert not (tmp_path / 'old.bps').exists()
+        assert (tmp_path / 'new.bps').read_bytes() == bps_patch()
+
+    def test_corrupt_patch_discarded(self, tmp_path):
+        """Test that a truncated patch on disk is treated as a miss and removed."""
+        (tmp_path / 'abc.bps').write_bytes(bps_patch(b'data')[:-1])
+        assert BpsCache(str(tmp_path)).get('abc') is None
+        assert not (tmp_path / 'abc.bps').exists()
+
+    def test_corrupt_download_not_cached(self, tmp_path):
+        """Test that a patch failing verification is not stored."""
+        bps = BpsCache(str(tmp_path))
+        bps.set('abc', b'not a patch')
+        assert bps.get('abc') is None
+        assert not (tmp_path / 'abc.bps').exists()
+
+    @pytest.mark.asyncio
+    async def test_locked_is_exclusive(self, tmp_path):
+        """Test that holders of the same key's lock run one at a time."""
+        bps = BpsCache(str(tmp_path))
+        active = []
+
+        async def hold():
+            async with bps.locked('abc'):
+                active.append(1)
+                assert len(active) == 1
+                await asyncio.sleep(0.01)
+                active.pop()
+
+        await asyncio.gather(hold(), hold(), hold())
+
+    @pytest.mark.asyncio
+    async def test_locks_are_per_patch(self, tmp_path):
+        """Test that different patches can be locked at once, outside the patch listing."""
+        bps = BpsCache(str(tmp_path))
+
+        async def hold_both():
+            async with bps.locked('abc'), bps.locked('def'):
+                pass
+
+        await asyncio.wait_for(hold_both(), timeout=1)
+        bps.set('abc', bps_patch())
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['abc.bps', BpsCache.LOCK_DIRECTORY]
+        assert sorted(path.name for path in (tmp_path / BpsCache.LOCK_DIRECTORY).iterdir()) == ['abc.lock', 'def.lock']
+
+
+class TestBpsIndex:
+    """Test the persistent BPS patch index."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that entries are saved to disk and found under every key."""
+        BpsIndex(str(tmp_path / 'index.json')).set(['a', 'b'], {'md5': 'abc', 'bpsLocation': '/bps/abc.bps'})
+        index = BpsIndex(str(tmp_path / 'index.json'))
+        assert index.get('missing', 'b') == {'md5': 'abc', 'bpsLocation': '/bps/abc.bps'}
+        assert index.get('missing') is None
+
+    def test_oldest_entries_dropped(self, tmp_path):
+        """Test that the index is bounded by max_entries."""
+        index = BpsIndex(str(tmp_path / 'index.json'), max_entries=2)
+        for key in 'abc':
+            index.set([key], {'md5': key, 'bpsLocation': f'/bps/{key}.bps'})
+        assert index.get('a') is None
+        assert index.get('c')['md5'] == 'c'
+
+
+@pytest.mark.asyncio
+class TestPatchBaseCaching:
+    """Test that cached BPS patches are loaded without contacting the API."""
+
+    @pytest.fixture(autouse=True)
+    def bps_dir(self, tmp_path):
+        """Point the BPS cache at a temporary directory."""
+        cache.set_default_bps_cache(BpsCache(str(tmp_path)))
+        cache.set_default_bps_index(BpsIndex(str(tmp_path / 'index.json')))
+        yield tmp_path
+        cache.set_default_bps_cache(None)
+        cache.set_default_bps_index(None)
+
+    def seed(self, rom_hash='romhash'):
+        """Build an ALTTPR seed with retrieved data."""
+        seed = ALTTPR()
+        seed.hash = 'seedHash'
+        seed.data = {'hash': 'seedHash', 'current_rom_hash': rom_hash}
+        return seed
+
+    async def test_current_rom_hash_not_trusted(self, bps_dir):
+        """Test that the site's current ROM build is not taken as the seed's base patch."""
+        (bps_dir / 'romhash.bps').write_bytes(bps_patch(b'new'))
+        meta_response = AsyncMock()
+        meta_response.json = AsyncMock(return_value={'md5': 'oldmd5', 'bpsLocation': '/bps/oldmd5.bps'})
+        bps_response = AsyncMock()
+        bps_response.read = AsyncMock(return_value=bps_patch(b'old'))
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.side_effect = [meta_response, bps_response]
+            assert await self.seed().get_patch_base() == bps_patch(b'old')
+        assert mock_request.call_count == 2
+
+    async def test_index_avoids_metadata_request(self, bps_dir):
+        """Test that patching a seed again makes no requests, and other seeds still ask the API."""
+        meta_response = AsyncMock()
+        meta_response.json = AsyncMock(return_value={'md5': 'patchmd5', 'bpsLocation': '/bps/patchmd5.bps'})
+        bps_response = AsyncMock()
+        bps_response.read = AsyncMock(return_value=bps_patch())
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.side_effect = [meta_response, bps_response, meta_response]
+            assert await self.seed().get_patch_base() == bps_patch()
+            assert mock_request.call_count == 2
+
+            assert await self.seed().get_patch_base() == bps_patch()
+            assert mock_request.call_count == 2
+
+            other = self.seed()
+            other.hash = 'otherHash'
+            assert await other.get_patch_base() == bps_patch()
+            assert mock_request.call_count == 3
+
+
+class TestBaseRomCache:
+    """Test the cache of patched base ROM images."""
+
+    def test_source_hash_remembered_until_file_changes(self, tmp_path):
+        """Test that an input file's md5 is remembered while its size and mtime are unchanged."""
+        path = tmp_path / 'base.sfc'
+        path.write_bytes(b'rom')
+        base_roms = BaseRomCache()
+        assert base_roms.source_hash(str(path)) is None
+        md5 = base_roms.remember_source(str(path), b'rom')
+        assert base_roms.source_hash(str(path)) == md5
+
+        path.write_bytes(b'other')
+        assert base_roms.source_hash(str(path)) is None
+
+    def test_remembered_sources_bounded(self, tmp_path):
+        """Test that the least recently used input files are forgotten."""
+        paths = [tmp_path / f'{n}.sfc' for n in range(3)]
+        for path in paths:
+            path.write_bytes(b'rom')
+        base_roms = BaseRomCache(max_sources=2)
+        base_roms.remember_source(str(paths[0]), b'rom')
+        base_roms.remember_source(str(paths[1]), b'rom')
+        assert base_roms.source_hash(str(paths[0])) is not None
+        base_roms.remember_source(str(paths[2]), b'rom')
+        assert base_roms.source_hash(str(paths[1])) is None
+        assert base_roms.source_hash(str(paths[0])) is not None
+        assert BaseRomCache().max_sources == 16
+
+    def test_images_keyed_by_source_and_patch(self):
+        """Test that images are stored as bytes under both md5s."""
+        base_roms = BaseRomCache()
+        base_roms.set('rom', 'bps', bytearray(b'image'))
+        assert base_roms.get('rom', 'bps') == b'image'
+        assert isinstance(base_roms.get('rom', 'bps'), bytes)
+        assert base_roms.get('rom', 'other') is None
+
+
+class TestSeedRomCache:
+    """Test the cache of patched seed ROMs."""
+
+    def test_images_keyed_by_source_and_seed(self):
+        """Test that images are stored as bytes with their byte sum."""
+        seed_roms = SeedRomCache()
+        seed_roms.set('rom', 'https://alttpr.com/hash/a', bytearray(b'image'), 5)
+        assert seed_roms.get('rom', 'https://alttpr.com/hash/a') == (b'image', 5)
+        assert seed_roms.get('rom', 'https://alttpr.com/hash/b') is None
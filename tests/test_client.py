@@ -0,0 +1,120 @@
+"""Tests for pyz3r.client module."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from pyz3r import client
+from pyz3r.alttpr import ALTTPR
+from pyz3r.sm import smClass
+from pyz3r.smvaria import SuperMetroidVaria
+
+
+@pytest.mark.asyncio
+class TestCreateSession:
+    """Test pooled session creation."""
+
+    async def test_connector_settings(self):
+        """Test that the connector is configured for pooling and DNS caching."""
+        async with client.create_session(limit_per_host=4, ttl_dns_cache=60) as session:
+            connector = session.connector
+            assert connector.limit_per_host == 4
+            assert connector.use_dns_cache is True
+        assert session.closed
+
+
+@pytest.mark.asyncio
+class TestRequest:
+    """Test request routing through a shared session."""
+
+    async def test_request_without_session(self):
+        """Test that a one-shot request is made when no session is given."""
+        with patch('aiohttp.request') as mock_request:
+            async with client.request('get', 'https://example.com/x'):
+                pass
+            mock_request.assert_called_once_with(method='get', url='https://example.com/x')
+
+    async def test_request_with_session(self):
+        """Test that the shared session is used when one is given."""
+        session = MagicMock()
+        async with client.request('post', 'https://example.com/x', session=session, json={}):
+            pass
+        session.request.assert_called_once_with(method='post', url='https://example.com/x', json={})
+
+    async def test_alttpr_uses_session(self):
+        """Test that ALTTPR.retrieve reuses an injected session."""
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(return_value={'hash': 'testHash', 'patch': []})
+        session = MagicMock()
+        session.request.return_value.__aenter__.return_value = mock_response
+
+        with patch('aiohttp.request') as mock_request:
+            seed = await ALTTPR.retrieve(hash_id='testHash', session=session)
+            mock_request.assert_not_called()
+
+        assert seed.session is session
+        assert seed.data['hash'] == 'testHash'
+        session.request.assert_called_once()
+
+    async def test_clients_accept_session(self):
+        """Test that the SM and VARIA clients store an injected session."""
+        session = MagicMock()
+        sm_seed = smClass(None, None, None, 'https://samus.link', 'sm', None, None, session=session)
+        varia_seed = SuperMetroidVaria('regular', 'default', False, 'https://example.com', None, None, None,
+                                       session=session)
+        assert sm_seed.session is session
+        assert varia_seed.session is session
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Test coalescing of concurrent identical requests."""
+
+    async def test_concurrent_calls_share_result(self):
+        """Test that concurrent calls for one key run the function once."""
+        import asyncio
+        flight = client.SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {'hash': 'abc'}
+
+        results = await asyncio.gather(*[flight.do('abc', fn) for _ in range(5)])
+        assert calls == 1
+        assert all(r is results[0] for r in results)
+        assert len(flight) == 0
+
+    async def test_exception_shared_and_forgotten(self):
+        """Test that a failure reaches every waiter and is not cached."""
+        import asyncio
+        flight = client.SingleFlight()
+        fn = AsyncMock(side_effect=ValueError('boom'))
+
+        results = await asyncio.gather(flight.do('k', fn), flight.do('k', fn), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert fn.call_count == 1
+
+        fn.side_effect = None
+        fn.return_value = 'ok'
+        assert await flight.do('k', fn) == 'ok'
+        assert fn.call_count == 2
+
+    async def test_alttpr_retrieve_coalesced(self):
+        """Test that concurrent ALTTPR retrieves of one hash make one request."""
+        import asyncio
+        mock_response = AsyncMock()
+
+        async def slow_json(**kwargs):
+            await asyncio.sleep(0.01)
+            return {'hash': 'raceHash', 'patch': []}
+        mock_response.json = slow_json
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = mock_response
+            seeds = await asyncio.gather(*[ALTTPR.retrieve(hash_id='raceHash') for _ in range(10)])
+            assert mock_request.call_count == 1
+
+        assert all(seed.data['hash'] == 'raceHash' for seed in seeds)
@@ -0,0 +1,73 @@
+"""Tests for pyz3r.cosmetics module."""
+
+import itertools
+import pickle
+
+import pytest
+
+from pyz3r.cosmetics import CosmeticPreset
+from pyz3r.exceptions import Pyz3rException
+from pyz3r.rom import Rom
+
+
+def make_rom(version):
+    """A 2 MiB ROM of the given version."""
+    rom = Rom.from_bytes(bytes(2 * 1024 * 1024))
+    rom.rom[0x7FE2:0x7FE4] = version.to_bytes(2, 'little')
+    return rom
+
+
+class TestCosmeticPreset:
+    """Test compiled cosmetic presets."""
+
+    @pytest.mark.parametrize('version', [0, 4])
+    def test_matches_rom_methods(self, version):
+        """Test that a preset writes the same bytes as the individual Rom methods."""
+        for heartspeed, heartcolor, menu_speed, flags in itertools.product(
+                ['off', 'quarter'], ['red', 'yellow'], ['instant', 'slow'],
+                itertools.product([False, True], repeat=3)):
+            quickswap, music, msu1_resume = flags
+            expected = make_rom(version)
+            expected.heart_speed(heartspeed)
+            expected.heart_color(heartcolor)
+            expected.menu_speed(menu_speed)
+            expected.quickswap(quickswap)
+            expected.music(music)
+            expected.msu1_resume(msu1_resume)
+
+            rom = make_rom(version)
+            rom.apply_cosmetics(CosmeticPreset.compile(
+                version, heartspeed=heartspeed, heartcolor=heartcolor, menu_speed=menu_speed,
+                quickswap=quickswap, music=music, msu1_resume=msu1_resume))
+            assert rom.rom == expected.rom
+
+    def test_compile_is_cached(self):
+        """Test that compiling the same choices returns the same preset."""
+        assert CosmeticPreset.compile(4, heartcolor='blue') is CosmeticPreset.compile(4, heartcolor='blue')
+        assert CosmeticPreset.compile(4, heartcolor='blue') is not CosmeticPreset.compile(0, heartcolor='blue')
+
+    def test_unknown_heart_color(self):
+        """Test that an unknown heart color is rejected when compiling."""
+        with pytest.raises(Pyz3rException):
+            CosmeticPreset.compile(4, heartcolor='purple')
+
+    def test_checksum_tracked(self):
+        """Test that applying a preset keeps the ROM's byte sum up to date."""
+        rom = make_rom(4)
+        rom.rom[0x180033] = 7
+        assert rom.byte_sum == 7 + 4
+        rom.apply_cosmetics(CosmeticPreset.compile(4, heartspeed='quarter', reduce_flashing=True))
+        assert rom.byte_sum == sum(rom.rom)
+
+    def test_out_of_bounds(self):
+        """Test that nothing is written if the preset does not fit in the ROM."""
+        rom = Rom.from_bytes(bytes(16))
+        with pytest.raises(Pyz3rException):
+            rom.apply_cosmetics(CosmeticPreset.compile(4))
+        assert rom.rom == bytes(16)
+
+    def test_pickle(self):
+        """Test that presets survive pickling, for use with process pools."""
+        preset = CosmeticPreset.compile(0, heartcolor='green')
+        restored = pickle.loads(pickle.dumps(preset))
+        assert (restored.offsets, restored.values) == (preset.offsets, preset.values)
@@ -0,0 +1,58 @@
+"""Tests for pyz3r.jsoncodec module."""
+
+import json
+
+import pytest
+
+from pyz3r import jsoncodec
+from pyz3r.cache import decode, encode
+from pyz3r.exceptions import Pyz3rException
+from pyz3r.patches import PackedPatches
+
+INSTALLED = [name for name in jsoncodec.BACKENDS if name == 'json' or getattr(jsoncodec, name) is not None]
+
+
+@pytest.fixture(params=INSTALLED)
+def backend(request):
+    """Run a test with each installed JSON library."""
+    jsoncodec.set_backend(request.param)
+    yield request.param
+    jsoncodec.set_backend(None)
+
+
+class TestCodec:
+    """Test encoding and decoding."""
+
+    def test_round_trip(self, backend):
+        """Test that every library decodes what it encodes, as compact UTF-8 JSON."""
+        value = {'hash': 'abc', 'patch': [{'10': [1, 2]}], 'name': 'Sprite é', 'n': None}
+        data = jsoncodec.dumps(value)
+        assert data.startswith(b'{"hash":"abc","patch":[{"10":[1,2]}],')
+        assert jsoncodec.loads(data) == jsoncodec.loads(data.decode('utf-8')) == value
+
+    def test_invalid_json(self, backend):
+        """Test that decoding errors are raised as json.JSONDecodeError."""
+        with pytest.raises(json.JSONDecodeError):
+            jsoncodec.loads(b'{"hash": ')
+
+    def test_loads_seed(self, backend):
+        """Test that the patch list of a seed is packed."""
+        data = jsoncodec.loads_seed(b'{"hash":"abc","patch":[{"10":[1,2]},{"0":[3]}]}')
+        assert data['hash'] == 'abc'
+        assert data['patch'] == PackedPatches.pack([{'10': [1, 2]}, {'0': [3]}])
+        assert jsoncodec.loads_seed(b'[1]') == [1]
+
+    def test_cache_round_trip(self, backend):
+        """Test that the caches store packed patches as a patch list."""
+        data = jsoncodec.loads_seed(b'{"patch":[{"10":[1,2]}]}')
+        assert decode(encode(data)) == {'patch': [{'10': [1, 2]}]}
+
+    def test_set_backend(self):
+        """Test that unknown libraries are rejected and None picks the fastest one installed."""
+        with pytest.raises(Pyz3rException):
+            jsoncodec.set_backend('simplejson')
+        jsoncodec.set_backend('json')
+        assert jsoncodec.get_backend() == 'json'
+        jsoncodec.set_backend(None)
+        assert jsoncodec.get_backend() == INSTALLED[0]
+
@@ -2,6 +2,7 @@
 
 import pytest
 from pyz3r import misc
+from pyz3r.patches import PackedPatches
 
 
 class TestChunkFunction:
@@ -60,6 +61,31 @@ class TestSeekPatchData:
         with pytest.raises(ValueError):
             misc.seek_patch_data(patches, 50, 2)
 
+    def test_seek_patch_data_first_offset(self):
+        """Test seeking the first patched offset."""
+        patches = [{"100": [1, 2, 3]}, {"200": [4]}]
+        assert misc.seek_patch_data(patches, 100, 2) == [1, 2]
+
+    def test_seek_patch_data_past_the_end(self):
+        """Test seeking beyond the last patch or into a gap."""
+        patches = [{"100": [1, 2, 3]}, {"200": [4]}]
+        with pytest.raises(ValueError):
+            misc.seek_patch_data(patches, 300, 1)
+        with pytest.raises(ValueError):
+            misc.seek_patch_data(patches, 150, 1)
+
+    def test_seek_patch_data_spans_patches(self):
+        """Test reading across adjacent patches."""
+        patches = [{"103": [4, 5]}, {"100": [1, 2, 3]}]
+        assert misc.seek_patch_data(patches, 102, 4) == [3, 4, 5]
+
+    def test_seek_patch_data_packed(self):
+        """Test seeking into packed patches."""
+        patches = PackedPatches.pack([{"100": [1, 2, 3]}, {"200": [4]}])
+        assert misc.seek_patch_data(patches, 101, 2) == [2, 3]
+        with pytest.raises(ValueError):
+            misc.seek_patch_data(patches, 150, 1)
+
 
 class TestConvertRandomizerSettings:
     """Test the convert_randomizer_settings function."""
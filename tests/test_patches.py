@@ -0,0 +1,166 @@
+"""Tests for pyz3r.patches module."""
+
+import pickle
+import random
+
+import pytest
+
+from pyz3r import patches as patches_module
+from pyz3r.exceptions import Pyz3rException
+from pyz3r.patches import PackedPatches, PatchIndex, PatchPlan
+
+
+def apply_in_order(rom, patches):
+    """Apply patches one byte at a time, in list order."""
+    for patch in patches:
+        for key, values in patch.items():
+            for idx, value in enumerate(values):
+                rom[int(key) + idx] = value
+
+
+class TestPatchPlanCompile:
+    """Test compiling patch lists."""
+
+    def test_sorted_and_coalesced(self):
+        """Test that adjacent patches are merged and ranges are sorted."""
+        plan = PatchPlan.compile([{'10': [3, 4]}, {'0': [1]}, {'8': [2]}, {'1': [5]}])
+        assert plan.ranges == [(0, b'\x01\x05'), (8, b'\x02'), (10, b'\x03\x04')]
+        assert (plan.start, plan.end, plan.size) == (0, 12, 5)
+
+    def test_overlaps_resolved_in_list_order(self):
+        """Test that overlapping patches match applying the list in order."""
+        rng = random.Random(7)
+        patch_list = [
+            {str(rng.randrange(200)): [rng.randrange(256) for _ in range(rng.randrange(1, 20))]}
+            for _ in range(100)
+        ]
+        expected = bytearray(256)
+        apply_in_order(expected, patch_list)
+        rom = bytearray(256)
+        PatchPlan.compile(patch_list).apply(rom, use_numpy=False)
+        assert rom == expected
+
+    def test_invalid_patches(self):
+        """Test that bad offsets and values are rejected."""
+        with pytest.raises(Pyz3rException):
+            PatchPlan.compile([{'-1': [0]}])
+        with pytest.raises(Pyz3rException):
+            PatchPlan.compile([{'x': [0]}])
+        with pytest.raises(Pyz3rException):
+            PatchPlan.compile([{'0': [256]}])
+
+    def test_pickle(self):
+        """Test that plans survive pickling, for use with process pools."""
+        plan = PatchPlan.compile([{'4': [1, 2]}])
+        assert pickle.loads(pickle.dumps(plan)).ranges == plan.ranges
+
+
+class TestPatchPlanApply:
+    """Test applying compiled plans."""
+
+    def test_out_of_bounds_rejected_up_front(self):
+        """Test that nothing is written if any range is past the end of the ROM."""
+        rom = bytearray(16)
+        with pytest.raises(Pyz3rException):
+            PatchPlan.compile([{'0': [1]}, {'15': [2, 3]}]).apply(rom)
+        assert rom == bytearray(16)
+
+    def test_numpy_required(self, monkeypatch):
+        """Test that requesting NumPy without it installed raises."""
+        monkeypatch.setattr(patches_module, 'np', None)
+        with pytest.raises(Pyz3rException):
+            PatchPlan.compile([{'0': [1]}]).apply(bytearray(4), use_numpy=True)
+
+    def test_numpy_matches_slices(self):
+        """Test that the NumPy scatter, slice assignment and the default write the same bytes."""
+        pytest.importorskip('numpy')
+        rng = random.Random(14)
+        patch_list = [
+            {str(rng.randrange(8192)): [rng.randrange(256) for _ in range(rng.randrange(1, 8))]}
+            for _ in range(2000)
+        ]
+        plan = PatchPlan.compile(patch_list)
+        assert len(plan) >= patches_module.NUMPY_MIN_RANGES
+        expected = bytearray(8200)
+        apply_in_order(expected, patch_list)
+        results = []
+        for use_numpy in (True, False, None):
+            rom = bytearray(8200)
+            plan.apply(rom, use_numpy=use_numpy)
+            results.append(rom)
+        assert results == [expected] * 3
+
+
+class TestPatchIndex:
+    """Test offset lookups into patches."""
+
+    def test_read(self):
+        """Test reads at, inside, across and past the ends of patches."""
+        index = PatchIndex.compile([{'10': [1, 2]}, {'12': [3]}, {'20': [4, 5, 6]}])
+        assert index.read(10, 3) == b'\x01\x02\x03'
+        assert index.read(11, 10) == b'\x02\x03'
+        assert index.read(21, 1) == b'\x05'
+        assert 22 in index and 23 not in index
+        for offset in (0, 13, 23):
+            with pytest.raises(KeyError):
+                index.read(offset, 1)
+
+    def test_matches_linear_scan(self):
+        """Test every offset of a random patch list against a byte map."""
+        rng = random.Random(11)
+        patch_list = [{str(rng.randrange(500)): [rng.randrange(256)] * rng.randrange(1, 8)} for _ in range(60)]
+        written = {}
+        for patch in patch_list:
+            for key, values in patch.items():
+                for idx, value in enumerate(values):
+                    written[int(key) + idx] = value
+        index = PatchIndex.compile(patch_list)
+        for offset in range(520):
+            if offset in written:
+                assert index.read(offset, 1)[0] == written[offset]
+            else:
+                assert offset not in index
+
+
+class TestPackedPatches:
+    """Test packing patch lists into flat buffers."""
+
+    def test_round_trip(self):
+        """Test that packing keeps every patch, in order."""
+        patch_list = [{'10': [1, 2]}, {'0': []}, {'10': [3]}, {'1048576': [255]}]
+        packed = PackedPatches.pack(patch_list)
+        assert len(packed) == 4
+        assert list(packed) == [(10, b'\x01\x02'), (0, b''), (10, b'\x03'), (1048576, b'\xff')]
+        assert packed.to_list() == patch_list
+        assert PackedPatches.pack(packed) is packed
+
+    def test_compiles_like_list(self):
+        """Test that a plan and index built from packed patches match the patch list."""
+        rng = random.Random(5)
+        patch_list = [
+            {str(rng.randrange(300)): [rng.randrange(256) for _ in range(rng.randrange(1, 12))]}
+            for _ in range(80)
+        ]
+        packed = PackedPatches.pack(patch_list)
+        assert PatchPlan.compile(packed).ranges == PatchPlan.compile(patch_list).ranges
+        index, expected = PatchIndex.compile(packed), PatchIndex.compile(patch_list)
+        for offset in range(320):
+            assert (offset in index) == (offset in expected)
+            if offset in index:
+                assert index.read(offset, 4) == expected.read(offset, 4)
+
+    def test_invalid_patches(self):
+        """Test that bad offsets and values are rejected when packing."""
+        for patch_list in ([{'-1': [0]}], [{'x': [0]}], [{'0': [256]}], [{'4294967296': [0]}]):
+            with pytest.raises(Pyz3rException):
+                PackedPatches.pack(patch_list)
+
+    def test_nbytes(self):
+        """Test that each patch costs eight bytes plus its data."""
+        packed = PackedPatches.pack([{str(n * 16): list(range(16))} for n in range(1000)])
+        assert packed.nbytes == 1000 * 8 + 16000
+
+    def test_pickle(self):
+        """Test that packed patches survive pickling, for use with process pools."""
+        packed = PackedPatches.pack([{'4': [1, 2]}, {'9': [3]}])
+        assert pickle.loads(pickle.dumps(packed)) == packed
@@ -0,0 +1,95 @@
+"""Tests for pyz3r.ratelimit module."""
+
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyz3r import ratelimit
+from pyz3r.alttpr import ALTTPR
+from pyz3r.ratelimit import TokenBucket
+
+
+@pytest.fixture(autouse=True)
+def clear_limits():
+    """Make sure no rate limits leak between tests."""
+    ratelimit.clear_rate_limit()
+    yield
+    ratelimit.clear_rate_limit()
+
+
+class TestTokenBucket:
+    """Test token bucket configuration."""
+
+    def test_starts_full(self):
+        """Test that a new bucket allows a full burst."""
+        bucket = TokenBucket(rate=1, burst=3)
+        assert bucket.tokens == pytest.approx(3)
+
+    def test_invalid_settings(self):
+        """Test that non-positive rates and bursts are rejected."""
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+        with pytest.raises(ValueError):
+            TokenBucket(rate=1, burst=0)
+
+
+@pytest.mark.asyncio
+class TestTokenBucketAcquire:
+    """Test waiting for capacity."""
+
+    async def test_burst_does_not_wait(self):
+        """Test that requests within the burst are not delayed."""
+        bucket = TokenBucket(rate=1, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        assert time.monotonic() - start < 0.1
+
+    async def test_waits_for_refill(self):
+        """Test that a request beyond the burst waits for a token."""
+        bucket = TokenBucket(rate=20, burst=1)
+        await bucket.acquire()
+        start = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - start >= 0.04
+
+
+class TestRegistry:
+    """Test the per-host registry."""
+
+    def test_lookup_by_host(self):
+        """Test that any URL on a registered host finds its limiter."""
+        limiter = ratelimit.set_rate_limit('https://alttpr.com', rate=2, burst=5)
+        assert ratelimit.get_rate_limiter('https://alttpr.com/api/randomizer') is limiter
+        assert ratelimit.get_rate_limiter('https://samus.link/api/seed/1') is None
+
+    def test_lookup_by_origin(self):
+        """Test that hosts are matched case-insensitively, ignoring default ports and credentials."""
+        limiter = ratelimit.set_rate_limit('https://alttpr.com', rate=2)
+        assert ratelimit.get_rate_limiter('HTTPS://user:pw@ALTTPR.com:443/api') is limiter
+        assert ratelimit.get_rate_limiter('https://alttpr.com:8443/api') is None
+        assert ratelimit.get_rate_limiter('http://alttpr.com/api') is None
+
+    def test_clear(self):
+        """Test removing a registered limit."""
+        ratelimit.set_rate_limit('https://alttpr.com', rate=2)
+        ratelimit.clear_rate_limit('https://alttpr.com')
+        assert ratelimit.get_rate_limiter('https://alttpr.com') is None
+
+
+@pytest.mark.asyncio
+class TestClientIntegration:
+    """Test that client requests wait on the registered limiter."""
+
+    async def test_retrieve_acquires_token(self):
+        """Test that ALTTPR.retrieve consumes a token from the host's limiter."""
+        limiter = ratelimit.set_rate_limit('https://alttpr.com', rate=1, burst=2)
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(return_value={'hash': 'testHash', 'patch': []})
+
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = mock_response
+            await ALTTPR.retrieve(hash_id='testHash')
+
+        assert limiter.tokens == pytest.approx(1, abs=0.1)
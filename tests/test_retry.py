@@ -0,0 +1,118 @@
+"""Tests for pyz3r.retry module."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiohttp
+import pytest
+from multidict import CIMultiDict
+
+from pyz3r import retry
+from pyz3r.retry import RetryPolicy, parse_retry_after
+
+
+def response_error(status, headers=None):
+    """Build a ClientResponseError with the given status and headers."""
+    return aiohttp.ClientResponseError(
+        request_info=MagicMock(), history=(), status=status,
+        headers=CIMultiDict(headers or {}))
+
+
+class TestRetryClassification:
+    """Test which failures are retried."""
+
+    def test_retryable_statuses(self):
+        """Test that transient statuses are retried."""
+        policy = RetryPolicy()
+        for status in (429, 500, 502, 503, 504):
+            assert policy.is_retryable(response_error(status))
+
+    def test_client_errors_not_retried(self):
+        """Test that client errors such as 400 and 404 are not retried."""
+        policy = RetryPolicy()
+        for status in (400, 403, 404, 422):
+            assert not policy.is_retryable(response_error(status))
+
+    def test_connection_errors_retried(self):
+        """Test that dropped connections are retried."""
+        policy = RetryPolicy()
+        assert policy.is_retryable(aiohttp.ServerDisconnectedError())
+        assert not policy.is_retryable(ValueError())
+
+
+class TestRetryDelay:
+    """Test backoff and Retry-After handling."""
+
+    def test_exponential_backoff_without_jitter(self):
+        """Test that the backoff doubles and is capped at max_delay."""
+        policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False)
+        assert [policy.backoff(n) for n in range(1, 5)] == [1, 2, 4, 5]
+
+    def test_jitter_bounded_by_ceiling(self):
+        """Test that full jitter never exceeds the backoff ceiling."""
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        for _ in range(50):
+            assert 0 <= policy.backoff(3) <= 4
+
+    def test_retry_after_honoured(self):
+        """Test that Retry-After on a 429 extends the delay."""
+        policy = RetryPolicy(base_delay=0.1, jitter=False)
+        assert policy.delay(1, response_error(429, {'Retry-After': '7'})) == 7
+
+    def test_retry_after_ignored_for_other_statuses(self):
+        """Test that Retry-After on a 500 does not change the delay."""
+        policy = RetryPolicy(base_delay=0.1, jitter=False)
+        assert policy.delay(1, response_error(500, {'Retry-After': '7'})) == 0.1
+
+    def test_parse_retry_after(self):
+        """Test parsing delay-seconds and invalid header values."""
+        assert parse_retry_after('3') == 3
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('soon') is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+
+
+@pytest.mark.asyncio
+class TestRetryCall:
+    """Test running operations under a policy."""
+
+    async def test_succeeds_after_transient_failures(self):
+        """Test that transient failures are retried until success."""
+        fn = AsyncMock(side_effect=[response_error(503), aiohttp.ServerDisconnectedError(), 'ok'])
+        result = await RetryPolicy(base_delay=0).call(fn)
+        assert result == 'ok'
+        assert fn.call_count == 3
+
+    async def test_permanent_failure_not_retried(self):
+        """Test that a 404 is raised immediately."""
+        fn = AsyncMock(side_effect=response_error(404))
+        with pytest.raises(aiohttp.ClientResponseError):
+            await RetryPolicy(base_delay=0).call(fn)
+        assert fn.call_count == 1
+
+    async def test_gives_up_after_attempts(self):
+        """Test that the last exception is raised once attempts are exhausted."""
+        fn = AsyncMock(side_effect=response_error(500))
+        with pytest.raises(aiohttp.ClientResponseError):
+            await RetryPolicy(attempts=3, base_delay=0).call(fn)
+        assert fn.call_count == 3
+
+    async def test_budget_stops_long_retry_after(self):
+        """Test that a Retry-After beyond the time budget stops retrying."""
+        fn = AsyncMock(side_effect=response_error(429, {'Retry-After': '60'}))
+        with patch('asyncio.sleep', new=AsyncMock()) as mock_sleep:
+            with pytest.raises(aiohttp.ClientResponseError):
+                await RetryPolicy(base_delay=0, budget=10).call(fn)
+            mock_sleep.assert_not_called()
+        assert fn.call_count == 1
+
+    async def test_default_policy_used(self):
+        """Test that fetch helpers fall back to the process-wide default policy."""
+        from pyz3r import client
+        mock_response = AsyncMock()
+        mock_response.json = AsyncMock(return_value={'ok': True})
+        policy = RetryPolicy(base_delay=0)
+        with patch.object(retry, 'DEFAULT_RETRY_POLICY', policy):
+            with patch('aiohttp.request') as mock_request:
+                mock_request.return_value.__aenter__.side_effect = [aiohttp.ServerDisconnectedError(), mock_response]
+                assert await client.fetch_json('get', 'https://example.com') == {'ok': True}
+                assert mock_request.call_count == 2
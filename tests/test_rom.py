@@ -5,6 +5,7 @@ import tempfile
 import os
 from pyz3r.rom import Rom
 from pyz3r.exceptions import Pyz3rException
+from pyz3r.patches import PackedPatches
 
 
 class TestRomBasic:
@@ -75,6 +76,114 @@ class TestRomBasic:
             os.unlink(temp_path)
 
 
+class TestRomInMemory:
+    """Test creating ROMs from data already in memory."""
+
+    def test_from_bytes_copies(self):
+        """Test that from_bytes does not share the source data."""
+        data = bytearray(16)
+        rom = Rom.from_bytes(data)
+        rom.write_byte(0, 1)
+        assert data[0] == 0
+
+    def test_from_buffer_shares(self):
+        """Test that from_buffer writes through to the buffer."""
+        data = bytearray(16)
+        rom = Rom.from_buffer(data)
+        rom.write_byte(0, 1)
+        assert data[0] == 1
+        with pytest.raises(TypeError):
+            Rom.from_buffer(bytes(16))
+
+    def test_clone_is_independent(self):
+        """Test that a clone and its original can be patched separately."""
+        base = Rom.from_bytes(bytes(16))
+        clone = base.clone()
+        clone.write_byte(0, 1)
+        assert base.rom[0] == 0
+        assert clone.rom[0] == 1
+
+
+class TestRomChecksum:
+    """Test the incrementally maintained checksum."""
+
+    @staticmethod
+    def full_checksum(data):
+        """The checksum computed from scratch."""
+        return (sum(data[:32731]) + sum(data[32736:]) + 510) & 65535
+
+    def test_tracked_sum_matches_full_sum(self):
+        """Test that the checksum stays correct through every kind of write."""
+        rom = Rom.from_bytes(bytes(range(256)) * 8192)
+        rom.checksum()
+        rom.write_byte(0x100, 0xFF)
+        rom.write_bytes(0x7FD0, [9] * 32)
+        rom.apply_dict_patches([{'5': [1, 2, 3]}, {'6': [7]}])
+        rom.apply_dict_patches(PackedPatches.pack([{'300': [4, 5]}]))
+        rom.heart_color('blue')
+        rom.expand(4)
+        rom.checksum()
+        assert rom.byte_sum == sum(rom.rom)
+        assert int.from_bytes(rom.rom[0x7FDE:0x7FE0], 'little') == self.full_checksum(rom.rom)
+
+    def test_clone_keeps_sum(self):
+        """Test that a clone tracks its own sum from its original's."""
+        base = Rom.from_bytes(bytes(4096))
+        assert base.byte_sum == 0
+        clone = base.clone()
+        clone.write_bytes(0, [1, 2])
+        assert clone.byte_sum == 3
+        assert base.byte_sum == 0
+
+    def test_assigning_rom_resets_sum(self):
+        """Test that replacing the ROM data recomputes the sum."""
+        rom = Rom.from_bytes(bytes(16))
+        assert rom.byte_sum == 0
+        rom.rom = bytearray([1] * 16)
+        assert rom.byte_sum == 16
+
+
+class TestRomMmap:
+    """Test ROMs backed by a memory-mapped output file."""
+
+    def test_writes_go_to_file(self, tmp_path):
+        """Test that patches land in the file after a flush, without write_to_file."""
+        out = tmp_path / 'out.sfc'
+        rom = Rom.mmap_file(str(out), b'\x01' * 16, length=32)
+        rom.write_bytes(20, [2, 3])
+        rom.flush()
+        assert out.read_bytes() == b'\x01' * 16 + bytes(4) + b'\x02\x03' + bytes(10)
+        rom.close()
+
+    def test_expand_matches_in_memory(self, tmp_path):
+        """Test that a mapped ROM expands to the same length as an in-memory one."""
+        in_memory = Rom.from_bytes(bytes(1024))
+        in_memory.expand(1)
+        mapped = Rom.mmap_file(str(tmp_path / 'out.sfc'), bytes(1024))
+        mapped.expand(1)
+        assert len(mapped.rom) == len(in_memory.rom) == Rom.expanded_length(1)
+        mapped.expand(1)
+        assert len(mapped.rom) == Rom.expanded_length(1)
+        mapped.close()
+
+
+@pytest.mark.asyncio
+class TestRomAsyncIO:
+    """Test reading and writing ROMs without blocking the event loop."""
+
+    async def test_aread_and_awrite(self, tmp_path):
+        """Test that a ROM read with aread and written with awrite round-trips."""
+        source = tmp_path / 'base.sfc'
+        source.write_bytes(b'\x00' * (2 * 1024 * 1024))
+
+        rom = await Rom.aread(str(source))
+        assert len(rom.rom) == 2 * 1024 * 1024
+        rom.write_byte(0x100, 0xAB)
+        await rom.awrite(str(tmp_path / 'out.sfc'))
+
+        assert (tmp_path / 'out.sfc').read_bytes()[0x100] == 0xAB
+
+
 class TestRomVersion:
     """Test ROM version detection."""
 
@@ -0,0 +1,126 @@
+"""Tests for pyz3r.sprites module."""
+
+import hashlib
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyz3r import sprites
+from pyz3r.alttpr import ALTTPR
+from pyz3r.exceptions import Pyz3rException
+from pyz3r.sprites import SpriteCatalog
+
+SPRITE_LIST = [
+    {'name': 'Link', 'file': 'https://example.com/link.zspr', 'version': 1},
+    {'name': 'Mario', 'file': 'https://example.com/mario.zspr', 'version': 2},
+]
+
+
+def list_response(status=200, body=None, etag='"v1"'):
+    """Build a mocked /sprites response."""
+    resp = AsyncMock()
+    resp.status = status
+    resp.json = AsyncMock(return_value=SPRITE_LIST if body is None else body)
+    resp.headers = {'ETag': etag} if etag else {}
+    return resp
+
+
+def file_response(data):
+    """Build a mocked sprite file response."""
+    resp = AsyncMock()
+    resp.read = AsyncMock(return_value=data)
+    return resp
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """A catalog storing its state in a temporary directory."""
+    return SpriteCatalog('https://alttpr.com', directory=str(tmp_path))
+
+
+class TestSpriteCatalogLookup:
+    """Test looking up sprites by name."""
+
+    def test_find_exact_and_case_insensitive(self, catalog):
+        """Test exact and case-insensitive name lookups."""
+        catalog._index(SPRITE_LIST)
+        assert catalog.find('Mario')['version'] == 2
+        assert catalog.find('mario')['version'] == 2
+        assert catalog.find('Luigi') is None
+
+
+@pytest.mark.asyncio
+class TestSpriteCatalogRefresh:
+    """Test fetching and revalidating the sprite list."""
+
+    async def test_fresh_list_not_refetched(self, catalog):
+        """Test that the list is fetched once while it is fresh."""
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = list_response()
+            await catalog.get('Mario')
+            await catalog.get('Link')
+            assert mock_request.call_count == 1
+
+    async def test_revalidates_with_etag(self, catalog):
+        """Test that a stale list is revalidated with If-None-Match and kept on 304."""
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.side_effect = [list_response(), list_response(status=304)]
+            await catalog.refresh()
+            await catalog.refresh(force=True)
+            assert mock_request.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        assert catalog.find('Mario') is not None
+
+    async def test_state_survives_restart(self, catalog, tmp_path):
+        """Test that a new catalog starts with a conditional request."""
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = list_response()
+            await catalog.refresh()
+
+        restarted = SpriteCatalog('https://alttpr.com', directory=str(tmp_path))
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = list_response(status=304)
+            assert (await restarted.get('Mario'))['version'] == 2
+            assert mock_request.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+
+    async def test_stale_state_not_written(self, catalog, tmp_path):
+        """Test that a state saved after a newer one has been written is dropped."""
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = list_response()
+            await catalog.refresh()
+
+        catalog._write_state(catalog._state_version - 1, {'etag': 'stale'})
+        restarted = SpriteCatalog('https://alttpr.com', directory=str(tmp_path))
+        assert restarted.find('Mario') is not None
+
+    async def test_unknown_sprite(self, catalog):
+        """Test that a missing sprite raises after revalidating the cached list once."""
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.return_value = list_response()
+            await catalog.refresh()
+            with pytest.raises(Pyz3rException):
+                await catalog.get('Luigi')
+            assert mock_request.call_count == 2
+
+
+@pytest.mark.asyncio
+class TestSpriteDownload:
+    """Test caching of sprite files."""
+
+    async def test_file_cached_by_content_hash(self, catalog, tmp_path):
+        """Test that a sprite file is downloaded once and stored by its SHA-256."""
+        with patch('aiohttp.request') as mock_request:
+            mock_request.return_value.__aenter__.side_effect = [list_response(), file_response(b'ZSPR')]
+            assert await catalog.download('Mario') == b'ZSPR'
+            assert await catalog.download('Mario') == b'ZSPR'
+            assert mock_request.call_count == 2
+        assert (tmp_path / (hashlib.sha256(b'ZSPR').hexdigest() + '.zspr')).exists()
+
+    async def test_get_sprite_uses_catalog(self, catalog):
+        """Test that ALTTPR.get_sprite goes through the site's catalog."""
+        sprites.set_sprite_catalog('https://alttpr.com', catalog)
+        try:
+            with patch('aiohttp.request') as mock_request:
+                mock_request.return_value.__aenter__.side_effect = [list_response(), file_response(b'ZSPR')]
+                assert await ALTTPR().get_sprite('mario') == bytearray(b'ZSPR')
+        finally:
+            sprites.set_sprite_catalog('https://alttpr.com', None)
@@ -0,0 +1,81 @@
+"""Tests for pyz3r.zspr module."""
+
+import pytest
+
+from pyz3r import zspr
+from pyz3r.exceptions import Pyz3rException
+from pyz3r.rom import Rom
+from pyz3r.zspr import ZsprSprite
+
+
+def make_zspr(short_author='Tester', gfx_byte=0x11, palette_byte=0x22, gloves_byte=0x33):
+    """Build a ZSPR file with UTF-16 metadata and filled graphics and palettes."""
+    metadata = 'Title'.encode('utf-16-le') + b'\0\0' + 'Author'.encode('utf-16-le') + b'\0\0'
+    metadata += short_author.encode('ascii') + b'\0'
+    gfx_offset = 0x1D + len(metadata)
+    palette_offset = gfx_offset + 0x7000
+    header = bytearray(b'ZSPR' + bytes(0x1D - 4))
+    header[9:13] = gfx_offset.to_bytes(4, 'little')
+    header[15:19] = palette_offset.to_bytes(4, 'little')
+    return bytes(header) + metadata + bytes([gfx_byte]) * 0x7000 + bytes([palette_byte]) * 120 + bytes([gloves_byte]) * 4
+
+
+def make_rom(version):
+    """A ROM of the given version with the sprite author marker set."""
+    rom = Rom.from_bytes(bytes(0x120000))
+    rom.rom[0x7FE2:0x7FE4] = version.to_bytes(2, 'little')
+    rom.rom[0x118000:0x118002] = rom.rom[0x11801E:0x118020] = b'\x02\x37'
+    return rom
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start each test with no cached sprites."""
+    zspr.clear_cache()
+    yield
+    zspr.clear_cache()
+
+
+class TestZsprSprite:
+    """Test parsing ZSPR files."""
+
+    def test_parse(self):
+        """Test that the graphics, palettes and short author are extracted."""
+        sprite = ZsprSprite(make_zspr())
+        assert sprite.author == 'Tester'
+        assert sprite.gfx == b'\x11' * 28671
+        assert sprite.palette == b'\x22' * 120
+        assert sprite.gloves == b'\x33' * 4
+
+    def test_author_bytes_by_version(self):
+        """Test that the author is centered, upper-cased and encoded per ROM version."""
+        sprite = ZsprSprite(make_zspr("a'b"))
+        upper, lower = sprite.author_bytes(4)
+        assert len(upper) == len(lower) == 28
+        assert upper[12:15] == bytes([0x5D, 0xD9, 0x5E])
+        assert sprite.author_bytes(0)[0][12:15] == bytes([0x5D, 0x77, 0x5E])
+
+    def test_load_is_cached(self):
+        """Test that loading the same file twice returns the same parsed sprite."""
+        assert ZsprSprite.load(make_zspr()) is ZsprSprite.load(bytearray(make_zspr()))
+        assert ZsprSprite.load(make_zspr()) is not ZsprSprite.load(make_zspr('Other'))
+
+    def test_too_short(self):
+        """Test that data without a ZSPR header is rejected."""
+        with pytest.raises(Pyz3rException):
+            ZsprSprite(b'ZSPR')
+
+
+class TestRomSprite:
+    """Test applying sprites to a ROM."""
+
+    def test_parsed_and_raw_sprites_match(self):
+        """Test that a parsed sprite writes the same bytes as the raw file."""
+        data = make_zspr('Tester')
+        raw, parsed = make_rom(4), make_rom(4)
+        raw.sprite(data)
+        parsed.sprite(ZsprSprite(data))
+        assert raw.rom == parsed.rom
+        assert parsed.rom[0x80000:0x80000 + 28671] == b'\x11' * 28671
+        assert parsed.rom[0xDEDF5:0xDEDF9] == b'\x33' * 4
+        assert parsed.rom[0x118002:0x11801E] == ZsprSprite(data).author_bytes(4)[0]